@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+"""
+Affinity Propagation esparsa: as mensagens de responsabilidade (R) e
+disponibilidade (A) só circulam pelas arestas de um grafo kNN, em vez de
+pela matriz densa n×n do 'sklearn.cluster.AffinityPropagation'.
+
+Num grafo kNN cada exemplar só recebe "votos" dos seus vizinhos, então a
+primeira rodada gera muitos clusters pequenos. Por isso o ajuste é feito
+em níveis: os exemplares de um nível viram pontos com peso (tamanho do
+cluster) no nível seguinte, também esparso, até restarem poucos
+representantes; estes passam por uma AP densa ponderada, como na AP
+"com pontos repetidos" de Frey & Dueck (s'(i,k) = peso_i · s(i,k)).
+
+Memória e tempo por iteração ficam O(n·k). A interface é a mesma do
+estimador do scikit-learn ('fit', 'fit_predict', 'predict',
+'labels_', 'cluster_centers_', 'cluster_centers_indices_'), então ele
+pode substituir a entrada "Affinity Propagation" da lista de algoritmos.
+Como os níveis já são ponderados, 'fit' aceita 'sample_weight' (ex.: os
+pesos de um coreset): o peso de cada ponto é o seu peso no primeiro
+nível, como se ele estivesse repetido tantas vezes.
+"""
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator, ClusterMixin
+from sklearn.cluster import AffinityPropagation
+from sklearn.metrics import pairwise_distances_argmin
+from sklearn.metrics.pairwise import euclidean_distances
+from sklearn.neighbors import NearestNeighbors
+from sklearn.utils import check_random_state
+
+
+def _maximo_por_linha(valores, indptr):
+    """Maior valor e posição (no vetor de arestas) do maior valor de cada linha."""
+    maximos = np.maximum.reduceat(valores, indptr[:-1])
+    linhas = np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+    candidatos = np.flatnonzero(valores == maximos[linhas])
+    # Se houver empate, fica a primeira ocorrência de cada linha
+    _, primeira = np.unique(linhas[candidatos], return_index=True)
+    return maximos, candidatos[primeira]
+
+
+def _arestas_knn(X, n_vizinhos, grafo_knn=None):
+    """Arestas (linhas, colunas, distâncias) do grafo kNN simétrico, sem a diagonal."""
+    if grafo_knn is not None:
+        grafo = sp.csr_matrix(grafo_knn)
+    else:
+        n_vizinhos = min(n_vizinhos, X.shape[0] - 1)
+        grafo = NearestNeighbors(n_neighbors=n_vizinhos).fit(X)
+        grafo = grafo.kneighbors_graph(mode="distance")
+    grafo = grafo.maximum(grafo.T).tocoo()
+    fora_diag = grafo.row != grafo.col
+    return grafo.row[fora_diag], grafo.col[fora_diag], grafo.data[fora_diag]
+
+
+def _propagar_mensagens(S, damping, max_iter, convergence_iter, rng):
+    """
+    Troca de mensagens da AP sobre as arestas de S (CSR com diagonal).
+    Retorna (índices dos exemplares, número de iterações).
+    """
+    n = S.shape[0]
+    indptr, colunas = S.indptr, S.indices
+    linhas = np.repeat(np.arange(n), np.diff(indptr))
+    e_diag = linhas == colunas
+    s = S.data.astype(np.float64)
+
+    # Pequeno ruído para desfazer empates, como no scikit-learn
+    tiny = np.finfo(np.float64).tiny
+    s += (np.finfo(np.float64).eps * s + tiny * 100) * rng.standard_normal(s.size)
+
+    R = np.zeros_like(s)
+    A = np.zeros_like(s)
+    historico = np.zeros((n, convergence_iter), dtype=bool)
+    n_iter = max_iter
+
+    for it in range(max_iter):
+        # Responsabilidade: r(i,k) = s(i,k) - max_{k' != k} [a(i,k') + s(i,k')]
+        AS = A + s
+        max1, pos_max = _maximo_por_linha(AS, indptr)
+        AS[pos_max] = -np.inf
+        max2 = np.maximum.reduceat(AS, indptr[:-1])
+        R_novo = s - max1[linhas]
+        R_novo[pos_max] = s[pos_max] - max2
+        R = damping * R + (1 - damping) * R_novo
+
+        # Disponibilidade: a(i,k) = min(0, r(k,k) + soma_{i' != i,k} max(0, r(i',k)))
+        Rp = np.where(e_diag, R, np.maximum(R, 0))
+        soma_colunas = np.bincount(colunas, weights=Rp, minlength=n)
+        A_novo = soma_colunas[colunas] - Rp
+        A_novo[~e_diag] = np.minimum(A_novo[~e_diag], 0)
+        A = damping * A + (1 - damping) * A_novo
+
+        # Convergência: conjunto de exemplares estável por 'convergence_iter'
+        exemplares = (A[e_diag] + R[e_diag]) > 0
+        historico[:, it % convergence_iter] = exemplares
+        if it >= convergence_iter:
+            estaveis = historico.sum(axis=1)
+            if exemplares.any() and np.all(
+                (estaveis == convergence_iter) | (estaveis == 0)
+            ):
+                n_iter = it + 1
+                break
+
+    exemplares = colunas[e_diag][(A[e_diag] + R[e_diag]) > 0]
+    return exemplares, n_iter
+
+
+class AffinityPropagationEsparsa(ClusterMixin, BaseEstimator):
+    """
+    Affinity Propagation restrita a grafos kNN, ajustada em níveis.
+
+    Parâmetros iguais aos do scikit-learn (damping, max_iter,
+    convergence_iter, preference, random_state), mais:
+      - n_neighbors: vizinhos de cada ponto no grafo (se 'grafo_knn' for None);
+      - grafo_knn: grafo esparso de distâncias já calculado (ex.: o índice
+        de vizinhança compartilhado), usado no primeiro nível;
+      - limite_denso: com até esse número de representantes, o último
+        nível usa a AP densa do scikit-learn (memória limite_denso²).
+
+    Se 'preference' for None, usa a mediana das similaridades (-d²) de
+    pares sorteados, que aproxima a mediana da matriz completa usada
+    pelo scikit-learn.
+    """
+
+    def __init__(
+        self,
+        damping=0.5,
+        max_iter=200,
+        convergence_iter=15,
+        preference=None,
+        n_neighbors=20,
+        grafo_knn=None,
+        limite_denso=2000,
+        random_state=None,
+    ):
+        self.damping = damping
+        self.max_iter = max_iter
+        self.convergence_iter = convergence_iter
+        self.preference = preference
+        self.n_neighbors = n_neighbors
+        self.grafo_knn = grafo_knn
+        self.limite_denso = limite_denso
+        self.random_state = random_state
+
+    def _preferencia(self, X, rng):
+        if self.preference is not None:
+            return float(self.preference)
+        n = X.shape[0]
+        n_pares = min(100_000, n * n)
+        i = rng.randint(n, size=n_pares)
+        j = rng.randint(n, size=n_pares)
+        return float(np.median(-((X[i] - X[j]) ** 2).sum(axis=1)))
+
+    def _nivel_esparso(self, X_rep, pesos, preferencia, grafo_knn, rng):
+        """
+        Um nível de AP esparsa sobre representantes com peso.
+        Retorna (exemplares, rótulo de cada representante).
+        """
+        m = X_rep.shape[0]
+        linhas, colunas, distancias = _arestas_knn(X_rep, self.n_neighbors, grafo_knn)
+        S = sp.coo_matrix(
+            (
+                np.concatenate(
+                    [-(distancias**2) * pesos[linhas], np.full(m, preferencia)]
+                ),
+                (
+                    np.concatenate([linhas, np.arange(m)]),
+                    np.concatenate([colunas, np.arange(m)]),
+                ),
+            ),
+            shape=(m, m),
+        ).tocsr()
+        S.sort_indices()
+        exemplares, n_iter = _propagar_mensagens(
+            S, self.damping, self.max_iter, self.convergence_iter, rng
+        )
+        self.n_iter_ += n_iter
+        if len(exemplares) == 0:
+            return exemplares, None
+
+        # Cada representante vai para o exemplar vizinho de maior similaridade;
+        # quem não tem exemplar entre os vizinhos vai para o mais próximo
+        codigo = np.full(m, -1)
+        codigo[exemplares] = np.arange(len(exemplares))
+        linhas_s = np.repeat(np.arange(m), np.diff(S.indptr))
+        valores = np.where(codigo[S.indices] >= 0, S.data, -np.inf)
+        valores[linhas_s == S.indices] = -np.inf
+        maximos, pos = _maximo_por_linha(valores, S.indptr)
+        rotulos = np.where(np.isfinite(maximos), codigo[S.indices[pos]], -1)
+        sem_rotulo = rotulos < 0
+        if sem_rotulo.any():
+            rotulos[sem_rotulo] = pairwise_distances_argmin(
+                X_rep[sem_rotulo], X_rep[exemplares]
+            )
+        rotulos[exemplares] = np.arange(len(exemplares))
+        return exemplares, rotulos
+
+    def _nivel_denso(self, X_rep, pesos, preferencia):
+        """Último nível: AP densa ponderada do scikit-learn."""
+        S = -euclidean_distances(X_rep, squared=True) * pesos[:, None]
+        ap = AffinityPropagation(
+            damping=self.damping,
+            max_iter=self.max_iter,
+            convergence_iter=self.convergence_iter,
+            preference=preferencia,
+            affinity="precomputed",
+            random_state=self.random_state,
+        ).fit(S)
+        self.n_iter_ += ap.n_iter_
+        return ap.cluster_centers_indices_, ap.labels_
+
+    def fit(self, X, y=None, sample_weight=None):
+        X = np.asarray(X)
+        n = X.shape[0]
+        rng = check_random_state(self.random_state)
+        preferencia = self._preferencia(X, rng)
+        self.n_iter_ = 0
+        self.n_niveis_ = 0
+
+        representantes = np.arange(n)  # índices (em X) dos pontos do nível
+        if sample_weight is None:
+            pesos = np.ones(n)
+        else:
+            pesos = np.asarray(sample_weight, dtype=np.float64)
+        rotulos = np.arange(n)  # rótulo de cada ponto = representante do nível
+        grafo_knn = self.grafo_knn
+
+        while len(representantes) > self.limite_denso:
+            exemplares, rotulos_nivel = self._nivel_esparso(
+                X[representantes], pesos, preferencia, grafo_knn, rng
+            )
+            self.n_niveis_ += 1
+            grafo_knn = None  # o grafo fornecido só vale para o primeiro nível
+            if len(exemplares) == 0:
+                break
+            encolheu = len(exemplares) < 0.9 * len(representantes)
+            rotulos = rotulos_nivel[rotulos]
+            pesos = np.bincount(rotulos_nivel, weights=pesos, minlength=len(exemplares))
+            representantes = representantes[exemplares]
+            if not encolheu:
+                break
+
+        if 1 < len(representantes) <= self.limite_denso:
+            exemplares, rotulos_nivel = self._nivel_denso(
+                X[representantes], pesos, preferencia
+            )
+            self.n_niveis_ += 1
+            if len(exemplares) > 0:
+                rotulos = rotulos_nivel[rotulos]
+                representantes = representantes[exemplares]
+
+        if len(representantes) == 0 or rotulos.max(initial=-1) < 0:
+            self.cluster_centers_indices_ = np.array([], dtype=int)
+            self.cluster_centers_ = np.empty((0, X.shape[1]))
+            self.labels_ = np.full(n, -1)
+            return self
+
+        self.cluster_centers_indices_ = representantes
+        self.cluster_centers_ = X[representantes]
+        self.labels_ = rotulos
+        return self
+
+    def predict(self, X):
+        """Rótulo do centro (exemplar) mais próximo de cada ponto."""
+        if len(self.cluster_centers_indices_) == 0:
+            return np.full(np.asarray(X).shape[0], -1)
+        return pairwise_distances_argmin(np.asarray(X), self.cluster_centers_)
@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de escalabilidade dos 12 algoritmos do trabalho.
+
+Gera conjuntos sintéticos (blobs, moons e blobs anisotrópicos) com n e d
+crescentes, roda cada algoritmo com os mesmos parâmetros de
+'resolver_trabalho.py' (mesma lista, mesmo índice de vizinhança, mesmo
+orçamento por algoritmo) e registra tempo, pico de RAM e ARI contra o
+rótulo verdadeiro. Se 'content/iris_cluster.txt' existir, o Iris também
+é avaliado (ARI contra a coluna 'variety').
+
+Saídas em result/benchmark/: benchmark.csv, benchmark.json e gráficos
+log-log de tempo e memória por n.
+
+Exemplo:
+    python benchmark_escalabilidade.py --n 1000 10000 --d 2 8 --tempo-limite 60
+"""
+
+import argparse
+import os
+import time
+
+import matplotlib
+
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from sklearn.datasets import make_blobs, make_moons
+from sklearn.metrics import adjusted_rand_score
+from sklearn.preprocessing import StandardScaler
+
+from escalonador import executar_com_orcamento
+from resolver_trabalho import (
+    INPUT_DIR,
+    OUTPUT_DIR,
+    PARAMS,
+    montar_algoritmos,
+    raio_do_indice,
+)
+from vizinhanca import construir_indice_vizinhanca
+
+BENCHMARK_DIR = os.path.join(OUTPUT_DIR, "benchmark")
+
+N_CENTROS = 5
+
+
+def gerar_dados(tipo, n, d, random_state=42):
+    """Gera (X, y) sintéticos com 'n' pontos em 'd' dimensões."""
+    rng = np.random.default_rng(random_state)
+    if tipo == "blobs":
+        return make_blobs(
+            n_samples=n, n_features=d, centers=N_CENTROS, random_state=random_state
+        )
+    if tipo == "moons":
+        X2, y = make_moons(n_samples=n, noise=0.05, random_state=random_state)
+        # Dimensões extras com ruído pequeno, para manter a estrutura 2D
+        extras = rng.normal(scale=0.05, size=(n, max(0, d - 2)))
+        return np.hstack([X2, extras])[:, :d], y
+    if tipo == "anisotropico":
+        X, y = make_blobs(
+            n_samples=n, n_features=d, centers=N_CENTROS, random_state=random_state
+        )
+        transformacao = rng.normal(size=(d, d))
+        return X @ transformacao, y
+    raise ValueError(f"Tipo de dados desconhecido: {tipo}")
+
+
+def medir_conjunto(
+    X, y, k, descricao, tempo_limite, memoria_limite_mb, falhas, so_algoritmos
+):
+    """
+    Roda os 12 algoritmos em X (já padronizado) e devolve uma lista de
+    registros (um por algoritmo). 'falhas' guarda os algoritmos que já
+    estouraram o orçamento num n menor e que, por isso, não são repetidos.
+    """
+    registros = []
+    base = {**descricao, "n": X.shape[0], "d": X.shape[1]}
+
+    # Índice de vizinhança. O grafo de raio só é construído se couber em
+    # 'memoria_limite_mb'; sem ele, DBSCAN e OPTICS rodam sobre X (ver
+    # 'raio_do_indice'). O backend aproximado guarda só os k vizinhos.
+    backend = descricao.get("vizinhanca", "exato")
+    raio = raio_do_indice(X, backend, memoria_limite_mb)
+    inicio = time.perf_counter()
+    indice = construir_indice_vizinhanca(
+        X,
+        n_vizinhos=PARAMS["indice_n_vizinhos"],
+        raio=raio,
+        backend=backend,
+        opcoes_aproximado={
+            "n_arvores": PARAMS["ann_n_arvores"],
+            "refinamentos": PARAMS["ann_refinamentos"],
+        },
+    )
+    registros.append(
+        {
+            **base,
+            "algoritmo": "indice_vizinhanca",
+            "status": "ok",
+            "tempo_s": time.perf_counter() - inicio,
+            "pico_mb": None,
+            "ari": None,
+            "recall": indice["recall"],
+            "raio_indice": raio,
+        }
+    )
+
+    algoritmos, entradas = montar_algoritmos(X, k, indice)
+
+    tarefas = []
+    for nome_amigavel, nome_arquivo, algoritmo in algoritmos:
+        if so_algoritmos and nome_arquivo not in so_algoritmos:
+            continue
+        if nome_arquivo in falhas:
+            registros.append(
+                {
+                    **base,
+                    "algoritmo": nome_arquivo,
+                    "status": f"pulado ({falhas[nome_arquivo]} em n menor)",
+                    "tempo_s": None,
+                    "pico_mb": None,
+                    "ari": None,
+                }
+            )
+        else:
+            tarefas.append((nome_arquivo, algoritmo))
+
+    resultados = executar_com_orcamento(
+        tarefas,
+        X,
+        tempo_limite=tempo_limite,
+        memoria_limite_mb=memoria_limite_mb,
+        n_jobs=1,  # um por vez, para que tempo e memória não se influenciem
+        entradas=entradas,
+    )
+    for nome_arquivo, resultado in resultados.items():
+        ari = None
+        if resultado["status"] == "ok":
+            ari = adjusted_rand_score(y, resultado["labels"])
+        elif resultado["status"] in ("timeout", "oom"):
+            falhas[nome_arquivo] = resultado["status"]
+        registros.append(
+            {
+                **base,
+                "algoritmo": nome_arquivo,
+                "status": resultado["status"],
+                "tempo_s": resultado["tempo"],
+                "pico_mb": resultado["pico_mb"],
+                "ari": ari,
+                # Tempo por etapa (ex.: Spectral: afinidade e autovetores)
+                **{
+                    f"etapa_{etapa}": valor
+                    for etapa, valor in (resultado.get("etapas") or {}).items()
+                },
+            }
+        )
+        print(
+            f"    {nome_arquivo:<18} {resultado['status']:<8} "
+            f"{resultado['tempo']:8.2f}s  ARI={ari if ari is None else round(ari, 3)}"
+        )
+        if resultado.get("etapas"):
+            print(f"      etapas: {resultado['etapas']}")
+    return registros
+
+
+def plotar_escalabilidade(df, output_dir):
+    """Gráficos log-log de tempo e de pico de RAM por n, um por (dados, d)."""
+    df = df[(df["status"] == "ok") & (df["dados"] != "iris")]
+    for (tipo, d), grupo in df.groupby(["dados", "d"]):
+        for coluna, rotulo, sufixo in [
+            ("tempo_s", "Tempo (s)", "tempo"),
+            ("pico_mb", "Pico de RAM (MB)", "memoria"),
+        ]:
+            plt.figure(figsize=(10, 6))
+            for algoritmo, pontos in grupo.groupby("algoritmo"):
+                pontos = pontos.dropna(subset=[coluna]).sort_values("n")
+                pontos = pontos[pontos[coluna] > 0]
+                if len(pontos):
+                    plt.plot(pontos["n"], pontos[coluna], "o-", label=algoritmo)
+            plt.xscale("log")
+            plt.yscale("log")
+            plt.xlabel("Número de pontos (n)")
+            plt.ylabel(rotulo)
+            plt.title(f"Escalabilidade - {tipo}, d={d}")
+            plt.grid(True, which="both", alpha=0.3)
+            plt.legend(fontsize=8, ncol=2)
+            caminho = os.path.join(output_dir, f"{tipo}_d{d}_{sufixo}.png")
+            plt.savefig(caminho)
+            plt.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument(
+        "--n", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--d", type=int, nargs="+", default=[2, 8, 32, 64])
+    parser.add_argument(
+        "--dados",
+        nargs="+",
+        default=["blobs", "moons", "anisotropico"],
+        choices=["blobs", "moons", "anisotropico"],
+    )
+    parser.add_argument(
+        "--algoritmos", nargs="+", default=None, help="nomes de arquivo (ex.: kmeans)"
+    )
+    parser.add_argument("--tempo-limite", type=float, default=120.0)
+    parser.add_argument("--memoria-limite-mb", type=float, default=4096.0)
+    parser.add_argument("--dtype", choices=["float64", "float32"], default="float64")
+    parser.add_argument(
+        "--vizinhanca", choices=["exato", "aproximado"], default="exato"
+    )
+    args = parser.parse_args()
+
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    registros = []
+
+    for tipo in args.dados:
+        for d in args.d:
+            falhas = {}  # quem estourou o orçamento não roda nos n maiores
+            for n in sorted(args.n):
+                print(f"\n{tipo}: n={n}, d={d}")
+                X, y = gerar_dados(tipo, n, d)
+                X = StandardScaler().fit_transform(X.astype(args.dtype))
+                k = len(np.unique(y))
+                registros += medir_conjunto(
+                    X,
+                    y,
+                    k,
+                    {"dados": tipo, "dtype": args.dtype, "vizinhanca": args.vizinhanca},
+                    args.tempo_limite,
+                    args.memoria_limite_mb,
+                    falhas,
+                    args.algoritmos,
+                )
+
+    iris_path = os.path.join(INPUT_DIR, "iris_cluster.txt")
+    if os.path.exists(iris_path):
+        print("\niris_cluster.txt")
+        df_iris = pd.read_csv(iris_path)
+        y = df_iris["variety"].to_numpy()
+        X = StandardScaler().fit_transform(
+            df_iris.drop("variety", axis=1).astype(args.dtype)
+        )
+        registros += medir_conjunto(
+            X,
+            y,
+            len(np.unique(y)),
+            {"dados": "iris", "dtype": args.dtype, "vizinhanca": args.vizinhanca},
+            args.tempo_limite,
+            args.memoria_limite_mb,
+            {},
+            args.algoritmos,
+        )
+
+    df = pd.DataFrame(registros)
+    csv_path = os.path.join(BENCHMARK_DIR, "benchmark.csv")
+    df.to_csv(csv_path, index=False)
+    df.to_json(
+        os.path.join(BENCHMARK_DIR, "benchmark.json"),
+        orient="records",
+        force_ascii=False,
+        indent=2,
+    )
+    plotar_escalabilidade(df, BENCHMARK_DIR)
+    print(f"\nResultados salvos em: {os.path.abspath(BENCHMARK_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
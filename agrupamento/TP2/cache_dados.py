@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+Cache binário e colunar dos arquivos de dados (content/).
+
+Na primeira leitura, o arquivo texto é lido bloco a bloco e cada coluna
+vai para o seu próprio arquivo binário ('coluna_<i>.bin', os valores crus
+no dtype da coluna), junto com um 'meta.json' com nomes, dtypes, número
+de linhas e a identificação do arquivo de origem. As leituras seguintes
+só mapeiam as colunas em memória (np.memmap): não há parsing, e apenas
+as páginas realmente usadas são lidas do disco.
+
+Colunas de texto (ex.: 'variety') são guardadas como códigos inteiros,
+com as categorias no 'meta.json'.
+
+O cache é invalidado quando o arquivo de origem muda. Se o tamanho e a
+data de modificação são os mesmos registrados, ele é usado direto; se
+só a data mudou (ex.: depois de um 'git checkout'), o SHA-256 do
+conteúdo decide. Parâmetros de leitura diferentes (dtype, usecols,
+header...) geram entradas diferentes.
+"""
+
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+# Muda quando o layout dos arquivos do cache muda (invalida os antigos)
+VERSAO_FORMATO = 1
+
+
+class _TipoMudou(Exception):
+    """Uma coluna numérica mudou de dtype entre dois blocos lidos."""
+
+
+def _hash_arquivo(caminho, tamanho_bloco=1 << 20):
+    """SHA-256 (hex) do conteúdo de um arquivo, lido em blocos de 1 MB."""
+    h = hashlib.sha256()
+    with open(caminho, "rb") as f:
+        for bloco in iter(lambda: f.read(tamanho_bloco), b""):
+            h.update(bloco)
+    return h.hexdigest()
+
+
+def _resolver_usecols(file_path, parametros):
+    """
+    Troca um 'usecols' chamável pela lista de colunas que ele seleciona:
+    a função muda de identidade a cada execução e não serve como chave.
+    """
+    usecols = parametros.get("usecols")
+    if not callable(usecols):
+        return parametros
+    cabecalho = {
+        chave: valor
+        for chave, valor in parametros.items()
+        if chave not in ("usecols", "dtype")
+    }
+    colunas = pd.read_csv(file_path, nrows=0, **cabecalho).columns
+    return {**parametros, "usecols": [c for c in colunas if usecols(c)]}
+
+
+def _nome_entrada(file_path, parametros):
+    """Nome da entrada do cache: arquivo de origem + hash dos parâmetros."""
+    h = hashlib.sha256()
+    h.update(os.path.abspath(file_path).encode())
+    h.update(repr(sorted(parametros.items(), key=lambda item: item[0])).encode())
+    return f"{os.path.basename(file_path)}-{h.hexdigest()[:16]}"
+
+
+def _origem(file_path):
+    info = os.stat(file_path)
+    return {"tamanho": info.st_size, "mtime_ns": info.st_mtime_ns}
+
+
+def _gravar_meta(destino, meta):
+    """Grava o 'meta.json' num temporário e renomeia (nunca fica pela metade)."""
+    temporario = os.path.join(destino, "meta.json.tmp")
+    with open(temporario, "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, default=str)
+    os.replace(temporario, os.path.join(destino, "meta.json"))
+
+
+def _gravar_colunas(file_path, destino, parametros, chunksize):
+    """
+    Lê o arquivo (em blocos de 'chunksize' linhas; None = de uma vez) e
+    grava uma coluna por arquivo em 'destino'. Retorna a descrição das
+    colunas e o número de linhas.
+    """
+    if chunksize is None:
+        blocos = [pd.read_csv(file_path, **parametros)]
+    else:
+        blocos = pd.read_csv(file_path, chunksize=chunksize, **parametros)
+
+    colunas, arquivos, categorias = None, [], []
+    linhas = 0
+    try:
+        for bloco in blocos:
+            if colunas is None:
+                colunas = []
+                for i, nome in enumerate(bloco.columns):
+                    dtype = bloco.iloc[:, i].dtype
+                    numerica = pd.api.types.is_numeric_dtype(dtype) and isinstance(
+                        dtype, np.dtype
+                    )
+                    colunas.append(
+                        {
+                            "nome": nome,
+                            "tipo": "numerica" if numerica else "texto",
+                            "dtype": dtype.str if numerica else "<i4",
+                            "dtype_pandas": str(dtype),
+                        }
+                    )
+                    arquivos.append(
+                        open(os.path.join(destino, f"coluna_{i}.bin"), "wb")
+                    )
+                    categorias.append({})
+            for i, info in enumerate(colunas):
+                valores = bloco.iloc[:, i]
+                if info["tipo"] == "numerica":
+                    if valores.dtype.str != info["dtype"]:
+                        raise _TipoMudou(info["nome"])
+                    valores = valores.to_numpy()
+                else:
+                    # Códigos do bloco -> códigos globais (-1 = ausente)
+                    locais = pd.Categorical(valores)
+                    mapa = categorias[i]
+                    globais = [
+                        mapa.setdefault(str(c), len(mapa)) for c in locais.categories
+                    ]
+                    globais = np.array(globais + [-1], dtype=np.int32)
+                    valores = globais[locais.codes]
+                arquivos[i].write(np.ascontiguousarray(valores).tobytes())
+            linhas += len(bloco)
+    finally:
+        for arquivo in arquivos:
+            arquivo.close()
+
+    if colunas is None:
+        # Arquivo sem linhas: a leitura em blocos não devolve nenhum bloco
+        return _gravar_colunas(file_path, destino, parametros, None)
+    for info, mapa in zip(colunas, categorias):
+        if info["tipo"] == "texto":
+            info["categorias"] = list(mapa)
+    return colunas, linhas
+
+
+def _construir(file_path, destino, parametros, chunksize):
+    """Converte o arquivo para o cache em 'destino' (substitui o anterior)."""
+    temporario = f"{destino}.tmp-{os.getpid()}"
+    shutil.rmtree(temporario, ignore_errors=True)
+    os.makedirs(temporario)
+    origem = _origem(file_path)
+    try:
+        try:
+            colunas, linhas = _gravar_colunas(
+                file_path, temporario, parametros, chunksize
+            )
+        except _TipoMudou:
+            # Ex.: coluna inteira que ganha um NaN num bloco posterior; o
+            # dtype final só é conhecido lendo tudo de uma vez
+            colunas, linhas = _gravar_colunas(file_path, temporario, parametros, None)
+        meta = {
+            "versao": VERSAO_FORMATO,
+            "origem": {**origem, "sha256": _hash_arquivo(file_path)},
+            "linhas": linhas,
+            "colunas": colunas,
+        }
+        _gravar_meta(temporario, meta)
+        shutil.rmtree(destino, ignore_errors=True)
+        os.replace(temporario, destino)
+    finally:
+        shutil.rmtree(temporario, ignore_errors=True)
+    return meta
+
+
+def _meta_valido(file_path, destino):
+    """'meta.json' da entrada se ela ainda corresponde ao arquivo; senão None."""
+    try:
+        with open(os.path.join(destino, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if meta.get("versao") != VERSAO_FORMATO:
+        return None
+    origem = _origem(file_path)
+    registrada = meta["origem"]
+    if origem["tamanho"] != registrada["tamanho"]:
+        return None
+    if origem["mtime_ns"] != registrada["mtime_ns"]:
+        # Só a data mudou: confere o conteúdo e, se igual, atualiza a data
+        if _hash_arquivo(file_path) != registrada["sha256"]:
+            return None
+        registrada["mtime_ns"] = origem["mtime_ns"]
+        _gravar_meta(destino, meta)
+    return meta
+
+
+def _abrir(destino, meta):
+    """DataFrame com as colunas numéricas mapeadas em memória (somente leitura)."""
+    dados = {}
+    for i, info in enumerate(meta["colunas"]):
+        dtype = np.dtype(info["dtype"])
+        if meta["linhas"] == 0:
+            valores = np.empty(0, dtype=dtype)
+        else:
+            valores = np.memmap(
+                os.path.join(destino, f"coluna_{i}.bin"),
+                dtype=dtype,
+                mode="r",
+                shape=(meta["linhas"],),
+            )
+        if info["tipo"] == "texto":
+            valores = pd.Series(
+                pd.Categorical.from_codes(
+                    np.asarray(valores), categories=info["categorias"]
+                )
+            ).astype(info["dtype_pandas"])
+        dados[i] = valores
+    df = pd.DataFrame(dados, copy=False)
+    df.columns = [info["nome"] for info in meta["colunas"]]
+    return df
+
+
+def ler_csv_em_cache(file_path, diretorio, chunksize=100_000, **parametros):
+    """
+    Equivalente a 'pd.read_csv(file_path, **parametros)' com cache binário
+    em 'diretorio': na primeira vez converte o arquivo (em blocos de
+    'chunksize' linhas); nas seguintes, mapeia as colunas em memória.
+
+    As colunas numéricas do DataFrame devolvido são somente leitura.
+    """
+    parametros = _resolver_usecols(file_path, parametros)
+    destino = os.path.join(diretorio, _nome_entrada(file_path, parametros))
+    meta = _meta_valido(file_path, destino)
+    if meta is None:
+        os.makedirs(diretorio, exist_ok=True)
+        meta = _construir(file_path, destino, parametros, chunksize)
+    return _abrir(destino, meta)
@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Cache em disco dos resultados de clusterização, endereçado pelo conteúdo.
+
+A chave de cada resultado é um SHA-256 de:
+  - os dados já padronizados (o hash do conteúdo cobre o arquivo de
+    entrada e o scaler: mudar qualquer um dos dois muda a matriz);
+  - a classe do algoritmo e todos os seus parâmetros ('get_params'),
+    incluindo matrizes como a 'connectivity' do Ward;
+  - a entrada pré-calculada, quando houver (ex.: grafo de vizinhança);
+  - a versão da biblioteca do algoritmo (ou, para as classes deste
+    trabalho, o conteúdo do módulo que as define);
+  - VERSAO_FORMATO, a versão dos campos guardados.
+
+Cada resultado vira um arquivo '<chave>.npz' comprimido com rótulos
+(int32), centros, tempo, pico de memória, tempo por etapa, precisão
+interna, os parâmetros do modelo de atribuição (GMM, BIRCH) e, nos
+métodos hierárquicos, a matriz de ligação da árvore inteira. Ao passar
+de 'limite_mb', os arquivos usados há mais tempo são apagados (LRU pela
+data de modificação, atualizada a cada leitura).
+"""
+
+import hashlib
+import os
+import sys
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.base import BaseEstimator
+
+# Versão do conteúdo guardado: mudar os campos invalida o cache antigo
+VERSAO_FORMATO = 3
+
+
+def _atualizar_hash(h, valor):
+    """Acrescenta 'valor' ao hash de forma estável (arrays pelo conteúdo)."""
+    if isinstance(valor, np.ndarray):
+        valor = np.ascontiguousarray(valor)
+        h.update(f"nd{valor.dtype.str}{valor.shape}".encode())
+        h.update(valor.tobytes())
+    elif sp.issparse(valor):
+        valor = sp.csr_matrix(valor)
+        h.update(f"sp{valor.shape}".encode())
+        for parte in (valor.data, valor.indices, valor.indptr):
+            _atualizar_hash(h, parte)
+    elif isinstance(valor, BaseEstimator):
+        _atualizar_hash(h, _identificar_classe(valor))
+        _atualizar_hash(h, valor.get_params(deep=False))
+    elif isinstance(valor, dict):
+        h.update(b"{")
+        for chave in sorted(valor):
+            _atualizar_hash(h, chave)
+            _atualizar_hash(h, valor[chave])
+        h.update(b"}")
+    elif isinstance(valor, (list, tuple)):
+        h.update(b"[")
+        for item in valor:
+            _atualizar_hash(h, item)
+        h.update(b"]")
+    else:
+        h.update(repr(valor).encode())
+        h.update(b";")
+
+
+def _identificar_classe(algoritmo):
+    """Nome completo da classe e versão do código que a implementa."""
+    classe = type(algoritmo)
+    modulo = sys.modules.get(classe.__module__)
+    raiz = sys.modules.get(classe.__module__.split(".")[0])
+    versao = getattr(raiz, "__version__", None)
+    if versao is None and getattr(modulo, "__file__", None):
+        # Classe deste trabalho: qualquer mudança no módulo invalida o cache
+        with open(modulo.__file__, "rb") as f:
+            versao = hashlib.sha256(f.read()).hexdigest()
+    return f"{classe.__module__}.{classe.__qualname__}@{versao}"
+
+
+def _ler_prefixados(arquivo, prefixo):
+    """
+    {nome: valor} dos campos '<prefixo><nome>' de um .npz (None se não
+    houver nenhum). Escalares (textos, tempos) voltam como objetos Python,
+    e não como arrays 0-d.
+    """
+    campos = {}
+    for campo in arquivo.files:
+        if campo.startswith(prefixo):
+            valor = arquivo[campo]
+            campos[campo[len(prefixo) :]] = valor.item() if valor.ndim == 0 else valor
+    return campos or None
+
+
+def hash_dados(X):
+    """Hash (hex) do conteúdo de uma matriz de dados."""
+    h = hashlib.sha256()
+    _atualizar_hash(h, np.asarray(X))
+    return h.hexdigest()
+
+
+class CacheResultados:
+    """
+    Cache de resultados em 'diretorio', limitado a 'limite_mb' megabytes.
+
+    Uso:
+
+        cache = CacheResultados("./cache")
+        chave = cache.chave(hash_dados(X), algoritmo, entrada)
+        resultado = cache.obter(chave)  # None se não estiver no cache
+        ...
+        cache.guardar(chave, resultado)
+    """
+
+    def __init__(self, diretorio, limite_mb=512):
+        self.diretorio = diretorio
+        self.limite_mb = limite_mb
+        os.makedirs(diretorio, exist_ok=True)
+
+    def _caminho(self, chave):
+        return os.path.join(self.diretorio, f"{chave}.npz")
+
+    def chave(self, hash_X, algoritmo, entrada=None):
+        """Chave do par (dados, algoritmo com parâmetros, entrada)."""
+        h = hashlib.sha256()
+        _atualizar_hash(h, VERSAO_FORMATO)
+        _atualizar_hash(h, hash_X)
+        _atualizar_hash(h, algoritmo)
+        if entrada is not None:
+            _atualizar_hash(h, entrada)
+        return h.hexdigest()
+
+    def obter(self, chave):
+        """Resultado guardado (no formato do escalonador) ou None."""
+        caminho = self._caminho(chave)
+        try:
+            with np.load(caminho) as arquivo:
+                resultado = {
+                    "status": "ok",
+                    "labels": arquivo["labels"],
+                    "centers": arquivo["centers"] if "centers" in arquivo else None,
+                    "linkage": arquivo["linkage"] if "linkage" in arquivo else None,
+                    "tempo": float(arquivo["tempo"]),
+                    "pico_mb": (
+                        float(arquivo["pico_mb"]) if "pico_mb" in arquivo else None
+                    ),
+                    "dtype": str(arquivo["dtype"]) if "dtype" in arquivo else None,
+                    "etapas": _ler_prefixados(arquivo, "etapas_"),
+                    "parametros": _ler_prefixados(arquivo, "parametros_"),
+                }
+        except (OSError, KeyError, ValueError):
+            return None
+        os.utime(caminho)  # marca como usado recentemente (LRU)
+        return resultado
+
+    def guardar(self, chave, resultado):
+        """Guarda um resultado com status "ok" e aplica o limite de tamanho."""
+        if resultado["status"] != "ok":
+            return  # timeout/oom/erro dependem da máquina: não são guardados
+        campos = {
+            "labels": np.asarray(resultado["labels"], dtype=np.int32),
+            "tempo": resultado["tempo"],
+        }
+        if resultado.get("centers") is not None:
+            campos["centers"] = np.asarray(resultado["centers"])
+        if resultado.get("linkage") is not None:
+            campos["linkage"] = np.asarray(resultado["linkage"])
+        if resultado.get("pico_mb") is not None:
+            campos["pico_mb"] = resultado["pico_mb"]
+        if resultado.get("dtype") is not None:
+            campos["dtype"] = resultado["dtype"]
+        for prefixo in ("etapas", "parametros"):
+            for nome, valor in (resultado.get(prefixo) or {}).items():
+                campos[f"{prefixo}_{nome}"] = valor
+        # Grava num temporário e renomeia, para nunca deixar um .npz pela metade
+        temporario = self._caminho(chave) + ".tmp"
+        with open(temporario, "wb") as f:
+            np.savez_compressed(f, **campos)
+        os.replace(temporario, self._caminho(chave))
+        self.aplicar_limite()
+
+    def aplicar_limite(self):
+        """Apaga os resultados usados há mais tempo até caber em 'limite_mb'."""
+        arquivos = []
+        for nome in os.listdir(self.diretorio):
+            if nome.endswith(".npz"):
+                info = os.stat(os.path.join(self.diretorio, nome))
+                arquivos.append((info.st_mtime, info.st_size, nome))
+        total = sum(tamanho for _, tamanho, _ in arquivos)
+        limite = self.limite_mb * 1024 * 1024
+        for _, tamanho, nome in sorted(arquivos):
+            if total <= limite:
+                break
+            os.remove(os.path.join(self.diretorio, nome))
+            total -= tamanho
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Agrupamento de consenso entre os algoritmos (acúmulo de evidências).
+
+A matriz de co-associação guarda, para cada par de pontos, a fração dos
+agrupamentos que colocam os dois no mesmo cluster (Fred e Jain, 2005).
+Densa, ela é n × n; aqui só são avaliados os pares candidatos do índice
+de vizinhança (cada ponto com seus k vizinhos mais próximos), que são os
+únicos pares capazes de ligar um cluster. A co-associação custa
+O(n · k · m) para m agrupamentos, e a matriz fica esparsa (n × k).
+
+O consenso é a ligação média sobre 1 - co-associação, com fusões só
+entre clusters ligados por arestas do grafo kNN. A co-associação média
+entre dois clusters A e B, sobre todos os |A|·|B| pares, não precisa da
+matriz densa: é Σ |A ∩ c|·|B ∩ c| / (m·|A|·|B|), somando sobre os
+clusters c de cada um dos m agrupamentos, e cada cluster guarda só o
+histograma dos seus rótulos. Dois clusters se juntam se a média passa
+do limiar (0.5): a maioria dos algoritmos os junta na média, não numa
+única aresta. (As componentes conexas das arestas acima do limiar, uma
+ligação simples, encadeiam clusters que se tocam por poucos pontos.)
+As fusões são feitas em rodadas: cada cluster aponta para o vizinho de
+maior co-associação média, e os pares que apontam um para o outro se
+fundem (vizinhos mais próximos recíprocos, a mesma ordem de fusões do
+algoritmo guloso para a ligação média). Clusters pequenos demais viram
+ruído (-1).
+
+A ligação custa mais que a co-associação: cada rodada avalia até n · k
+pares de clusters, cada par pelo produto de dois histogramas, que têm m
+entradas por cluster no início e até K (total de clusters dos m
+agrupamentos) nos clusters grandes. São O(n · k · K) por rodada e
+O(R · n · k · K) no total. O número de rodadas R é pequeno em geral
+(13 a 15 em blobs de 5 mil a 50 mil pontos), mas chega a O(n) numa
+cadeia de fusões.
+
+A estabilidade de cada ponto é a concordância média entre os algoritmos
+e o consenso na vizinhança do ponto: para cada vizinho, a fração dos
+algoritmos que concorda com a decisão do consenso (juntos ou separados).
+Vai de 0 (algoritmos divididos) a 1 (todos concordam com o consenso).
+
+'salvar_consenso' grava o resumo (ARI do consenso contra cada algoritmo)
+e o rótulo e a estabilidade de cada ponto.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+
+from metricas import ari_entre_pares
+
+# Pares de clusters avaliados por vez (limita a memória dos histogramas)
+_PARES_POR_BLOCO = 1 << 18
+
+
+def coassociacao_knn(rotulos, vizinhos):
+    """
+    Co-associação de cada ponto com cada um de seus vizinhos: matriz
+    (n, k) com a fração dos agrupamentos em 'rotulos' (lista de vetores)
+    em que os dois caem no mesmo cluster. Ruído (-1) nunca conta como
+    mesmo cluster. 'vizinhos' é a matriz (n, k) de índices.
+    """
+    contagens = np.zeros(vizinhos.shape, dtype=np.uint16)
+    for labels in rotulos:
+        labels = np.asarray(labels)
+        proprio = labels[:, None]
+        contagens += (proprio == labels[vizinhos]) & (proprio != -1)
+    return contagens / np.float32(len(rotulos))
+
+
+def _histogramas(rotulos):
+    """
+    Matriz esparsa (n, total de clusters dos agrupamentos) com 1 na
+    coluna do cluster de cada ponto em cada agrupamento. Ruído (-1) fica
+    fora, como na co-associação.
+    """
+    linhas, colunas = [], []
+    deslocamento = 0
+    for labels in rotulos:
+        labels = np.asarray(labels)
+        validos = np.flatnonzero(labels != -1)
+        _, codigo = np.unique(labels[validos], return_inverse=True)
+        linhas.append(validos)
+        colunas.append(codigo + deslocamento)
+        deslocamento += codigo.max() + 1 if len(codigo) else 0
+    linhas = np.concatenate(linhas)
+    return sp.csr_matrix(
+        (np.ones(len(linhas)), (linhas, np.concatenate(colunas))),
+        shape=(len(np.asarray(rotulos[0])), deslocamento),
+    )
+
+
+def _coassociacao_media(histogramas, tamanhos, a, b, m):
+    """
+    Co-associação média entre os clusters a[i] e b[i], sobre todos os
+    pares de pontos: produto dos histogramas / (m·|A|·|B|).
+    """
+    produto = np.empty(len(a))
+    for inicio in range(0, len(a), _PARES_POR_BLOCO):
+        bloco = slice(inicio, inicio + _PARES_POR_BLOCO)
+        produto[bloco] = np.asarray(
+            histogramas[a[bloco]].multiply(histogramas[b[bloco]]).sum(axis=1)
+        ).ravel()
+    return produto / (m * tamanhos[a] * tamanhos[b])
+
+
+def rotulos_consenso(rotulos, vizinhos, limiar=0.5, tamanho_minimo=5):
+    """
+    Ligação média da co-associação entre os agrupamentos de 'rotulos',
+    com fusões só entre clusters ligados pelo grafo kNN 'vizinhos' (n, k),
+    cortada em 'limiar': clusters se fundem enquanto a co-associação
+    média entre eles passa de 'limiar'. Clusters numerados do maior para
+    o menor; os com menos de 'tamanho_minimo' pontos viram ruído (-1).
+    """
+    n, k = vizinhos.shape
+    histogramas = _histogramas(rotulos)
+    tamanhos = np.ones(n)
+    cluster = np.arange(n)
+    a = np.repeat(np.arange(n), k)
+    b = vizinhos.ravel().astype(np.int64)
+    while True:
+        # Pares (a < b) de clusters distintos ligados por alguma aresta
+        a, b = np.minimum(a, b), np.maximum(a, b)
+        fora = a != b
+        a, b = np.divmod(np.unique(a[fora].astype(np.int64) * n + b[fora]), n)
+        media = _coassociacao_media(histogramas, tamanhos, a, b, len(rotulos))
+        candidatos = media > limiar
+        if not candidatos.any():
+            break
+        a, b, media = a[candidatos], b[candidatos], media[candidatos]
+        # Cada cluster aponta para o vizinho de maior média (empates para
+        # o de menor id). Pares recíprocos se fundem, como na ligação média
+        # gulosa; além deles, um cluster que é a melhor opção de outros
+        # (a média é também o máximo do alvo) recebe todos de uma vez, o
+        # que evita uma rodada por fusão em empates (ex.: ruído de um só
+        # algoritmo em volta de um cluster grande). Quem recebe não doa.
+        origem = np.concatenate([a, b])
+        destino = np.concatenate([b, a])
+        valor = np.concatenate([media, media])
+        ordem = np.lexsort((destino, -valor, origem))
+        primeira = np.ones(len(ordem), dtype=bool)
+        primeira[1:] = np.diff(origem[ordem]) != 0
+        ids = origem[ordem[primeira]]
+        melhor = np.full(n, -1)
+        melhor[ids] = destino[ordem[primeira]]
+        maximo = np.zeros(n)
+        maximo[ids] = valor[ordem[primeira]]
+        recebe = np.zeros(n, dtype=bool)
+        recebe[melhor[ids][maximo[ids] == maximo[melhor[ids]]]] = True
+        reciproco = melhor[melhor[ids]] == ids
+        doa = (maximo[ids] == maximo[melhor[ids]]) & (~recebe[ids] | reciproco)
+        ligacoes = sp.csr_matrix(
+            (np.ones(doa.sum(), dtype=np.int8), (ids[doa], melhor[ids[doa]])),
+            shape=(n, n),
+        )
+        _, mapa = connected_components(ligacoes, directed=False)
+        fusao = sp.csr_matrix((np.ones(n), (mapa, np.arange(n))), shape=(n, n))
+        histogramas = (fusao @ histogramas).tocsr()
+        tamanhos = np.bincount(mapa, weights=tamanhos, minlength=n)
+        cluster = mapa[cluster]
+        a, b = mapa[a], mapa[b]
+
+    _, componente = np.unique(cluster, return_inverse=True)
+    tamanhos = np.bincount(componente)
+    ordem = np.argsort(-tamanhos, kind="stable")
+    novo_rotulo = np.full(len(tamanhos), -1)
+    grandes = tamanhos[ordem] >= tamanho_minimo
+    novo_rotulo[ordem[grandes]] = np.arange(grandes.sum())
+    return novo_rotulo[componente]
+
+
+def estabilidade_pontos(coassociacao, vizinhos, labels):
+    """
+    Concordância média (0 a 1) entre os algoritmos e o consenso 'labels'
+    nos pares (ponto, vizinho): co-associação se o consenso os junta,
+    1 - co-associação se os separa.
+    """
+    juntos = (labels[:, None] == labels[vizinhos]) & (labels[:, None] != -1)
+    return np.where(juntos, coassociacao, 1 - coassociacao).mean(axis=1)
+
+
+def agrupamento_consenso(
+    rotulos, vizinhos, n_vizinhos=15, limiar=0.5, tamanho_minimo=5
+):
+    """
+    Consenso entre os agrupamentos de 'rotulos' usando os 'n_vizinhos'
+    primeiros vizinhos de cada ponto (matriz de índices do índice de
+    vizinhança, sem o próprio ponto). Retorna (labels, estabilidade).
+    """
+    vizinhos = np.asarray(vizinhos)[:, :n_vizinhos]
+    coassociacao = coassociacao_knn(rotulos, vizinhos)
+    labels = rotulos_consenso(rotulos, vizinhos, limiar, tamanho_minimo)
+    return labels, estabilidade_pontos(coassociacao, vizinhos, labels)
+
+
+def salvar_consenso(
+    rotulos,
+    vizinhos,
+    nome_conjunto,
+    diretorio,
+    prefixo,
+    y_verdadeiro=None,
+    n_vizinhos=15,
+    limiar=0.5,
+    tamanho_minimo=5,
+):
+    """
+    Consenso entre os agrupamentos de 'rotulos' ({nome: labels}). Salva
+    em 'diretorio' um resumo com o ARI do consenso contra cada algoritmo
+    em TXT e o rótulo e a estabilidade de cada ponto em CSV. Retorna
+    (labels, title) para o gráfico, ou None sem agrupamentos.
+    """
+    if not rotulos:
+        return None
+    print(f"  Calculando o consenso entre {len(rotulos)} algoritmos...")
+    labels, estabilidade = agrupamento_consenso(
+        list(rotulos.values()),
+        vizinhos,
+        n_vizinhos=n_vizinhos,
+        limiar=limiar,
+        tamanho_minimo=tamanho_minimo,
+    )
+    n_clusters = int(labels.max()) + 1
+    ari = ari_entre_pares([labels] + list(rotulos.values()))[0, 1:]
+
+    resumo_path = os.path.join(diretorio, f"{prefixo}_consenso.txt")
+    with open(resumo_path, "w", encoding="utf-8") as f:
+        f.write(
+            f"Consenso de {len(rotulos)} algoritmos "
+            f"({n_vizinhos} vizinhos por ponto, limiar {limiar})\n"
+        )
+        f.write(f"Clusters: {n_clusters}\n")
+        f.write(f"Ruído (%): {100 * np.mean(labels == -1):.2f}\n")
+        f.write(
+            f"Estabilidade: média {estabilidade.mean():.3f}, "
+            f"p10 {np.quantile(estabilidade, 0.1):.3f}, "
+            f"mediana {np.median(estabilidade):.3f}\n"
+        )
+        if y_verdadeiro is not None:
+            ari_real = ari_entre_pares([labels, y_verdadeiro])[0, 1]
+            f.write(f"ARI com o rótulo real: {ari_real:.3f}\n")
+        ari_df = pd.DataFrame({"ARI com o consenso": ari.round(3)}, index=list(rotulos))
+        ari_df.index.name = "Algoritmo"
+        f.write("\n" + ari_df.to_string())
+    pd.DataFrame({"rotulo": labels, "estabilidade": estabilidade.round(4)}).to_csv(
+        os.path.join(diretorio, f"{prefixo}_consenso.csv"), index=False
+    )
+    print(f"  Consenso ({n_clusters} clusters) salvo em: {resumo_path}")
+
+    title = (
+        f"Consenso - {nome_conjunto}\n(k={n_clusters} clusters, "
+        f"estabilidade média {estabilidade.mean():.2f})"
+    )
+    return labels, title
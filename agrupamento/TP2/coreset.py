@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+"""
+Coreset para rodar os algoritmos super-lineares em conjuntos enormes.
+
+Em vez dos n pontos, o algoritmo recebe alguns milhares de
+representantes sorteados por importância, cada um com um peso (quantos
+pontos ele representa). A probabilidade de sorteio segue a sensibilidade
+do ponto em relação a uma solução aproximada (as sementes do k-means++,
+O(n·k·d)):
+
+    s(x) = d(x, B)² / custo(B) + 1 / |cluster de x em B|
+
+misturada meio a meio com a amostragem uniforme, como nos "lightweight
+coresets" (Bachem et al., 2018). A parte da sensibilidade garante
+representantes em clusters pequenos e nas bordas; a parte uniforme
+limita a variância dos pesos. O sorteio é com reposição, e o peso de cada representante é
+(número de vezes sorteado) / (m · q(x)), de modo que a soma dos pesos
+estima n.
+
+O sorteio por sensibilidade concentra representantes onde d² é alto, e
+só os pesos corrigem essa distorção. Para algoritmos que não aceitam
+'sample_weight' (OPTICS, MeanShift, Ward...), os pesos se perderiam e a
+densidade vista seria a errada; eles recebem uma amostra uniforme sem
+reposição ('uniforme=True'), que mantém a densidade dos dados.
+
+Os rótulos do coreset são estendidos a todos os pontos pelo
+representante mais próximo (consulta numa KD-tree/Ball-tree do coreset).
+'salvar_relatorio_coreset' compara cada algoritmo no coreset com a sua
+execução nos dados completos.
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import kmeans_plusplus
+from sklearn.metrics import pairwise_distances_argmin_min
+from sklearn.neighbors import NearestNeighbors
+
+from metricas import ari_entre_pares, avaliar_em_paralelo
+
+
+def construir_coreset(X, tamanho, k, random_state=0, uniforme=False):
+    """
+    Sorteia um coreset de até 'tamanho' pontos de X (menos, se houver
+    repetições no sorteio). Retorna (indices, pesos), com os índices em
+    ordem crescente.
+
+    Com uniforme=True, sorteia 'tamanho' pontos distintos com a mesma
+    probabilidade, todos com peso n / tamanho ('k' não é usado).
+    """
+    n = X.shape[0]
+    rng = np.random.default_rng(random_state)
+    if uniforme:
+        indices = np.sort(rng.choice(n, size=min(tamanho, n), replace=False))
+        return indices, np.full(len(indices), n / len(indices))
+    centros, _ = kmeans_plusplus(X, n_clusters=k, random_state=random_state)
+    rotulo, distancia = pairwise_distances_argmin_min(X, centros)
+    d2 = distancia.astype(np.float64) ** 2
+    tamanhos = np.bincount(rotulo, minlength=k)
+    custo = d2.sum()
+    sensibilidade = 1.0 / tamanhos[rotulo]
+    if custo > 0:
+        sensibilidade = sensibilidade + d2 / custo
+    q = 0.5 / n + 0.5 * sensibilidade / sensibilidade.sum()
+
+    sorteados = rng.choice(n, size=tamanho, replace=True, p=q)
+    indices, contagens = np.unique(sorteados, return_counts=True)
+    pesos = contagens / (tamanho * q[indices])
+    return indices, pesos
+
+
+def representante_mais_proximo(X, X_coreset, n_jobs=-1):
+    """Índice, dentro do coreset, do representante mais próximo de cada ponto."""
+    nn = NearestNeighbors(n_neighbors=1, n_jobs=n_jobs).fit(X_coreset)
+    return nn.kneighbors(X, return_distance=False)[:, 0].astype(np.int32)
+
+
+def salvar_relatorio_coreset(
+    X, coreset, algoritmos, resultados, diretorio, prefixo, tempo_limite=None
+):
+    """
+    Compara cada algoritmo rodado no coreset com a sua execução nos dados
+    completos (resultado '<nome_arquivo>_completo', do cache ou de uma
+    execução de referência): aceleração, ARI entre os dois agrupamentos e
+    silhueta de cada um. Um completo que estourou 'tempo_limite' dá um
+    limite inferior da aceleração. Salva a tabela em TXT em 'diretorio'.
+    """
+    tabela, rotulos = [], {}
+    for nome_amigavel, nome_arquivo, _ in algoritmos:
+        if nome_arquivo not in coreset["algoritmos"]:
+            continue
+        reduzido = resultados[nome_arquivo]
+        completo = resultados.get(f"{nome_arquivo}_completo")
+        linha = {
+            "Algoritmo": nome_amigavel,
+            "Amostra": (
+                "sensibilidade (pesos)"
+                if coreset["pesos"][nome_arquivo] is not None
+                else "uniforme"
+            ),
+            "Tempo coreset (s)": round(reduzido["tempo"], 3),
+            "Tempo completo (s)": "",
+            "Aceleração": "",
+            "ARI vs completo": np.nan,
+            "Completo": "não executado" if completo is None else completo["status"],
+        }
+        if completo is not None and completo.get("cache"):
+            linha["Completo"] = "cache"
+        if reduzido["status"] == "ok":
+            rotulos[f"{nome_amigavel} (coreset)"] = reduzido["labels"]
+        if completo is not None and completo["status"] == "timeout":
+            # O completo não terminou: a aceleração é pelo menos esta
+            linha["Tempo completo (s)"] = f"> {tempo_limite}"
+            linha["Aceleração"] = (
+                f"> {tempo_limite / max(reduzido['tempo'], 1e-3):.1f}x"
+            )
+        elif completo is not None and completo["status"] == "ok":
+            rotulos[f"{nome_amigavel} (completo)"] = completo["labels"]
+            linha["Tempo completo (s)"] = f"{completo['tempo']:.3f}"
+            linha["Aceleração"] = (
+                f"{completo['tempo'] / max(reduzido['tempo'], 1e-3):.1f}x"
+            )
+            if reduzido["status"] == "ok":
+                linha["ARI vs completo"] = ari_entre_pares(
+                    [reduzido["labels"], completo["labels"]]
+                )[0, 1].round(3)
+        tabela.append(linha)
+
+    metricas = avaliar_em_paralelo(X, rotulos)
+    for linha in tabela:
+        for versao in ("coreset", "completo"):
+            chave = f"{linha['Algoritmo']} ({versao})"
+            linha[f"Silhueta {versao}"] = (
+                round(metricas[chave]["Silhueta"], 4) if chave in metricas else np.nan
+            )
+
+    n = X.shape[0]
+    relatorio_path = os.path.join(diretorio, f"{prefixo}_coreset.txt")
+    with open(relatorio_path, "w", encoding="utf-8") as f:
+        for amostragem, amostra in coreset["amostras"].items():
+            f.write(
+                f"Amostra {amostragem}: {len(amostra['indices'])} representantes "
+                f"de {n} pontos (soma dos pesos {amostra['pesos'].sum():.0f})\n"
+            )
+        f.write(
+            f"Preparo em {coreset['tempo']:.2f}s "
+            "(sorteio, índice de vizinhança e representante mais próximo)\n"
+        )
+        f.write(
+            "Dados completos: resultados do cache ou da execução com "
+            "--coreset-referencia\n\n"
+        )
+        f.write(pd.DataFrame(tabela).set_index("Algoritmo").to_string(line_width=140))
+    print(f"  Relatório do coreset salvo em: {relatorio_path}")
@@ -0,0 +1,247 @@
+# -*- coding: utf-8 -*-
+"""
+Varredura do Método do Cotovelo (WSS para k = 1..K) em paralelo.
+
+Cada k é ajustado com 'n_init' inicializações:
+  - 1 inicialização "aquecida": os centróides do melhor modelo de k-1
+    mais um novo centro sorteado à moda k-means++ (proporcional a D²);
+  - 'n_init - 1' inicializações k-means++ independentes.
+
+As tarefas são distribuídas num pool de processos que lê X_scaled de
+memória compartilhada (ver 'paralelo.py'). O melhor modelo de cada k é
+devolvido já ajustado, para que o K-Means com k_ideal não seja refeito.
+
+O joelho da curva é detectado automaticamente: durante a varredura por
+uma regra de ganho relativo ('confirmar_joelho'), que permite parar
+antes de k=K; e, se ela não confirmar nenhum k, pelo Kneedle sobre a
+curva completa ('detectar_joelho').
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+from sklearn.cluster import KMeans
+from threadpoolctl import threadpool_limits
+
+from paralelo import (
+    array_compartilhado,
+    array_do_worker,
+    inicializar_worker,
+    numero_de_workers,
+)
+
+
+def _sortear_centro_adicional(X, centros, rng):
+    """
+    Sorteia um novo centro com probabilidade proporcional à distância²
+    até o centro mais próximo (um passo do k-means++).
+    """
+    d2 = np.full(X.shape[0], np.inf)
+    for c in centros:
+        np.minimum(d2, ((X - c) ** 2).sum(axis=1), out=d2)
+    total = d2.sum()
+    if not np.isfinite(total) or total <= 0:
+        idx = rng.integers(X.shape[0])
+    else:
+        idx = rng.choice(X.shape[0], p=d2 / total)
+    return np.vstack([centros, X[idx]])
+
+
+def _ajustar_kmeans(k, centros_anteriores, seed, max_iter):
+    """
+    Tarefa executada no worker. Com 'centros_anteriores' faz a inicialização
+    aquecida; sem eles usa k-means++ comum.
+    """
+    X = array_do_worker()
+    if centros_anteriores is None:
+        init = "k-means++"
+    else:
+        rng = np.random.default_rng(seed)
+        init = _sortear_centro_adicional(X, centros_anteriores, rng).astype(
+            X.dtype, copy=False
+        )
+    modelo = KMeans(
+        n_clusters=k, init=init, n_init=1, max_iter=max_iter, random_state=seed
+    )
+    # Já há um worker por CPU: as threads OpenMP/BLAS de cada ajuste só
+    # disputariam os mesmos núcleos
+    with threadpool_limits(limits=1):
+        modelo.fit(X)
+    # Os rótulos (n inteiros) não voltam para o processo principal:
+    # só o modelo escolhido precisa deles, e 'predict' os recupera.
+    del modelo.labels_
+    return k, modelo
+
+
+def detectar_joelho(ks, wss, sensibilidade=1.0):
+    """
+    Detecta o joelho de uma curva decrescente e convexa (WSS por k) pelo
+    método Kneedle (Satopää et al., 2011), aplicado a log(WSS).
+
+    O log mede a redução relativa a cada k; sem ele a enorme queda de
+    k=1 para k=2 domina a normalização e o joelho tende a sair em k=2.
+    As duas coordenadas são normalizadas para [0, 1] e a curva de diferença
+    é (1 - x) - y: a distância vertical até a reta que liga o primeiro ao
+    último ponto. Um máximo local dessa curva é um joelho confirmado quando,
+    depois dele, a diferença cai abaixo de 'max - sensibilidade * média(Δx)'
+    antes de surgir outro máximo maior.
+
+    Retorna (k_joelho, confirmado). Se nenhum máximo for confirmado,
+    devolve o máximo global da curva de diferença com confirmado=False.
+    """
+    ks = np.asarray(ks, dtype=float)
+    log_wss = np.log(np.maximum(np.asarray(wss, dtype=float), np.finfo(float).tiny))
+    if len(ks) < 3 or log_wss.max() == log_wss.min():
+        return None, False
+
+    x = (ks - ks.min()) / (ks.max() - ks.min())
+    y = (log_wss - log_wss.min()) / (log_wss.max() - log_wss.min())
+    diferenca = (1 - x) - y
+    limiar_passo = sensibilidade * np.mean(np.diff(x))
+
+    for j in range(1, len(ks) - 1):
+        if not (diferenca[j] >= diferenca[j - 1] and diferenca[j] > diferenca[j + 1]):
+            continue
+        limiar = diferenca[j] - limiar_passo
+        for i in range(j + 1, len(ks)):
+            if diferenca[i] > diferenca[j]:
+                break  # apareceu um máximo maior antes de confirmar
+            if diferenca[i] < limiar:
+                return int(ks[j]), True
+
+    return int(ks[np.argmax(diferenca)]), False
+
+
+def confirmar_joelho(wss, fator=0.25, paciencia=2):
+    """
+    Regra online de parada para a varredura, que só olha os k já avaliados
+    (wss[0] é o WSS de k=1).
+
+    O ganho de cada k é a redução relativa g_k = log(WSS_{k-1} / WSS_k).
+    O joelho é o menor k tal que os 'paciencia' ganhos seguintes são todos
+    menores que 'fator' vezes o ganho médio de 2..k, isto é, a curva ficou
+    plana depois de k. Como a regra não depende dos k ainda não avaliados,
+    um joelho confirmado não muda com o resto da varredura.
+
+    Retorna o k do joelho, ou None se ainda não há confirmação.
+    """
+    log_wss = np.log(np.maximum(np.asarray(wss, dtype=float), np.finfo(float).tiny))
+    ganhos = -np.diff(log_wss)  # ganhos[i] = g_{i+2}
+    for k in range(2, len(wss) - paciencia + 1):
+        media = ganhos[: k - 1].mean()
+        seguintes = ganhos[k - 1 : k - 1 + paciencia]
+        if media > 0 and np.all(seguintes < fator * media):
+            return k
+    return None
+
+
+def varrer_cotovelo(
+    X,
+    k_max=10,
+    n_init=10,
+    random_state=42,
+    max_iter=300,
+    n_jobs=None,
+    parar_no_joelho=True,
+    paciencia=2,
+):
+    """
+    Ajusta K-Means para k = 1..k_max em paralelo e detecta o joelho.
+
+    Com 'parar_no_joelho', a varredura termina assim que 'confirmar_joelho'
+    aceita um joelho (a curva ficou plana por 'paciencia' valores de k);
+    os k maiores não são ajustados (só as tarefas já em execução terminam).
+
+    Retorna (K_range, wss, modelos, k_joelho): K_range contém só os k
+    efetivamente avaliados e 'modelos[k]' é o melhor KMeans (menor inertia)
+    encontrado para aquele k. Os modelos não trazem 'labels_'; use
+    'modelo.predict(X)' para obtê-los. 'k_joelho' é None se a curva não
+    tiver joelho (ex.: menos de 3 pontos).
+    """
+    K_range = list(range(1, k_max + 1))
+    rng = np.random.default_rng(random_state)
+
+    # Inicializações frias: k=1 é determinístico, então basta uma,
+    # e os demais recebem também a inicialização aquecida ('+ 1').
+    # A fila segue a ordem de k, para que a parada antecipada economize
+    # justamente os k maiores.
+    pendentes_frias = []
+    faltando = {}
+    for k in K_range:
+        n_frias = 1 if k == 1 else max(0, n_init - 1)
+        for _ in range(n_frias):
+            pendentes_frias.append((k, None, int(rng.integers(2**31 - 1))))
+        faltando[k] = n_frias if k == 1 else n_frias + 1
+
+    melhores = {}
+    aquecidas_prontas = []  # (k, centros_anteriores, seed)
+    n_workers = numero_de_workers(n_jobs)
+    k_concluido = 0  # todos os k <= k_concluido já terminaram
+    k_confirmado = None
+    parar = False
+
+    with array_compartilhado(X) as descritor:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=inicializar_worker,
+            initargs=(descritor,),
+        ) as pool:
+            em_execucao = set()
+
+            def preencher():
+                # Prioridade às inicializações aquecidas (elas destravam o próximo k)
+                while (
+                    not parar
+                    and len(em_execucao) < n_workers
+                    and (aquecidas_prontas or pendentes_frias)
+                ):
+                    fila = aquecidas_prontas if aquecidas_prontas else pendentes_frias
+                    k, centros, seed = fila.pop(0)
+                    em_execucao.add(
+                        pool.submit(_ajustar_kmeans, k, centros, seed, max_iter)
+                    )
+
+            preencher()
+            while em_execucao:
+                concluidas, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+                for futuro in concluidas:
+                    em_execucao.discard(futuro)
+                    k, modelo = futuro.result()
+                    if k not in melhores or modelo.inertia_ < melhores[k].inertia_:
+                        melhores[k] = modelo
+                    faltando[k] -= 1
+                    if faltando[k] == 0 and k + 1 <= k_max:
+                        aquecidas_prontas.append(
+                            (
+                                k + 1,
+                                melhores[k].cluster_centers_,
+                                int(rng.integers(2**31 - 1)),
+                            )
+                        )
+
+                # Avança o prefixo de k concluídos e testa o joelho a cada novo k
+                while (
+                    parar_no_joelho
+                    and not parar
+                    and k_concluido < k_max
+                    and faltando[k_concluido + 1] == 0
+                ):
+                    k_concluido += 1
+                    k_confirmado = confirmar_joelho(
+                        [melhores[k].inertia_ for k in range(1, k_concluido + 1)],
+                        paciencia=paciencia,
+                    )
+                    if k_confirmado is not None:
+                        parar = True
+                preencher()
+
+    if parar:
+        K_range = list(range(1, k_concluido + 1))
+    wss = [melhores[k].inertia_ for k in K_range]
+    if k_confirmado is not None:
+        k_joelho = k_confirmado
+    else:
+        # Sem confirmação online: Kneedle sobre a curva completa
+        k_joelho, _ = detectar_joelho(K_range, wss)
+    melhores = {k: melhores[k] for k in K_range}
+    return K_range, wss, melhores, k_joelho
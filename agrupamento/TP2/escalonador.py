@@ -0,0 +1,288 @@
+# -*- coding: utf-8 -*-
+"""
+Escalonador que executa vários algoritmos de clusterização ao mesmo tempo,
+cada um em seu próprio processo, com orçamento de tempo (wall-clock) e de
+memória por algoritmo.
+
+O processo principal acompanha os filhos: quem passar do tempo limite ou
+do limite de memória (RSS acima do que havia no início do processo) é
+encerrado e marcado como "timeout" ou "oom". Os dados X ficam em memória
+compartilhada (ver 'paralelo.py'), então cada filho não recebe uma cópia.
+
+O limite de memória é medido via /proc (Linux). Em sistemas sem /proc,
+apenas o limite de tempo é aplicado.
+"""
+
+import multiprocessing as mp
+import os
+import time
+import traceback
+from multiprocessing.connection import wait
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.utils.validation import has_fit_parameter
+from threadpoolctl import threadpool_limits
+
+from hierarquico import matriz_ligacao
+from paralelo import anexar_array, array_compartilhado, numero_de_workers
+
+# Intervalo (s) entre verificações de tempo/memória dos processos filhos
+INTERVALO_MONITORAMENTO = 0.05
+
+
+def _ler_status_mb(pid, campo):
+    """
+    Lê um campo de memória (ex.: 'VmRSS', 'VmHWM') de /proc/<pid>/status, em MB.
+    Retorna None se a informação não estiver disponível.
+    """
+    try:
+        with open(f"/proc/{pid}/status", encoding="ascii") as f:
+            for linha in f:
+                if linha.startswith(campo + ":"):
+                    return int(linha.split()[1]) / 1024.0
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def memoria_disponivel_mb():
+    """
+    Memória disponível no sistema ('MemAvailable' de /proc/meminfo), em MB.
+    Retorna None se a informação não estiver disponível.
+    """
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for linha in f:
+                if linha.startswith("MemAvailable:"):
+                    return int(linha.split()[1]) / 1024.0
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def _ajustar(algoritmo, X, peso=None):
+    """
+    Ajusta o algoritmo e devolve os rótulos (GMM não tem 'fit_predict').
+    'peso' (pesos por amostra, ex.: de um coreset) só é passado aos
+    algoritmos que aceitam 'sample_weight'.
+    """
+    argumentos = {}
+    if peso is not None and has_fit_parameter(algoritmo, "sample_weight"):
+        argumentos["sample_weight"] = peso
+    if hasattr(algoritmo, "fit_predict"):
+        return algoritmo.fit_predict(X, **argumentos)
+    algoritmo.fit(X, **argumentos)
+    return algoritmo.predict(X)
+
+
+def _parametros_atribuicao(algoritmo):
+    """
+    Parâmetros ajustados que reproduzem o 'predict' do algoritmo no
+    modelo de atribuição: a mistura do GMM e os subclusters do BIRCH.
+    None nos demais algoritmos.
+    """
+    if hasattr(algoritmo, "covariances_"):
+        return {
+            "medias": algoritmo.means_,
+            "covariancias": algoritmo.covariances_,
+            "pesos": algoritmo.weights_,
+            "tipo_covariancia": algoritmo.covariance_type,
+        }
+    if hasattr(algoritmo, "subcluster_centers_"):
+        return {
+            "centros": algoritmo.subcluster_centers_,
+            "rotulos": algoritmo.subcluster_labels_,
+        }
+    return None
+
+
+def _dtype_interno(algoritmo):
+    """
+    Maior precisão de ponto flutuante entre os atributos ajustados que são
+    matrizes (centros, médias, covariâncias, afinidades...). Se for maior
+    que a dos dados, o algoritmo os converteu por dentro (ex.: float32 ->
+    float64). None se o algoritmo não guarda nenhuma matriz desse tipo.
+    """
+    tipos = []
+    for nome, valor in vars(algoritmo).items():
+        if not nome.endswith("_") or nome.startswith("_"):
+            continue
+        if sp.issparse(valor):
+            valor = valor.data
+        elif not (isinstance(valor, np.ndarray) and valor.ndim >= 2):
+            continue
+        if np.issubdtype(valor.dtype, np.floating):
+            tipos.append(valor.dtype)
+    return str(np.result_type(*tipos)) if tipos else None
+
+
+def _executar_tarefa(conexao, descritor, algoritmo, entrada, peso, n_threads):
+    """
+    Corpo do processo filho: ajusta um algoritmo e envia o resultado pelo Pipe.
+    'entrada' é usada no lugar de X quando o algoritmo precisa de outro insumo.
+    """
+    rss_inicial = _ler_status_mb(os.getpid(), "VmRSS")
+    try:
+        if entrada is None:
+            # 'shm' precisa ficar referenciado enquanto 'entrada' for usada
+            shm, entrada = anexar_array(descritor)
+        with threadpool_limits(limits=n_threads):
+            inicio = time.perf_counter()
+            labels = _ajustar(algoritmo, entrada, peso)
+            tempo = time.perf_counter() - inicio
+
+        centers = getattr(algoritmo, "cluster_centers_", None)
+        # Árvore completa dos métodos hierárquicos (cortes em outros k)
+        linkage = None
+        if getattr(algoritmo, "distances_", None) is not None and hasattr(
+            algoritmo, "children_"
+        ):
+            linkage = matriz_ligacao(algoritmo.children_, algoritmo.distances_)
+        pico = _ler_status_mb(os.getpid(), "VmHWM")
+        pico_mb = None
+        if pico is not None and rss_inicial is not None:
+            pico_mb = max(0.0, pico - rss_inicial)
+        conexao.send(
+            {
+                "status": "ok",
+                "labels": np.asarray(labels, dtype=np.int32),
+                "centers": None if centers is None else np.asarray(centers),
+                "tempo": tempo,
+                "pico_mb": pico_mb,
+                "dtype": _dtype_interno(algoritmo),
+                "linkage": linkage,
+                # Tempo por etapa, para os algoritmos que o registram
+                "etapas": getattr(algoritmo, "etapas_", None),
+                "parametros": _parametros_atribuicao(algoritmo),
+            }
+        )
+    except MemoryError:
+        conexao.send({"status": "oom", "erro": "MemoryError"})
+    except Exception as e:
+        conexao.send(
+            {
+                "status": "erro",
+                "erro": f"{type(e).__name__}: {e}",
+                "detalhes": traceback.format_exc(),
+            }
+        )
+    finally:
+        conexao.close()
+
+
+def executar_com_orcamento(
+    tarefas,
+    X,
+    tempo_limite=None,
+    memoria_limite_mb=None,
+    n_jobs=None,
+    entradas=None,
+    ao_concluir=None,
+    pesos=None,
+):
+    """
+    Executa as tarefas [(chave, algoritmo), ...] em paralelo, respeitando
+    'tempo_limite' (segundos) e 'memoria_limite_mb' por algoritmo.
+
+    'entradas' opcional: {chave: objeto} usado no lugar de X para aquela
+    tarefa (por exemplo, um grafo esparso pré-calculado).
+
+    'pesos' opcional: {chave: pesos por amostra} passados como
+    'sample_weight' aos algoritmos que o aceitam.
+
+    'ao_concluir' opcional: função chamada como ao_concluir(chave, resultado)
+    assim que cada tarefa termina, enquanto as demais continuam rodando.
+
+    Retorna {chave: resultado}, onde resultado é um dicionário com
+    'status' ("ok", "timeout", "oom" ou "erro"), 'tempo' (s), 'pico_mb' e,
+    quando status == "ok", 'labels', 'centers', 'dtype' (precisão usada
+    internamente pelo algoritmo, ver '_dtype_interno'), 'linkage' (matriz
+    de ligação do scipy, só nos métodos hierárquicos com a árvore inteira),
+    'etapas' (tempo por etapa, quando o algoritmo registra) e 'parametros'
+    (o que o modelo de atribuição precisa, ver '_parametros_atribuicao').
+    """
+    entradas = entradas or {}
+    pesos = pesos or {}
+    n_workers = numero_de_workers(n_jobs)
+    n_threads = max(1, (os.cpu_count() or 1) // n_workers)
+    # 'fork' evita reimportar bibliotecas em cada filho; onde não existe,
+    # o padrão da plataforma ('spawn') também funciona.
+    metodos = mp.get_all_start_methods()
+    contexto = mp.get_context("fork" if "fork" in metodos else None)
+
+    resultados = {}
+    fila = list(tarefas)
+    ativos = {}  # conexao -> (chave, processo, inicio, rss_inicial, pico_mb)
+
+    with array_compartilhado(X) as descritor:
+        while fila or ativos:
+            while fila and len(ativos) < n_workers:
+                chave, algoritmo = fila.pop(0)
+                receptor, emissor = contexto.Pipe(duplex=False)
+                processo = contexto.Process(
+                    target=_executar_tarefa,
+                    args=(
+                        emissor,
+                        descritor,
+                        algoritmo,
+                        entradas.get(chave),
+                        pesos.get(chave),
+                        n_threads,
+                    ),
+                    daemon=True,
+                )
+                processo.start()
+                emissor.close()
+                rss_inicial = _ler_status_mb(processo.pid, "VmRSS")
+                ativos[receptor] = [
+                    chave,
+                    processo,
+                    time.perf_counter(),
+                    rss_inicial,
+                    0.0,
+                ]
+
+            prontos = wait(list(ativos), timeout=INTERVALO_MONITORAMENTO)
+            agora = time.perf_counter()
+
+            for conexao in list(ativos):
+                chave, processo, inicio, rss_inicial, pico_mb = ativos[conexao]
+                resultado = None
+
+                if conexao in prontos:
+                    try:
+                        resultado = conexao.recv()
+                    except EOFError:
+                        # O filho morreu sem responder (ex.: OOM killer do sistema)
+                        processo.join()
+                        resultado = {
+                            "status": "oom" if processo.exitcode == -9 else "erro",
+                            "erro": f"processo terminou com código {processo.exitcode}",
+                        }
+                else:
+                    rss = _ler_status_mb(processo.pid, "VmRSS")
+                    if rss is not None and rss_inicial is not None:
+                        pico_mb = max(pico_mb, rss - rss_inicial)
+                        ativos[conexao][4] = pico_mb
+                    if tempo_limite is not None and agora - inicio > tempo_limite:
+                        resultado = {"status": "timeout", "erro": "tempo esgotado"}
+                    elif memoria_limite_mb is not None and pico_mb > memoria_limite_mb:
+                        resultado = {"status": "oom", "erro": "memória excedida"}
+                    if resultado is not None:
+                        processo.terminate()
+
+                if resultado is None:
+                    continue
+
+                processo.join()
+                conexao.close()
+                del ativos[conexao]
+                resultado.setdefault("tempo", agora - inicio)
+                if resultado.get("pico_mb") is None:
+                    resultado["pico_mb"] = pico_mb
+                resultados[chave] = resultado
+                if ao_concluir is not None:
+                    ao_concluir(chave, resultado)
+
+    return resultados
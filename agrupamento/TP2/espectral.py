@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Spectral Clustering com o autossolver escolhido pelo tamanho dos dados.
+
+O 'SpectralClustering(affinity="nearest_neighbors")' do scikit-learn usa
+ARPACK no Laplaciano do grafo kNN. ARPACK (Lanczos com reinício) fica
+lento a partir de algumas dezenas de milhares de pontos. Os modos:
+
+  - "arpack" (n pequeno): o mesmo cálculo do scikit-learn, grafo kNN
+    simetrizado, 'spectral_embedding' com ARPACK, K-Means nos autovetores;
+  - "lobpcg" / "amg" (n médio): o mesmo Laplaciano esparso, resolvido por
+    LOBPCG (iterações em bloco, só produtos matriz-vetor esparsos). Com o
+    pacote opcional 'pyamg' instalado, o LOBPCG ganha um pré-condicionador
+    multigrid algébrico (modo "amg"), que reduz muito as iterações;
+  - "nystrom" (n grande): não monta o grafo. Sorteia m pontos de
+    referência ("marcos") e aproxima a matriz de afinidade gaussiana
+    n×n por C·A⁺·Cᵀ, com A = afinidades entre marcos (m×m) e C =
+    afinidades ponto-marco (n×m) (Fowlkes et al., 2004). Os graus e os
+    autovetores da afinidade normalizada saem de contas m×m; C é
+    calculada em blocos e nunca fica inteira na memória. O(n·m·d + n·m²).
+
+Com modo="auto" a escolha é por n ('limite_arpack', 'limite_nystrom').
+O tempo de cada etapa (afinidade, autovetores, K-Means) fica em
+'etapas_', junto com o modo usado.
+"""
+
+import importlib.util
+import time
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.linalg import eigh
+from sklearn.base import BaseEstimator, ClusterMixin
+from sklearn.cluster import k_means
+from sklearn.manifold import spectral_embedding
+from sklearn.metrics.pairwise import euclidean_distances
+from sklearn.neighbors import NearestNeighbors
+from sklearn.utils import check_random_state
+
+# O scikit-learn importa o 'pyamg' por conta própria quando eigen_solver="amg"
+AMG_DISPONIVEL = importlib.util.find_spec("pyamg") is not None
+
+# Linhas de C (afinidades ponto-marco) calculadas por vez no modo Nyström
+_LINHAS_POR_BLOCO = 8192
+
+
+def _afinidades_marcos(X, marcos, gamma, tempo):
+    """
+    Blocos (início, fim, exp(-gamma·d²)) das afinidades de X aos marcos.
+    Soma em tempo[0] o tempo gasto no cálculo dos blocos.
+    """
+    quadrados_marcos = (marcos.astype(np.float64) ** 2).sum(axis=1)
+    for inicio in range(0, X.shape[0], _LINHAS_POR_BLOCO):
+        relogio = time.perf_counter()
+        fim = min(inicio + _LINHAS_POR_BLOCO, X.shape[0])
+        d2 = euclidean_distances(
+            X[inicio:fim].astype(np.float64),
+            marcos,
+            Y_norm_squared=quadrados_marcos[None, :],
+            squared=True,
+        )
+        C = np.exp(-gamma * d2)
+        tempo[0] += time.perf_counter() - relogio
+        yield inicio, fim, C
+
+
+def _raiz_pseudo_inversa(A, tolerancia=1e-10):
+    """(A⁺, A⁺^(1/2)) de uma matriz simétrica semidefinida positiva."""
+    valores, vetores = eigh(A)
+    manter = valores > tolerancia * valores.max()
+    vetores = vetores[:, manter]
+    valores = valores[manter]
+    return (vetores / valores) @ vetores.T, (vetores / np.sqrt(valores)) @ vetores.T
+
+
+class SpectralEscalavel(ClusterMixin, BaseEstimator):
+    """
+    Spectral Clustering com autossolver ARPACK, LOBPCG/AMG ou Nyström.
+
+    Parâmetros:
+      - n_clusters: número de clusters (e de autovetores);
+      - n_neighbors: vizinhos do grafo kNN (modos de grafo) e escala da
+        gaussiana no Nyström (ver 'gamma');
+      - modo: "auto", "arpack", "lobpcg", "amg" ou "nystrom". "amg" sem o
+        'pyamg' instalado cai para "lobpcg";
+      - grafo_knn: grafo esparso de distâncias já calculado (ex.: o índice
+        de vizinhança compartilhado), usado nos modos de grafo no lugar de
+        uma nova busca kNN;
+      - limite_arpack, limite_nystrom: com modo="auto", ARPACK até
+        limite_arpack pontos, Nyström acima de limite_nystrom e LOBPCG/AMG
+        entre os dois;
+      - n_marcos: pontos de referência do Nyström;
+      - gamma: afinidade exp(-gamma·d²) do Nyström. Se None, usa
+        1 / (2σ²), com σ = mediana da distância de cada marco ao seu
+        n_neighbors-ésimo marco mais próximo;
+      - n_init, random_state: do K-Means final (e do sorteio dos marcos).
+    """
+
+    def __init__(
+        self,
+        n_clusters=8,
+        n_neighbors=10,
+        modo="auto",
+        grafo_knn=None,
+        limite_arpack=10_000,
+        limite_nystrom=100_000,
+        n_marcos=1000,
+        gamma=None,
+        n_init=10,
+        random_state=None,
+    ):
+        self.n_clusters = n_clusters
+        self.n_neighbors = n_neighbors
+        self.modo = modo
+        self.grafo_knn = grafo_knn
+        self.limite_arpack = limite_arpack
+        self.limite_nystrom = limite_nystrom
+        self.n_marcos = n_marcos
+        self.gamma = gamma
+        self.n_init = n_init
+        self.random_state = random_state
+
+    def _escolher_modo(self, n):
+        modo = self.modo
+        if modo == "auto":
+            if n <= self.limite_arpack:
+                modo = "arpack"
+            elif n <= self.limite_nystrom:
+                modo = "amg"
+            else:
+                modo = "nystrom"
+        if modo not in ("arpack", "lobpcg", "amg", "nystrom"):
+            raise ValueError(f"Modo espectral desconhecido: {self.modo!r}")
+        if modo == "amg" and not AMG_DISPONIVEL:
+            modo = "lobpcg"
+        return modo
+
+    def _afinidade_grafo(self, X):
+        """Grafo kNN de conectividade simetrizado, como no scikit-learn."""
+        if self.grafo_knn is not None:
+            conectividade = sp.csr_matrix(self.grafo_knn, copy=True)
+            conectividade.data[:] = 1.0
+        else:
+            nn = NearestNeighbors(n_neighbors=self.n_neighbors).fit(X)
+            conectividade = nn.kneighbors_graph(mode="connectivity")
+        return 0.5 * (conectividade + conectividade.T)
+
+    def _autovetores_nystrom(self, X, rng):
+        """
+        Autovetores (n × n_clusters, linhas normalizadas) da afinidade
+        normalizada D^(-1/2)·W·D^(-1/2), com W ≈ C·A⁺·Cᵀ.
+        Retorna (autovetores, tempo_afinidade, tempo_autovetores). Os
+        blocos de C são recalculados a cada passada; o tempo deles conta
+        como afinidade.
+        """
+        n = X.shape[0]
+        m = min(self.n_marcos, n)
+        marcos = X[np.sort(rng.choice(n, size=m, replace=False))].astype(np.float64)
+
+        inicio = time.perf_counter()
+        tempo_afinidade = [0.0]
+        d2_marcos = euclidean_distances(marcos, squared=True)
+        gamma = self.gamma
+        if gamma is None:
+            vizinho = min(self.n_neighbors, m - 1)
+            sigma2 = np.median(np.partition(d2_marcos, vizinho, axis=1)[:, vizinho])
+            gamma = 1.0 / (2.0 * sigma2) if sigma2 > 0 else 1.0
+        A = np.exp(-gamma * d2_marcos)
+        tempo_afinidade[0] += time.perf_counter() - inicio
+        A_pinv, A_pinv_raiz = _raiz_pseudo_inversa(A)
+        # 1ª passada: Cᵀ·1, para os graus d = C·A⁺·Cᵀ·1
+        soma_colunas = np.zeros(m)
+        for _, _, C in _afinidades_marcos(X, marcos, gamma, tempo_afinidade):
+            soma_colunas += C.sum(axis=0)
+        q = A_pinv @ soma_colunas
+
+        # 2ª passada: G = C̃ᵀ·C̃, com C̃ = D^(-1/2)·C
+        raiz_graus = np.empty(n)
+        G = np.zeros((m, m))
+        for i, j, C in _afinidades_marcos(X, marcos, gamma, tempo_afinidade):
+            raiz_graus[i:j] = np.sqrt(np.maximum(C @ q, np.finfo(np.float64).tiny))
+            C /= raiz_graus[i:j, None]
+            G += C.T @ C
+        # Autovetores de M = C̃·A⁺^(1/2): os de Mᵀ·M (m×m) levados a n linhas
+        valores, vetores = eigh(A_pinv_raiz @ G @ A_pinv_raiz)
+        topo = np.argsort(valores)[::-1][: self.n_clusters]
+        projecao = A_pinv_raiz @ (
+            vetores[:, topo] / np.sqrt(np.maximum(valores[topo], 1e-12))
+        )
+        # 3ª passada: U = C̃·projeção
+        U = np.empty((n, len(topo)))
+        for i, j, C in _afinidades_marcos(X, marcos, gamma, tempo_afinidade):
+            U[i:j] = (C / raiz_graus[i:j, None]) @ projecao
+        # Normalização das linhas (Ng, Jordan e Weiss)
+        U /= np.maximum(np.linalg.norm(U, axis=1, keepdims=True), 1e-12)
+        total = time.perf_counter() - inicio
+        return U, tempo_afinidade[0], total - tempo_afinidade[0]
+
+    def fit(self, X, y=None):
+        X = np.asarray(X)
+        rng = check_random_state(self.random_state)
+        self.modo_ = self._escolher_modo(X.shape[0])
+
+        if self.modo_ == "nystrom":
+            autovetores, tempo_afinidade, tempo_autovetores = self._autovetores_nystrom(
+                X, rng
+            )
+        else:
+            inicio = time.perf_counter()
+            afinidade = self._afinidade_grafo(X)
+            tempo_afinidade = time.perf_counter() - inicio
+            inicio = time.perf_counter()
+            autovetores = spectral_embedding(
+                afinidade,
+                n_components=self.n_clusters,
+                eigen_solver=self.modo_,
+                random_state=rng,
+                drop_first=False,
+            )
+            tempo_autovetores = time.perf_counter() - inicio
+
+        inicio = time.perf_counter()
+        _, self.labels_, _ = k_means(
+            autovetores, self.n_clusters, random_state=rng, n_init=self.n_init
+        )
+        self.etapas_ = {
+            "modo": self.modo_,
+            "afinidade": tempo_afinidade,
+            "autovetores": tempo_autovetores,
+            "kmeans": time.perf_counter() - inicio,
+        }
+        return self
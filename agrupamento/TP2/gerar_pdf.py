@@ -203,7 +203,10 @@ def gerar_pdf():
             f"3.{ALGORITMOS.index((nome_amigavel, nome_arquivo)) + 1}) {nome_amigavel}"
         )
         # Usamos a função interativa para o 3D
-        pdf.add_interactive_image(f"p3_{nome_arquivo}.png", f"p3_{nome_arquivo}.html")
+        # Um único HTML com os 12 algoritmos; '#nome' abre no algoritmo certo
+        pdf.add_interactive_image(
+            f"p3_{nome_arquivo}.png", f"p3_graficos_3d.html#{nome_arquivo}"
+        )
 
     # --- Problema 4: Agrupamento05.txt (2D) ---
     pdf.add_page()
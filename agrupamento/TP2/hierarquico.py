@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+Hierarquia aglomerativa calculada uma única vez e cortada em vários k.
+
+O AgglomerativeClustering (Ward e demais ligações) constrói a árvore
+inteira com 'compute_full_tree=True' e 'compute_distances=True'; a
+árvore ('children_' + 'distances_') vira uma matriz de ligação no
+formato do scipy, que é guardada no cache de resultados junto com os
+rótulos.
+
+Cortar a árvore em k clusters é desfazer as k - 1 últimas fusões. Cada
+fusão liga o ponto representante (folha mais à esquerda) de cada um dos
+dois lados, então os clusters em k são as componentes conexas das
+primeiras n - k fusões: O(n) por k, sem reajustar o modelo. (O
+'cut_tree' do scipy faz o mesmo, mas com um laço O(n²) em Python.)
+
+O k sugerido vem do próprio dendrograma: as alturas das fusões dão a
+curva de custo por k (no Ward, exatamente 2·WSS), cujo joelho é achado
+pelo mesmo Kneedle do método do cotovelo. 'salvar_cortes_hierarquicos'
+grava os cortes, o dendrograma e o k do joelho de cada método.
+"""
+
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.cluster.hierarchy import dendrogram
+from scipy.sparse.csgraph import connected_components
+
+from cotovelo import detectar_joelho
+
+
+def matriz_ligacao(children, distances):
+    """
+    Matriz de ligação (n - 1, 4) do scipy: [filho_a, filho_b, altura,
+    tamanho do novo cluster], a partir de 'children_' e 'distances_' do
+    AgglomerativeClustering.
+    """
+    children = np.asarray(children, dtype=np.int64)
+    n = len(children) + 1
+    tamanhos = np.ones(2 * n - 1)
+    for i, (a, b) in enumerate(children):
+        tamanhos[n + i] = tamanhos[a] + tamanhos[b]
+    return np.column_stack([children, distances, tamanhos[n:]]).astype(np.float64)
+
+
+def _representantes(Z):
+    """Uma folha de cada nó da árvore (a mais à esquerda), por salto de ponteiros."""
+    n = len(Z) + 1
+    representante = np.concatenate([np.arange(n), Z[:, 0].astype(np.int64)])
+    while representante.max() >= n:
+        representante = representante[representante]
+    return representante
+
+
+def cortar_arvore(Z, ks):
+    """{k: rótulos} do corte da árvore 'Z' em cada k de 'ks' (1 <= k <= n)."""
+    n = len(Z) + 1
+    representante = _representantes(Z)
+    origem = representante[Z[:, 0].astype(np.int64)]
+    destino = representante[Z[:, 1].astype(np.int64)]
+    cortes = {}
+    for k in ks:
+        m = n - k  # as primeiras m fusões continuam feitas
+        grafo = sp.csr_matrix(
+            (np.ones(m, dtype=np.int8), (origem[:m], destino[:m])), shape=(n, n)
+        )
+        _, cortes[k] = connected_components(grafo, directed=False)
+    return cortes
+
+
+def custo_por_k(Z, ks):
+    """
+    Custo acumulado das fusões até restarem k clusters: soma das alturas
+    ao quadrado das primeiras n - k fusões. No Ward, a altura ao quadrado
+    é o dobro do aumento da soma dos quadrados intra-cluster, então esse
+    custo é 2·WSS(k), a mesma curva do método do cotovelo; nas demais
+    ligações é o análogo pelas alturas do dendrograma. Com conectividade
+    (Ward estruturado) a árvore pode ter inversões; o máximo acumulado
+    torna as alturas monótonas, como no desenho do dendrograma.
+    """
+    n = len(Z) + 1
+    custo = np.cumsum(np.maximum.accumulate(Z[:, 2]) ** 2)
+    return np.array([custo[n - k - 1] if k < n else 0.0 for k in ks])
+
+
+def joelho_dendrograma(Z, k_max=10):
+    """
+    k do joelho do custo por k (k = 1..k_max, ver 'custo_por_k'), ou None
+    se a curva não tiver joelho. Retorna (k_joelho, ks, custos).
+    """
+    ks = list(range(1, min(k_max, len(Z) + 1) + 1))
+    custos = custo_por_k(Z, ks)
+    k_joelho, _ = detectar_joelho(ks, custos)
+    return k_joelho, ks, custos
+
+
+def salvar_cortes_hierarquicos(
+    algoritmos,
+    resultados,
+    nome_conjunto,
+    diretorio,
+    prefixo,
+    k_max=10,
+    representantes=None,
+):
+    """
+    Corta a árvore de cada método hierárquico de 'algoritmos' [(nome,
+    nome_arquivo, algoritmo), ...] (calculada uma única vez e guardada no
+    cache) em k = 1..k_max. Salva em 'diretorio' os rótulos de todos os
+    cortes em CSV, o dendrograma com a curva de custo por k e, em TXT, o
+    k do joelho do dendrograma de cada método.
+
+    Árvores construídas sobre o coreset têm um representante por folha;
+    'representantes' ({nome_arquivo: representante de cada ponto}) leva
+    os cortes a todos os pontos.
+    """
+    tabela = []
+    for nome_amigavel, nome_arquivo, _ in algoritmos:
+        resultado = resultados[nome_arquivo]
+        if resultado["status"] != "ok" or resultado.get("linkage") is None:
+            continue
+        Z = resultado["linkage"]
+        ks = range(1, min(k_max, len(Z) + 1) + 1)
+        cortes = cortar_arvore(Z, ks)
+        if resultado.get("coreset"):
+            representante = representantes[nome_arquivo]
+            cortes = {k: rotulos[representante] for k, rotulos in cortes.items()}
+        pd.DataFrame({f"k={k}": cortes[k] for k in ks}).to_csv(
+            os.path.join(diretorio, f"{prefixo}_{nome_arquivo}_cortes.csv"),
+            index=False,
+        )
+        k_joelho, ks_custo, custos = joelho_dendrograma(Z, k_max)
+        k_usado = len(np.unique(resultado["labels"]))
+        tabela.append(
+            {
+                "Algoritmo": nome_amigavel,
+                "k usado": k_usado,
+                "k do joelho (dendrograma)": k_joelho,
+                "Tamanhos no joelho": (
+                    "" if k_joelho is None else sorted(np.bincount(cortes[k_joelho]))
+                ),
+            }
+        )
+
+        fig, (ax_arvore, ax_custo) = plt.subplots(1, 2, figsize=(14, 5))
+        dendrogram(Z, truncate_mode="lastp", p=30, no_labels=True, ax=ax_arvore)
+        if k_joelho is not None and k_joelho > 1:
+            # Altura entre a última fusão mantida e a primeira desfeita
+            alturas = np.maximum.accumulate(Z[:, 2])
+            n = len(Z) + 1
+            corte = (alturas[n - k_joelho - 1] + alturas[n - k_joelho]) / 2
+            ax_arvore.axhline(
+                corte, color="red", linestyle="--", label=f"Corte em k={k_joelho}"
+            )
+            ax_arvore.legend()
+        ax_arvore.set_title(f"Dendrograma (30 últimas fusões) - {nome_amigavel}")
+        ax_arvore.set_ylabel("Altura da fusão")
+        ax_custo.plot(ks_custo, custos, "bo-")
+        if k_joelho is not None:
+            ax_custo.axvline(
+                k_joelho, color="red", linestyle="--", label=f"Joelho (k={k_joelho})"
+            )
+            ax_custo.legend()
+        ax_custo.set_xlabel("Número de Clusters (k)")
+        ax_custo.set_ylabel("Custo acumulado das fusões")
+        ax_custo.set_title("Custo por k (corte da árvore)")
+        ax_custo.grid(True)
+        fig.suptitle(f"{nome_amigavel} - {nome_conjunto}")
+        fig.tight_layout()
+        fig.savefig(
+            os.path.join(diretorio, f"{prefixo}_{nome_arquivo}_dendrograma.png")
+        )
+        plt.close(fig)
+
+    if not tabela:
+        return
+    tabela_df = pd.DataFrame(tabela).set_index("Algoritmo")
+    tabela_df["k do joelho (dendrograma)"] = tabela_df[
+        "k do joelho (dendrograma)"
+    ].astype("Int64")
+    tabela_path = os.path.join(diretorio, f"{prefixo}_hierarquico.txt")
+    with open(tabela_path, "w", encoding="utf-8") as f:
+        f.write(tabela_df.to_string(line_width=120))
+    print(f"  Cortes das árvores hierárquicas salvos em: {tabela_path}")
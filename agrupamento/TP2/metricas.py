@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas de qualidade dos agrupamentos, calculadas em paralelo.
+
+Para cada algoritmo:
+  - silhueta numa amostra estratificada por rótulo, repetida algumas vezes
+    para dar um intervalo de confiança (a silhueta exata é O(n²));
+  - Davies-Bouldin e Calinski-Harabasz, que são O(n·k) e usam todos os
+    pontos;
+  - ARI e NMI contra o rótulo verdadeiro, quando ele existe (Iris).
+
+Os pontos marcados como ruído (-1) ficam fora das métricas internas; a
+fração de ruído é informada à parte.
+
+O ARI entre todos os pares de algoritmos sai de uma única passada sobre
+os pontos: as tabelas de contingência de todos os pares são acumuladas
+juntas num só 'np.bincount'. 'salvar_metricas' grava as duas tabelas.
+"""
+
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import (
+    adjusted_rand_score,
+    calinski_harabasz_score,
+    davies_bouldin_score,
+    normalized_mutual_info_score,
+    silhouette_score,
+)
+
+from paralelo import (
+    array_compartilhado,
+    array_do_worker,
+    inicializar_worker,
+    numero_de_workers,
+)
+from renderizacao import indices_estratificados
+
+# Silhueta: tamanho de cada amostra e número de amostras (para o IC de 95%)
+TAMANHO_AMOSTRA_SILHUETA = 2000
+REPETICOES_SILHUETA = 10
+
+# Pontos por bloco na passada de contingência do ARI entre pares
+BLOCO_CONTINGENCIA = 100_000
+
+
+def silhueta_amostrada(
+    X,
+    labels,
+    tamanho_amostra=TAMANHO_AMOSTRA_SILHUETA,
+    repeticoes=REPETICOES_SILHUETA,
+    random_state=0,
+):
+    """
+    Silhueta média em 'repeticoes' amostras estratificadas por rótulo.
+    Retorna (média, limite inferior, limite superior) do IC de 95%; se
+    houver menos de 'tamanho_amostra' pontos, usa todos (IC degenerado).
+    Com menos de 2 amostras válidas (mais de um rótulo) não há desvio
+    padrão: o IC sai degenerado (ou tudo NaN, sem nenhuma), com um aviso.
+    """
+    n = len(labels)
+    if n <= tamanho_amostra:
+        valor = silhouette_score(X, labels)
+        return valor, valor, valor
+    valores = []
+    for r in range(repeticoes):
+        indices = indices_estratificados(
+            labels, tamanho_amostra, minimo_por_rotulo=2, random_state=random_state + r
+        )
+        if len(np.unique(labels[indices])) > 1:
+            valores.append(silhouette_score(X[indices], labels[indices]))
+    valores = np.asarray(valores)
+    if len(valores) < 2:
+        warnings.warn(
+            f"Silhueta: {len(valores)} de {repeticoes} amostra(s) válida(s); "
+            "intervalo de confiança degenerado",
+            RuntimeWarning,
+        )
+        media = valores[0] if len(valores) else np.nan
+        return media, media, media
+    media = valores.mean()
+    margem = 1.96 * valores.std(ddof=1) / np.sqrt(len(valores))
+    return media, media - margem, media + margem
+
+
+def avaliar_agrupamento(X, labels, y_verdadeiro=None):
+    """Dicionário com todas as métricas de um agrupamento (NaN se não se aplicam)."""
+    labels = np.asarray(labels)
+    ruido = labels == -1
+    metricas = {
+        "Clusters": len(np.unique(labels[~ruido])),
+        "Ruído (%)": 100.0 * ruido.mean(),
+        "Silhueta": np.nan,
+        "Silhueta IC95 inf": np.nan,
+        "Silhueta IC95 sup": np.nan,
+        "Davies-Bouldin": np.nan,
+        "Calinski-Harabasz": np.nan,
+    }
+    # As métricas internas exigem ao menos 2 clusters (e menos clusters que pontos)
+    X_validos, labels_validos = X[~ruido], labels[~ruido]
+    if 1 < metricas["Clusters"] < len(labels_validos):
+        media, inferior, superior = silhueta_amostrada(X_validos, labels_validos)
+        metricas["Silhueta"] = media
+        metricas["Silhueta IC95 inf"] = inferior
+        metricas["Silhueta IC95 sup"] = superior
+        metricas["Davies-Bouldin"] = davies_bouldin_score(X_validos, labels_validos)
+        metricas["Calinski-Harabasz"] = calinski_harabasz_score(
+            X_validos, labels_validos
+        )
+    if y_verdadeiro is not None:
+        # Contra o rótulo real, o ruído conta como um grupo à parte
+        metricas["ARI"] = adjusted_rand_score(y_verdadeiro, labels)
+        metricas["NMI"] = normalized_mutual_info_score(y_verdadeiro, labels)
+    return metricas
+
+
+def _avaliar_no_worker(labels, y_verdadeiro):
+    return avaliar_agrupamento(array_do_worker(), labels, y_verdadeiro)
+
+
+def avaliar_em_paralelo(X, rotulos, y_verdadeiro=None, n_jobs=None):
+    """
+    Avalia {nome: labels} em paralelo (X em memória compartilhada).
+    Retorna {nome: métricas}.
+    """
+    if not rotulos:
+        return {}
+    n_workers = min(numero_de_workers(n_jobs), len(rotulos))
+    with array_compartilhado(X) as descritor:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=inicializar_worker,
+            initargs=(descritor,),
+        ) as pool:
+            futuros = {
+                nome: pool.submit(_avaliar_no_worker, labels, y_verdadeiro)
+                for nome, labels in rotulos.items()
+            }
+            return {nome: futuro.result() for nome, futuro in futuros.items()}
+
+
+def _pares_combinados(contagens):
+    """C(c, 2) = c·(c-1)/2 de cada contagem."""
+    contagens = np.asarray(contagens, dtype=np.float64)
+    return contagens * (contagens - 1) / 2
+
+
+def ari_entre_pares(rotulos):
+    """
+    Matriz (m, m) de ARI entre 'rotulos' (lista de m vetores de rótulos).
+
+    Cada vetor é recodificado para 0..k-1; para cada par (i, j) o ponto
+    cai na célula a_i·k_j + a_j da tabela de contingência do par, deslocada
+    para uma faixa própria do par. Assim um único 'np.bincount' por bloco
+    de pontos acumula as tabelas de todos os pares ao mesmo tempo.
+    """
+    codigos, tamanhos = [], []
+    for labels in rotulos:
+        _, codigo = np.unique(labels, return_inverse=True)
+        codigos.append(codigo.astype(np.int64))
+        tamanhos.append(int(codigo.max(initial=-1)) + 1)
+    m = len(codigos)
+    n = len(codigos[0]) if m else 0
+    pares = [(i, j) for i in range(m) for j in range(i + 1, m)]
+    celulas_par = np.array([tamanhos[i] * tamanhos[j] for i, j in pares], dtype=int)
+    deslocamentos = np.concatenate([[0], np.cumsum(celulas_par)[:-1]]).astype(np.int64)
+
+    contingencia = np.zeros(int(celulas_par.sum()), dtype=np.int64)
+    for inicio in range(0, n, BLOCO_CONTINGENCIA):
+        fim = min(n, inicio + BLOCO_CONTINGENCIA)
+        chaves = np.concatenate(
+            [
+                deslocamentos[p]
+                + codigos[i][inicio:fim] * tamanhos[j]
+                + codigos[j][inicio:fim]
+                for p, (i, j) in enumerate(pares)
+            ]
+        )
+        contingencia += np.bincount(chaves, minlength=contingencia.size)
+
+    # Termos do ARI: soma de C(n_ij, 2) por par e de C(a_i, 2) por rótulo
+    par_da_celula = np.repeat(np.arange(len(pares)), celulas_par)
+    soma_ij = np.bincount(
+        par_da_celula, weights=_pares_combinados(contingencia), minlength=len(pares)
+    )
+    soma_marginal = [_pares_combinados(np.bincount(codigo)).sum() for codigo in codigos]
+    total = n * (n - 1) / 2
+
+    ari = np.eye(m)
+    for p, (i, j) in enumerate(pares):
+        esperado = soma_marginal[i] * soma_marginal[j] / total
+        maximo = (soma_marginal[i] + soma_marginal[j]) / 2
+        if maximo == esperado:
+            # Ambos com um único cluster (ou todos unitários): concordância total
+            valor = 1.0
+        else:
+            valor = (soma_ij[p] - esperado) / (maximo - esperado)
+        ari[i, j] = ari[j, i] = valor
+    return ari
+
+
+def salvar_metricas(X, rotulos, diretorio, prefixo, y_verdadeiro=None):
+    """
+    Calcula as métricas de qualidade de cada agrupamento de 'rotulos'
+    ({nome: labels}, em paralelo) e o ARI entre todos os pares, e salva
+    as duas tabelas em TXT em 'diretorio'.
+    """
+    print("  Calculando métricas de qualidade...")
+    metricas = avaliar_em_paralelo(X, rotulos, y_verdadeiro)
+
+    metricas_df = pd.DataFrame.from_dict(metricas, orient="index").round(4)
+    metricas_df.index.name = "Algoritmo"
+    metricas_path = os.path.join(diretorio, f"{prefixo}_metricas.txt")
+    with open(metricas_path, "w", encoding="utf-8") as f:
+        f.write(metricas_df.to_string(line_width=120))
+    print(f"  Tabela de métricas salva em: {metricas_path}")
+
+    ari_df = pd.DataFrame(
+        ari_entre_pares(list(rotulos.values())),
+        index=list(rotulos),
+        columns=list(rotulos),
+    ).round(3)
+    ari_path = os.path.join(diretorio, f"{prefixo}_ari_entre_algoritmos.txt")
+    with open(ari_path, "w", encoding="utf-8") as f:
+        f.write(ari_df.to_string(line_width=200))
+    print(f"  ARI entre algoritmos salvo em: {ari_path}")
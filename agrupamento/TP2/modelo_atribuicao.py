@@ -0,0 +1,312 @@
+# -*- coding: utf-8 -*-
+"""
+Modelos de atribuição: rotulam pontos novos com o agrupamento já
+calculado, sem reajustar o algoritmo.
+
+Só K-Means, Mini Batch K-Means, BIRCH e GMM têm 'predict' no
+scikit-learn. Aqui cada algoritmo da lista ganha um modelo pequeno,
+montado a partir dos rótulos finais, no espaço padronizado:
+
+  - "centroides" (K-Means, Mini Batch, MeanShift, BIRCH) e "exemplares"
+    (Affinity Propagation): centro/exemplar mais próximo, a mesma regra
+    do 'predict' desses algoritmos. No BIRCH os centros são os dos
+    subclusters, cada um com o rótulo do seu grupo, como no 'predict';
+  - "gaussiano" (GMM): os parâmetros da mistura ajustada (médias,
+    covariâncias e pesos, em qualquer 'covariance_type'); o rótulo é o
+    componente de maior densidade ponderada, como no 'predict'. Sem a
+    mistura, uma gaussiana por cluster estimada dos pontos rotulados;
+  - "densidade" (DBSCAN, OPTICS, HDBSCAN): os pontos de referência
+    (pontos centrais do DBSCAN; membros dos clusters nos demais), cada
+    um com um raio de alcance (eps, ou a distância ao min_samples-ésimo
+    vizinho). O ponto novo recebe o rótulo da referência mais próxima se
+    estiver dentro do seu raio; senão é ruído (-1);
+  - "votacao_knn" (Agglomerative, Ward, Spectral): voto da
+    maioria entre os k pontos rotulados mais próximos (empate: o mais
+    próximo decide).
+
+As buscas usam uma KD-tree/Ball-tree das referências, criada na primeira
+chamada: O(log n) por ponto. O modelo é salvo em '.npz' (só arrays) e
+também guarda média e escala do StandardScaler, para rotular dados
+brutos com 'rotular'. 'salvar_modelos_atribuicao' grava os modelos de
+todos os algoritmos de um problema, e 'carregar_modelos_atribuicao' os
+lê de volta.
+"""
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from scipy.linalg import cho_factor, solve_triangular
+from sklearn.neighbors import NearestNeighbors
+
+TIPOS = ("centroides", "exemplares", "gaussiano", "densidade", "votacao_knn")
+
+
+class ModeloAtribuicao:
+    """
+    Rotula pontos novos de um agrupamento já calculado ('predict' recebe
+    pontos no espaço padronizado; 'rotular', pontos brutos).
+
+    Construído pelas funções 'modelo_*' deste módulo ou por 'carregar'.
+    """
+
+    def __init__(
+        self,
+        tipo,
+        referencias,
+        rotulos,
+        raios=None,
+        covariancias=None,
+        pesos=None,
+        n_vizinhos=1,
+        media=None,
+        escala=None,
+    ):
+        if tipo not in TIPOS:
+            raise ValueError(f"Tipo de modelo desconhecido: {tipo!r}")
+        self.tipo = tipo
+        self.referencias = np.asarray(referencias)
+        self.rotulos = np.asarray(rotulos, dtype=np.int64)
+        self.raios = raios
+        self.covariancias = covariancias
+        self.pesos = pesos
+        self.n_vizinhos = n_vizinhos
+        self.media = media
+        self.escala = escala
+        self._nn = None
+
+    def _indice(self):
+        """KD-tree/Ball-tree das referências, criada na primeira consulta."""
+        if self._nn is None:
+            self._nn = NearestNeighbors().fit(self.referencias)
+        return self._nn
+
+    def _predict_gaussiano(self, X):
+        log_densidade = np.empty((X.shape[0], len(self.rotulos)))
+        for c, (media, covariancia, peso) in enumerate(
+            zip(self.referencias, self.covariancias, self.pesos)
+        ):
+            L, _ = cho_factor(covariancia, lower=True)
+            y = solve_triangular(L, (X - media).T, lower=True, check_finite=False)
+            log_densidade[:, c] = (
+                -0.5 * np.einsum("ij,ij->j", y, y)
+                - np.log(np.diag(L)).sum()
+                + np.log(peso)
+            )
+        return self.rotulos[log_densidade.argmax(axis=1)]
+
+    def _predict_votacao(self, X):
+        k = min(self.n_vizinhos, len(self.referencias))
+        indices = self._indice().kneighbors(X, n_neighbors=k, return_distance=False)
+        votos = self.rotulos[indices] + 1  # ruído (-1) vira a classe 0
+        contagem = np.zeros((X.shape[0], votos.max() + 1))
+        # Peso levemente decrescente com a ordem: o mais próximo desempata
+        peso = 1.0 - 1e-6 * np.arange(k)
+        np.add.at(
+            contagem,
+            (np.repeat(np.arange(X.shape[0]), k), votos.ravel()),
+            np.tile(peso, X.shape[0]),
+        )
+        return contagem.argmax(axis=1) - 1
+
+    def predict(self, X):
+        """Rótulos dos pontos de X (espaço padronizado), sem reajuste."""
+        X = np.asarray(X, dtype=self.referencias.dtype)
+        if len(self.rotulos) == 0:
+            return np.full(X.shape[0], -1)
+        if self.tipo == "gaussiano":
+            return self._predict_gaussiano(X)
+        if self.tipo == "votacao_knn":
+            return self._predict_votacao(X)
+        distancias, indices = self._indice().kneighbors(X, n_neighbors=1)
+        rotulos = self.rotulos[indices[:, 0]]
+        if self.tipo == "densidade":
+            rotulos = np.where(
+                distancias[:, 0] <= self.raios[indices[:, 0]], rotulos, -1
+            )
+        return rotulos
+
+    def rotular(self, X_bruto):
+        """Rótulos de pontos brutos: padroniza com a média/escala guardadas."""
+        X = np.asarray(X_bruto, dtype=np.float64)
+        if self.media is not None:
+            X = (X - self.media) / self.escala
+        return self.predict(X)
+
+    def salvar(self, caminho):
+        """Salva o modelo em '.npz' (só arrays, sem pickle)."""
+        campos = {
+            "tipo": self.tipo,
+            "referencias": self.referencias,
+            "rotulos": self.rotulos,
+            "n_vizinhos": self.n_vizinhos,
+        }
+        for nome in ("raios", "covariancias", "pesos", "media", "escala"):
+            if getattr(self, nome) is not None:
+                campos[nome] = getattr(self, nome)
+        with open(caminho, "wb") as f:
+            np.savez(f, **campos)
+
+    @classmethod
+    def carregar(cls, caminho):
+        """Modelo salvo por 'salvar'."""
+        with np.load(caminho) as arquivo:
+            opcionais = {
+                nome: arquivo[nome]
+                for nome in ("raios", "covariancias", "pesos", "media", "escala")
+                if nome in arquivo
+            }
+            return cls(
+                str(arquivo["tipo"]),
+                arquivo["referencias"],
+                arquivo["rotulos"],
+                n_vizinhos=int(arquivo["n_vizinhos"]),
+                **opcionais,
+            )
+
+
+def modelo_centroides(centros, tipo="centroides", rotulos=None):
+    """
+    Centro (ou exemplar, tipo="exemplares") mais próximo. O rótulo é a
+    posição do centro, ou 'rotulos' (um por centro, ex.: subclusters do
+    BIRCH).
+    """
+    centros = np.asarray(centros)
+    if rotulos is None:
+        rotulos = np.arange(len(centros))
+    return ModeloAtribuicao(tipo, centros, rotulos)
+
+
+def modelo_mistura(medias, covariancias, pesos, tipo_covariancia="full"):
+    """
+    Modelo "gaussiano" com os parâmetros de uma GaussianMixture ajustada
+    ('means_', 'covariances_', 'weights_', 'covariance_type'). As
+    covariâncias "tied", "diag" e "spherical" viram matrizes completas.
+    """
+    medias = np.asarray(medias, dtype=np.float64)
+    covariancias = np.asarray(covariancias, dtype=np.float64)
+    k, d = medias.shape
+    if tipo_covariancia == "tied":
+        covariancias = np.broadcast_to(covariancias, (k, d, d))
+    elif tipo_covariancia == "diag":
+        covariancias = covariancias[:, :, None] * np.eye(d)
+    elif tipo_covariancia == "spherical":
+        covariancias = covariancias[:, None, None] * np.eye(d)
+    elif tipo_covariancia != "full":
+        raise ValueError(f"Tipo de covariância desconhecido: {tipo_covariancia!r}")
+    return ModeloAtribuicao(
+        "gaussiano",
+        medias,
+        np.arange(k),
+        covariancias=np.array(covariancias),
+        pesos=np.asarray(pesos, dtype=np.float64),
+    )
+
+
+def modelo_gaussiano(X, labels, regularizacao=1e-6):
+    """
+    Uma gaussiana por cluster de 'labels' (ruído ignorado), para quando
+    os parâmetros da mistura ajustada não estão disponíveis.
+    """
+    rotulos = np.unique(labels[labels >= 0])
+    medias, covariancias, pesos = [], [], []
+    for c in rotulos:
+        pontos = X[labels == c].astype(np.float64)
+        medias.append(pontos.mean(axis=0))
+        covariancia = np.atleast_2d(np.cov(pontos, rowvar=False, bias=True))
+        covariancias.append(covariancia + regularizacao * np.eye(X.shape[1]))
+        pesos.append(len(pontos) / len(labels))
+    if len(rotulos) == 0:
+        return ModeloAtribuicao("gaussiano", np.empty((0, X.shape[1])), rotulos)
+    return ModeloAtribuicao(
+        "gaussiano",
+        np.array(medias),
+        rotulos,
+        covariancias=np.array(covariancias),
+        pesos=np.array(pesos),
+    )
+
+
+def modelo_densidade(X, labels, referencia, raios):
+    """
+    Referências = pontos com 'referencia' verdadeiro e rótulo >= 0, com o
+    raio de alcance de cada ponto ('raios': vetor (n,) ou escalar).
+    """
+    manter = np.asarray(referencia) & (labels >= 0)
+    raios = np.broadcast_to(np.asarray(raios, dtype=np.float64), labels.shape)
+    return ModeloAtribuicao(
+        "densidade", X[manter], labels[manter], raios=np.array(raios[manter])
+    )
+
+
+def modelo_votacao(X, labels, n_vizinhos=15):
+    """Voto da maioria entre os 'n_vizinhos' pontos rotulados mais próximos."""
+    return ModeloAtribuicao("votacao_knn", np.array(X), labels, n_vizinhos=n_vizinhos)
+
+
+def salvar_modelos_atribuicao(
+    X,
+    algoritmos,
+    resultados,
+    montar_modelo,
+    diretorio_modelos,
+    diretorio,
+    prefixo,
+    scaler=None,
+):
+    """
+    Salva em 'diretorio_modelos' o modelo de atribuição de cada algoritmo
+    de 'algoritmos' [(nome, nome_arquivo, algoritmo), ...] que terminou,
+    montado por montar_modelo(nome_arquivo, resultado). A tabela em TXT
+    traz o tempo por ponto e a concordância com os rótulos originais,
+    medidos rotulando de novo (como pontos novos) uma amostra de X.
+    """
+    os.makedirs(diretorio_modelos, exist_ok=True)
+    rng = np.random.default_rng(0)
+    amostra = rng.choice(X.shape[0], size=min(X.shape[0], 10_000), replace=False)
+    tabela = []
+    for nome_amigavel, nome_arquivo, _ in algoritmos:
+        resultado = resultados[nome_arquivo]
+        if resultado["status"] != "ok":
+            continue
+        modelo = montar_modelo(nome_arquivo, resultado)
+        if scaler is not None:
+            modelo.media, modelo.escala = scaler.mean_, scaler.scale_
+        modelo.salvar(os.path.join(diretorio_modelos, f"{prefixo}_{nome_arquivo}.npz"))
+
+        modelo.predict(X[amostra[:1]])  # cria o índice fora da medição
+        inicio = time.perf_counter()
+        previstos = modelo.predict(X[amostra])
+        tempo = time.perf_counter() - inicio
+        tabela.append(
+            {
+                "Algoritmo": nome_amigavel,
+                "Tipo": modelo.tipo,
+                "Referências": len(modelo.rotulos),
+                "µs por ponto": round(1e6 * tempo / len(amostra), 2),
+                "Concordância (%)": round(
+                    100 * np.mean(previstos == resultado["labels"][amostra]), 2
+                ),
+            }
+        )
+    if not tabela:
+        return
+    tabela_path = os.path.join(diretorio, f"{prefixo}_modelos.txt")
+    with open(tabela_path, "w", encoding="utf-8") as f:
+        f.write(pd.DataFrame(tabela).set_index("Algoritmo").to_string(line_width=100))
+    print(f"  Modelos de atribuição salvos em: {diretorio_modelos} ({tabela_path})")
+
+
+def carregar_modelos_atribuicao(diretorio_modelos, prefixo):
+    """Modelos salvos por 'salvar_modelos_atribuicao' ({nome_arquivo: modelo})."""
+    modelos = {}
+    if not os.path.isdir(diretorio_modelos):
+        return modelos
+    for arquivo in sorted(os.listdir(diretorio_modelos)):
+        if arquivo.startswith(f"{prefixo}_") and arquivo.endswith(".npz"):
+            nome_arquivo = arquivo[len(prefixo) + 1 : -len(".npz")]
+            modelos[nome_arquivo] = ModeloAtribuicao.carregar(
+                os.path.join(diretorio_modelos, arquivo)
+            )
+    return modelos
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Utilitários para compartilhar matrizes NumPy entre processos sem cópia,
+usando 'multiprocessing.shared_memory'.
+
+Uso típico:
+
+    with array_compartilhado(X) as descritor:
+        with ProcessPoolExecutor(
+            initializer=inicializar_worker, initargs=(descritor,)
+        ) as pool:
+            ...  # dentro do worker, 'array_do_worker()' devolve X
+
+O descritor é apenas (nome, shape, dtype), então é barato de enviar
+para cada processo.
+"""
+
+import os
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Estado global de cada processo worker (preenchido por 'inicializar_worker')
+_SHM_WORKER = None
+_X_WORKER = None
+
+
+def numero_de_workers(n_jobs=None):
+    """
+    Converte 'n_jobs' no número efetivo de processos (None ou -1 = todos os núcleos).
+    """
+    total = os.cpu_count() or 1
+    if n_jobs is None or n_jobs < 0:
+        return total
+    return max(1, min(int(n_jobs), total))
+
+
+@contextmanager
+def array_compartilhado(X):
+    """
+    Copia X uma única vez para um bloco de memória compartilhada e devolve
+    o descritor (nome, shape, dtype). O bloco é liberado ao sair do 'with'.
+    """
+    X = np.ascontiguousarray(X)
+    shm = shared_memory.SharedMemory(create=True, size=max(1, X.nbytes))
+    try:
+        destino = np.ndarray(X.shape, dtype=X.dtype, buffer=shm.buf)
+        destino[...] = X
+        del destino
+        yield (shm.name, X.shape, X.dtype.str)
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def anexar_array(descritor):
+    """
+    Anexa a um bloco criado por 'array_compartilhado' e devolve (shm, array).
+    O 'shm' precisa continuar referenciado enquanto o array for usado.
+    """
+    nome, shape, dtype = descritor
+    # Os workers do pool compartilham o resource_tracker do processo principal,
+    # que é quem cria e remove ('unlink') o bloco.
+    shm = shared_memory.SharedMemory(name=nome)
+    X = np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+    return shm, X
+
+
+def inicializar_worker(descritor):
+    """
+    'initializer' para ProcessPoolExecutor: anexa o array compartilhado
+    e o guarda nas variáveis globais do worker.
+    """
+    global _SHM_WORKER, _X_WORKER
+    _SHM_WORKER, _X_WORKER = anexar_array(descritor)
+
+
+def array_do_worker():
+    """Devolve o array anexado por 'inicializar_worker' neste processo."""
+    return _X_WORKER
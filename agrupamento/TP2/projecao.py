@@ -0,0 +1,100 @@
+# -*- coding: utf-8 -*-
+"""
+Projeção 2D para visualização de dados com muitas dimensões.
+
+O PCA exato decompõe a matriz centralizada inteira (uma cópia n × d) e
+vira o gargalo de memória em arquivos largos e longos. O método é
+escolhido pelo formato dos dados:
+  - "exato": poucos atributos e matriz pequena (PCA comum);
+  - "aleatorio": muitos atributos, matriz ainda cabe na memória (SVD
+    aleatorizado: custo O(n·d·k) em vez de O(n·d·min(n, d)));
+  - "incremental": matriz grande demais para ser copiada; IncrementalPCA
+    ajustado bloco a bloco, com memória O(bloco · d). Os blocos podem vir
+    de um iterador ('ajustar_projecao_em_blocos'), como os do modo
+    streaming, sem que a matriz inteira esteja na memória.
+
+A projeção também é aplicada em blocos, e o modelo ajustado serve para
+levar os centros dos clusters ao mesmo espaço 2D dos pontos.
+"""
+
+import numpy as np
+from sklearn.decomposition import PCA, IncrementalPCA
+
+# Acima disso (atributos) o SVD aleatorizado é usado no lugar do exato
+LIMITE_DIM_EXATA = 50
+
+# Acima disso (MB da matriz de dados) o ajuste é incremental, em blocos
+LIMITE_MEMORIA_PCA_MB = 1024
+
+
+def escolher_metodo_pca(
+    n, d, itemsize=8, limite_dim=LIMITE_DIM_EXATA, limite_mb=LIMITE_MEMORIA_PCA_MB
+):
+    """Método de PCA ("exato", "aleatorio" ou "incremental") para dados n × d."""
+    if n * d * itemsize / (1024 * 1024) > limite_mb:
+        return "incremental"
+    if d > limite_dim:
+        return "aleatorio"
+    return "exato"
+
+
+def ajustar_projecao(
+    X, n_componentes=2, metodo=None, tamanho_bloco=100_000, random_state=42
+):
+    """
+    Ajusta a projeção de X em 'n_componentes' dimensões. Se 'metodo' for
+    None, ele é escolhido por 'escolher_metodo_pca'. Retorna o modelo
+    ajustado (PCA ou IncrementalPCA, ambos com 'transform').
+    """
+    n, d = X.shape
+    if metodo is None:
+        metodo = escolher_metodo_pca(n, d, X.dtype.itemsize)
+    if metodo == "exato":
+        return PCA(n_components=n_componentes, random_state=random_state).fit(X)
+    if metodo == "aleatorio":
+        return PCA(
+            n_components=n_componentes,
+            svd_solver="randomized",
+            random_state=random_state,
+        ).fit(X)
+    if metodo == "incremental":
+        blocos = (
+            X[inicio : inicio + tamanho_bloco] for inicio in range(0, n, tamanho_bloco)
+        )
+        return ajustar_projecao_em_blocos(blocos, n_componentes)
+    raise ValueError(f"Método de PCA desconhecido: {metodo}")
+
+
+def ajustar_projecao_em_blocos(blocos, n_componentes=2):
+    """
+    Ajusta um IncrementalPCA sobre um iterável de blocos (arrays com as
+    mesmas colunas), lendo um bloco por vez. Cada 'partial_fit' precisa de
+    ao menos n_componentes linhas: blocos menores são juntados ao seguinte
+    (ou, no fim, ao anterior).
+    """
+    modelo = IncrementalPCA(n_components=n_componentes)
+    pendente = None
+    for bloco in blocos:
+        bloco = np.asarray(bloco)
+        if pendente is None:
+            pendente = bloco
+        elif len(pendente) >= n_componentes and len(bloco) >= n_componentes:
+            modelo.partial_fit(pendente)
+            pendente = bloco
+        else:
+            pendente = np.concatenate([pendente, bloco])
+    if pendente is not None:
+        modelo.partial_fit(pendente)
+    return modelo
+
+
+def projetar(modelo, X, tamanho_bloco=100_000):
+    """
+    Aplica a projeção em blocos, sem criar a cópia centralizada n × d de
+    X que 'transform' faria de uma só vez.
+    """
+    saida = np.empty((X.shape[0], modelo.n_components_), dtype=X.dtype)
+    for inicio in range(0, X.shape[0], tamanho_bloco):
+        fim = inicio + tamanho_bloco
+        saida[inicio:fim] = modelo.transform(X[inicio:fim])
+    return saida
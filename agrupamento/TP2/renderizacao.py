@@ -0,0 +1,492 @@
+# -*- coding: utf-8 -*-
+"""
+Geração dos gráficos de cada algoritmo em segundo plano.
+
+Salvar um PNG com Matplotlib (e, no 3D, o HTML/PNG do Plotly) custa quase
+o mesmo que ajustar os algoritmos mais rápidos. Em vez de desenhar tudo no
+final, cada resultado vira um "trabalho" (rótulos, título, caminho) que é
+enviado a um pequeno pool de processos enquanto os próximos algoritmos
+ainda estão sendo ajustados.
+
+Os pontos a desenhar são os mesmos para todos os algoritmos de um
+conjunto de dados, então ficam em memória compartilhada (ver
+'paralelo.py') e só os rótulos trafegam a cada trabalho. Cada worker usa
+o backend "Agg" (sem janela) e reaproveita uma única figura, limpando os
+eixos entre um gráfico e outro.
+
+Uso:
+
+    with FilaRenderizacao(X_plot) as fila:
+        fila.enviar_2d(labels, title, "result/p1_kmeans.png")
+    # ao sair do 'with', todos os gráficos já foram salvos
+"""
+
+import base64
+import multiprocessing as mp
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import matplotlib.pyplot as plt
+from matplotlib.colors import Normalize, to_rgba
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from paralelo import array_compartilhado, array_do_worker, inicializar_worker
+
+# Processos dedicados aos gráficos (os demais núcleos ficam com os algoritmos)
+N_WORKERS_RENDERIZACAO = 2
+
+# Cores dos clusters nos gráficos 3D (o ruído, -1, é sempre cinza)
+CORES_CLUSTERS = px.colors.qualitative.Plotly
+
+# Abre o HTML 3D no algoritmo indicado após '#' no endereço
+SCRIPT_ALGORITMO_DO_ENDERECO = """
+var gd = document.getElementById('{plot_id}');
+var alvo = decodeURIComponent(window.location.hash.slice(1));
+gd.layout.updatemenus[0].buttons.forEach(function (botao, i) {
+    if (botao.name === alvo) {
+        Plotly.update(gd, botao.args[0], botao.args[1]);
+        Plotly.relayout(gd, {'updatemenus[0].active': i});
+    }
+});
+"""
+
+# Gráficos de conjuntos grandes: cada cluster mantém ao menos esse número
+# de pontos na amostra; o modo "densidade" usa uma grade desse tamanho
+MINIMO_POR_ROTULO = 50
+RESOLUCAO_DENSIDADE = 400
+
+# Figura reaproveitada por cada worker (preenchida por '_inicializar_renderizador')
+_FIGURA = None
+_EIXOS = None
+
+
+def indices_estratificados(
+    labels, max_pontos, minimo_por_rotulo=MINIMO_POR_ROTULO, random_state=0
+):
+    """
+    Índices (ordenados) de uma amostra de até 'max_pontos' pontos,
+    estratificada por rótulo: cada rótulo recebe uma cota proporcional ao
+    seu tamanho, mas nunca menor que 'minimo_por_rotulo' (ou o rótulo
+    inteiro, se for menor), para que clusters pequenos continuem visíveis.
+    """
+    labels = np.asarray(labels)
+    n = labels.size
+    if n <= max_pontos:
+        return np.arange(n)
+    rng = np.random.default_rng(random_state)
+    _, inverso, contagens = np.unique(labels, return_inverse=True, return_counts=True)
+    cotas = np.minimum(
+        contagens,
+        np.maximum(minimo_por_rotulo, contagens * max_pontos // n),
+    )
+    # Se os mínimos estourarem o total, encolhe só o que passa do piso de
+    # cada rótulo; se nem os pisos cabem, todas as cotas encolhem juntas
+    if cotas.sum() > max_pontos:
+        piso = np.minimum(contagens, minimo_por_rotulo)
+        if piso.sum() < max_pontos:
+            excedente = cotas - piso
+            cotas = piso + excedente * (max_pontos - piso.sum()) // excedente.sum()
+        else:
+            cotas = np.maximum(1, cotas * max_pontos // cotas.sum())
+
+    # Ordem aleatória dentro de cada rótulo; fica com os primeiros 'cota'
+    ordem = np.lexsort((rng.random(n), inverso))
+    inicio = np.repeat(np.cumsum(contagens) - contagens, contagens)
+    posicao = np.arange(n) - inicio
+    return np.sort(ordem[posicao < np.repeat(cotas, contagens)])
+
+
+def imagem_densidade(X_plot, labels, resolucao=RESOLUCAO_DENSIDADE):
+    """
+    Agrega os pontos numa grade 'resolucao' × 'resolucao': cada célula recebe
+    a cor do rótulo mais frequente nela (ruído em cinza) e opacidade
+    proporcional a log(nº de pontos). Retorna (imagem RGBA, extent).
+    """
+    x, y = X_plot[:, 0], X_plot[:, 1]
+    extent = [x.min(), x.max(), y.min(), y.max()]
+    largura = max(extent[1] - extent[0], np.finfo(float).tiny)
+    altura = max(extent[3] - extent[2], np.finfo(float).tiny)
+    ix = np.minimum(((x - extent[0]) / largura * resolucao).astype(int), resolucao - 1)
+    iy = np.minimum(((y - extent[2]) / altura * resolucao).astype(int), resolucao - 1)
+    celula = iy.astype(np.int64) * resolucao + ix
+
+    # Contagem por (célula, rótulo) e rótulo dominante de cada célula
+    codigos, rotulos = np.unique(labels, return_inverse=True)
+    chaves, contagens = np.unique(celula * len(codigos) + rotulos, return_counts=True)
+    celulas, rotulos = np.divmod(chaves, len(codigos))
+    ordem = np.lexsort((contagens, celulas))
+    dominante = ordem[np.r_[celulas[ordem][1:] != celulas[ordem][:-1], True]]
+
+    cores = plt.get_cmap("viridis")(
+        Normalize(vmin=0, vmax=max(codigos.max(), 1))(codigos)
+    )
+    cores[codigos == -1] = to_rgba("gray")
+    total = np.bincount(celula, minlength=resolucao * resolucao)
+    imagem = np.zeros((resolucao * resolucao, 4))
+    imagem[celulas[dominante]] = cores[rotulos[dominante]]
+    imagem[:, 3] = np.where(
+        total > 0, 0.3 + 0.7 * np.log1p(total) / np.log1p(total.max()), 0.0
+    )
+    return imagem.reshape(resolucao, resolucao, 4), extent
+
+
+def desenhar_grafico_2d(
+    ax, X_plot, labels, title, centers=None, limite_pontos=None, modo="amostra"
+):
+    """
+    Desenha o gráfico de dispersão 2D dos clusters nos eixos 'ax'.
+
+    Com mais de 'limite_pontos' pontos, desenha uma amostra estratificada
+    por rótulo (modo "amostra") ou a grade de densidade de
+    'imagem_densidade' (modo "densidade"), e indica isso no gráfico.
+    """
+    n = len(labels)
+    nota = None
+    densidade = limite_pontos is not None and n > limite_pontos and modo == "densidade"
+    if densidade:
+        imagem, extent = imagem_densidade(X_plot, labels)
+        ax.imshow(
+            imagem,
+            extent=extent,
+            origin="lower",
+            aspect="auto",
+            interpolation="nearest",
+        )
+        nota = f"densidade de {n} pontos"
+    elif limite_pontos is not None and n > limite_pontos:
+        indices = indices_estratificados(labels, limite_pontos)
+        X_plot, labels = X_plot[indices], labels[indices]
+        nota = f"amostra estratificada: {len(indices)} de {n} pontos"
+
+    # 'labels == -1' é para ruído (comum em DBSCAN, OPTICS, HDBSCAN)
+    # Damos a eles uma cor cinza e tamanho menor
+    if not densidade and -1 in labels:
+        noise_mask = labels == -1
+        ax.scatter(
+            X_plot[noise_mask, 0],
+            X_plot[noise_mask, 1],
+            c="gray",
+            s=10,
+            alpha=0.5,
+            label="Ruído",
+        )
+        # Plota os pontos não-ruído
+        core_mask = ~noise_mask
+        ax.scatter(
+            X_plot[core_mask, 0],
+            X_plot[core_mask, 1],
+            c=labels[core_mask],
+            s=50,
+            cmap="viridis",
+            alpha=0.7,
+        )
+    elif not densidade:
+        # Plota normalmente se não houver ruído
+        ax.scatter(
+            X_plot[:, 0],
+            X_plot[:, 1],
+            c=labels,
+            s=50,
+            cmap="viridis",
+            alpha=0.7,
+        )
+
+    # Plota centróides, se fornecidos
+    if centers is not None:
+        ax.scatter(
+            centers[:, 0],
+            centers[:, 1],
+            c="red",
+            s=250,
+            marker="X",
+            alpha=0.9,
+            label="Centróides",
+        )
+
+    ax.set_title(title)
+    ax.set_xlabel("Componente 1" if X_plot.shape[1] > 1 else X_plot.columns[0])
+    ax.set_ylabel("Componente 2" if X_plot.shape[1] > 1 else X_plot.columns[1])
+    if (-1 in labels and not densidade) or centers is not None:
+        ax.legend()
+    if nota is not None:
+        ax.text(
+            0.01,
+            0.01,
+            nota,
+            transform=ax.transAxes,
+            fontsize=8,
+            bbox=dict(facecolor="white", alpha=0.7),
+        )
+    ax.grid(True)
+
+
+def plotar_grafico_2d(
+    X_plot, labels, title, output_path, centers=None, limite_pontos=None, modo="amostra"
+):
+    """
+    Função auxiliar para criar e salvar gráficos 2D (PNG) com Matplotlib.
+    """
+    fig, ax = plt.subplots(figsize=(12, 8))
+    desenhar_grafico_2d(
+        ax, X_plot, labels, title, centers, limite_pontos=limite_pontos, modo=modo
+    )
+    fig.savefig(output_path)
+    plt.close(fig)
+
+
+def _inteiros_compactos(labels):
+    """Rótulos no menor tipo inteiro que os comporta (int8, int16 ou int32)."""
+    labels = np.asarray(labels)
+    for tipo in (np.int8, np.int16):
+        if labels.size == 0 or labels.max() <= np.iinfo(tipo).max:
+            return labels.astype(tipo)
+    return labels.astype(np.int32)
+
+
+def _array_tipado(valores):
+    """Especificação de array tipado do Plotly ({'dtype', 'bdata'} em base64)."""
+    return {
+        "dtype": valores.dtype.str.lstrip("<|="),
+        "bdata": base64.b64encode(valores.tobytes()).decode("ascii"),
+    }
+
+
+def _estilo_rotulos(labels):
+    """
+    Cores discretas para uma única série 3D: escala "em degraus" em que cada
+    rótulo inteiro (-1 = ruído, em cinza) ocupa uma faixa de mesma largura.
+    """
+    k = int(labels.max(initial=-1)) + 1
+    paleta = ["grey"] + [
+        CORES_CLUSTERS[i % len(CORES_CLUSTERS)] for i in range(max(k, 1))
+    ]
+    escala = []
+    for i, cor in enumerate(paleta):
+        escala += [[i / len(paleta), cor], [(i + 1) / len(paleta), cor]]
+    valores = list(range(-1, len(paleta) - 1))
+    return {
+        "marker.colorscale": escala,
+        "marker.cmin": -1.5,
+        "marker.cmax": len(paleta) - 1.5,
+        "marker.colorbar.tickvals": valores,
+        "marker.colorbar.ticktext": ["Ruído"] + [str(v) for v in valores[1:]],
+    }
+
+
+def _figura_3d(pontos, colunas, labels, title):
+    """Figura 3D com uma única série (coordenadas float32 e rótulos inteiros)."""
+    fig = go.Figure(
+        go.Scatter3d(
+            x=pontos[:, 0],
+            y=pontos[:, 1],
+            z=pontos[:, 2],
+            mode="markers",
+            marker=dict(color=labels, size=3, colorbar=dict(title="Cluster")),
+        )
+    )
+    fig.update_traces(
+        {
+            chave.replace(".", "_"): valor
+            for chave, valor in _estilo_rotulos(labels).items()
+        }
+    )
+    fig.update_layout(
+        title=title,
+        scene=dict(
+            xaxis_title=colunas[0], yaxis_title=colunas[1], zaxis_title=colunas[2]
+        ),
+        margin=dict(l=20, r=20, t=40, b=20),
+        paper_bgcolor="LightSteelBlue",
+    )
+    return fig
+
+
+def salvar_graficos_3d(df_pontos, graficos, output_prefix, limite_pontos=None):
+    """
+    Salva os gráficos 3D de todos os algoritmos de um conjunto de dados.
+
+    'graficos' é uma lista [(nome_arquivo, nome_amigavel, labels, title)].
+    Gera um único HTML '{output_prefix}_graficos_3d.html' com as coordenadas
+    gravadas uma vez (float32 em binário) e um menu para trocar de
+    algoritmo, em que cada opção carrega só o seu vetor de rótulos (int8/
+    int16). O endereço 'arquivo.html#<nome_arquivo>' abre direto num
+    algoritmo. Os PNGs '{output_prefix}_<nome_arquivo>.png' são exportados
+    todos de uma vez, numa única sessão do kaleido.
+
+    Com mais de 'limite_pontos' pontos, todos os algoritmos mostram a mesma
+    amostra: a união das amostras estratificadas pelos rótulos de cada um
+    (cada uma com limite_pontos / nº de algoritmos pontos), de modo que
+    nenhum cluster de nenhum algoritmo desaparece.
+    """
+    print(f"  Gerando gráficos 3D ({len(graficos)} algoritmos)...")
+    colunas = list(df_pontos.columns[:3])
+    pontos = df_pontos[colunas].to_numpy(dtype=np.float32)
+
+    n = pontos.shape[0]
+    indices = np.arange(n)
+    if limite_pontos is not None and n > limite_pontos:
+        cota = max(1, limite_pontos // len(graficos))
+        indices = np.unique(
+            np.concatenate(
+                [indices_estratificados(labels, cota) for _, _, labels, _ in graficos]
+            )
+        )
+        pontos = pontos[indices]
+
+    figuras, botoes = [], []
+    for nome_arquivo, nome_amigavel, labels, title in graficos:
+        labels = _inteiros_compactos(np.asarray(labels)[indices])
+        if len(indices) < n:
+            title = f"{title} [amostra: {len(indices)} de {n} pontos]"
+        figuras.append(_figura_3d(pontos, colunas, labels, title))
+        estilo = {chave: [valor] for chave, valor in _estilo_rotulos(labels).items()}
+        botoes.append(
+            dict(
+                label=nome_amigavel,
+                name=nome_arquivo,
+                method="update",
+                args=[
+                    {"marker.color": [_array_tipado(labels)], **estilo},
+                    {"title.text": title},
+                ],
+            )
+        )
+
+    # O HTML parte da figura do primeiro algoritmo e troca só cores/título
+    combinada = go.Figure(figuras[0])
+    combinada.update_layout(
+        updatemenus=[dict(buttons=botoes, x=0, xanchor="left", y=1.0, yanchor="top")]
+    )
+    html_file_path = f"{output_prefix}_graficos_3d.html"
+    combinada.write_html(html_file_path, post_script=SCRIPT_ALGORITMO_DO_ENDERECO)
+
+    png_paths = [f"{output_prefix}_{nome_arquivo}.png" for nome_arquivo, *_ in graficos]
+    try:
+        pio.write_images(figuras, png_paths, width=800, height=600)
+    except Exception as e:
+        print("  AVISO: Não foi possível salvar as imagens estáticas 3D.")
+        print("  Certifique-se que 'kaleido' está instalado: pip install kaleido")
+        print(f"  Erro: {e}")
+    return html_file_path
+
+
+def _inicializar_renderizador(descritor):
+    """'initializer' do pool: backend sem janela, pontos e figura do worker."""
+    global _FIGURA, _EIXOS
+    matplotlib.use("Agg")
+    inicializar_worker(descritor)
+    _FIGURA, _EIXOS = plt.subplots(figsize=(12, 8))
+
+
+def _renderizar_2d(labels, title, output_path, centers, limite_pontos, modo):
+    _EIXOS.clear()
+    desenhar_grafico_2d(
+        _EIXOS,
+        array_do_worker(),
+        labels,
+        title,
+        centers,
+        limite_pontos=limite_pontos,
+        modo=modo,
+    )
+    _FIGURA.savefig(output_path)
+    return output_path
+
+
+def _renderizar_3d(colunas, graficos, output_prefix, limite_pontos):
+    df_pontos = pd.DataFrame(array_do_worker(), columns=colunas)
+    return salvar_graficos_3d(df_pontos, graficos, output_prefix, limite_pontos)
+
+
+class FilaRenderizacao:
+    """
+    Pool de processos que salva os gráficos de um conjunto de dados.
+
+    'X_plot' (array ou DataFrame, no caso 3D) é copiado uma única vez para
+    memória compartilhada. 'enviar_2d'/'enviar_3d' retornam imediatamente;
+    ao sair do 'with' a fila espera todos os gráficos e informa os que
+    falharam.
+
+    'limite_pontos' e 'modo' controlam os gráficos de conjuntos grandes
+    (ver 'desenhar_grafico_2d'); o 3D sempre usa amostra.
+    """
+
+    def __init__(
+        self,
+        X_plot,
+        n_workers=N_WORKERS_RENDERIZACAO,
+        limite_pontos=None,
+        modo="amostra",
+    ):
+        self.colunas = list(X_plot.columns) if hasattr(X_plot, "columns") else None
+        self.pontos = np.asarray(X_plot)
+        self.n_workers = n_workers
+        self.limite_pontos = limite_pontos
+        self.modo = modo
+        self.pendentes = []
+
+    def __enter__(self):
+        self._compartilhado = array_compartilhado(self.pontos)
+        descritor = self._compartilhado.__enter__()
+        # Nada de 'fork': enquanto a fila está aberta, o escalonador bifurca
+        # o processo principal a cada algoritmo, e bifurcar um processo com
+        # threads vivas pode copiar travas presas. O 'forkserver' cria os
+        # workers a partir de um processo limpo, com Matplotlib/Plotly
+        # pré-carregados uma única vez.
+        if "forkserver" in mp.get_all_start_methods():
+            contexto = mp.get_context("forkserver")
+            contexto.set_forkserver_preload(["renderizacao"])
+        else:
+            contexto = mp.get_context("spawn")
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.n_workers,
+            mp_context=contexto,
+            initializer=_inicializar_renderizador,
+            initargs=(descritor,),
+        )
+        return self
+
+    def enviar_2d(self, labels, title, output_path, centers=None):
+        """Agenda um gráfico 2D (PNG)."""
+        self.pendentes.append(
+            self._pool.submit(
+                _renderizar_2d,
+                labels,
+                title,
+                output_path,
+                centers,
+                self.limite_pontos,
+                self.modo,
+            )
+        )
+
+    def enviar_3d(self, graficos, output_prefix):
+        """
+        Agenda os gráficos 3D de todos os algoritmos (ver 'salvar_graficos_3d');
+        exige que X_plot seja DataFrame.
+        """
+        self.pendentes.append(
+            self._pool.submit(
+                _renderizar_3d,
+                self.colunas,
+                graficos,
+                output_prefix,
+                self.limite_pontos,
+            )
+        )
+
+    def __exit__(self, *exc):
+        try:
+            for futuro in self.pendentes:
+                try:
+                    futuro.result()
+                except Exception as e:
+                    print(f"  AVISO: falha ao gerar gráfico ({type(e).__name__}: {e}).")
+        finally:
+            self._pool.shutdown(wait=True)
+            self._compartilhado.__exit__(None, None, None)
+        return False
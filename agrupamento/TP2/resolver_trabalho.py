@@ -1,12 +1,12 @@
 # -*- coding: utf-8 -*-
+import argparse
 import os
+import time
 import warnings
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
-import plotly.express as px
 from sklearn.preprocessing import StandardScaler
-from sklearn.decomposition import PCA
 from sklearn.cluster import (
     KMeans,
     MiniBatchKMeans,
@@ -16,13 +16,54 @@ from sklearn.cluster import (
     AgglomerativeClustering,
     OPTICS,
     MeanShift,
-    SpectralClustering,
     HDBSCAN,
 )
 from sklearn.mixture import GaussianMixture
-from sklearn.neighbors import kneighbors_graph
-from sklearn.utils._testing import ignore_warnings  # Para ignorar UserWarnings
 from sklearn.exceptions import ConvergenceWarning
+from sklearn.utils.validation import has_fit_parameter
+
+from afinidade_esparsa import AffinityPropagationEsparsa
+from espectral import SpectralEscalavel
+from cache_dados import ler_csv_em_cache
+from cache_resultados import CacheResultados, hash_dados
+from consenso import salvar_consenso
+from coreset import (
+    construir_coreset,
+    representante_mais_proximo,
+    salvar_relatorio_coreset,
+)
+from cotovelo import varrer_cotovelo
+from escalonador import executar_com_orcamento, memoria_disponivel_mb
+from hierarquico import salvar_cortes_hierarquicos
+from metricas import salvar_metricas
+from modelo_atribuicao import (
+    carregar_modelos_atribuicao,
+    modelo_centroides,
+    modelo_densidade,
+    modelo_gaussiano,
+    modelo_mistura,
+    modelo_votacao,
+    salvar_modelos_atribuicao,
+)
+from selecao_gmm import salvar_selecao_gmm, selecionar_gmm
+from projecao import ajustar_projecao, escolher_metodo_pca, projetar
+from renderizacao import FilaRenderizacao
+from streaming import (
+    padronizar_em_blocos,
+    projetar_em_blocos,
+    rotular_em_blocos,
+    treinar_em_blocos,
+)
+from varredura_eps import salvar_varredura_eps
+from varredura_hdbscan import salvar_varredura_hdbscan
+from vizinhanca import (
+    construir_indice_vizinhanca,
+    estimar_arestas_raio,
+    estimar_bandwidth,
+    grafo_knn,
+    grafo_raio,
+    limite_arestas_raio,
+)
 
 # Importar kaleido não é necessário, mas ele precisa estar instalado
 # import kaleido
@@ -36,22 +77,156 @@ warnings.filterwarnings("ignore", category=ConvergenceWarning)
 INPUT_DIR = "./content"
 OUTPUT_DIR = "./result"
 
+# --- Orçamento por algoritmo (None desativa o limite) ---
+TEMPO_LIMITE_ALGORITMO = 300  # segundos de relógio
+MEMORIA_LIMITE_ALGORITMO_MB = 4096  # RAM adicional usada pelo algoritmo
+
+# --- Modo streaming ---
+TAMANHO_BLOCO = 100_000  # linhas lidas por vez (--chunksize)
+TAMANHO_AMOSTRA_STREAMING = 10_000  # amostra da passada 1 em que o k é escolhido
+
+# --- Cache de resultados (pares dados/algoritmo inalterados não rodam de novo) ---
+USAR_CACHE = True  # --sem-cache desativa (também o cache binário dos dados)
+CACHE_DIR = "./cache"
+CACHE_DADOS_DIR = os.path.join(CACHE_DIR, "dados")  # arquivos de content/ já lidos
+LIMITE_CACHE_MB = 512  # acima disso, os resultados menos usados são apagados
+
+# --- Gráficos de conjuntos grandes (o agrupamento usa sempre todos os pontos) ---
+LIMITE_PONTOS_GRAFICO = 50_000  # acima disso o gráfico é amostrado/agregado
+MODO_GRAFICO = "amostra"  # "amostra" (estratificada por rótulo) ou "densidade"
+
+# --- Precisão dos dados (float32 usa metade da memória e da banda) ---
+DTYPE = "float64"  # --dtype float32 mantém os dados em float32 de ponta a ponta
+
+# --- Varredura do eps do DBSCAN (uma única busca de vizinhos) ---
+VARRER_EPS = True  # --sem-varredura-eps desativa
+N_EPS_VARREDURA = 8  # valores de eps em torno do sugerido pela k-distância
+
+# --- Varredura do HDBSCAN (uma árvore por min_samples) ---
+VARRER_HDBSCAN = True  # --sem-varredura-hdbscan desativa
+
+# --- Busca de vizinhos do índice compartilhado ---
+VIZINHANCA = "exato"  # --vizinhanca aproximado: floresta de projeções aleatórias
+
+# --- Coreset para os algoritmos super-lineares (None desativa) ---
+TAMANHO_CORESET = None  # --coreset N: N representantes (ex.: 3000)
+# Quem aceita 'sample_weight' roda na amostra por sensibilidade, com os
+# pesos; os demais, numa amostra uniforme (ver 'preparar_coreset')
+ALGORITMOS_CORESET = (
+    "affinity",
+    "agglomerative",
+    "optics",
+    "ward",
+    "spectral",
+    "meanshift",
+)
+CORESET_REFERENCIA = False  # --coreset-referencia roda também os dados completos
+
+# --- Modelos de atribuição (rotulam pontos novos sem reajuste) ---
+MODELOS_DIR = os.path.join(OUTPUT_DIR, "modelos")
+TIPO_MODELO = {
+    "kmeans": "centroides",
+    "minibatch_kmeans": "centroides",
+    "birch": "centroides",
+    "meanshift": "centroides",
+    "affinity": "exemplares",
+    "gmm": "gaussiano",
+    "dbscan": "densidade",
+    "optics": "densidade",
+    "hdbscan": "densidade",
+    "agglomerative": "votacao_knn",
+    "ward": "votacao_knn",
+    "spectral": "votacao_knn",
+}
+
+# --- Seleção do GMM por BIC na grade (n_components, covariance_type) ---
+SELECIONAR_GMM = True  # --sem-selecao-gmm usa GaussianMixture(k_ideal, "full")
+
+# --- Maior k da varredura do cotovelo e dos cortes das árvores hierárquicas ---
+K_MAX_COTOVELO = 10
+
+# --- Parâmetros dos algoritmos (alguns baseados no Colab do professor) ---
+PARAMS = {
+    "quantile": 0.3,
+    "eps": 0.5,
+    "min_samples": 10,
+    "damping": 0.9,
+    "preference": -200,
+    "n_neighbors": 3,
+    "hdbscan_min_cluster_size": 15,
+    "hdbscan_min_samples": 3,
+    "hdbscan_allow_single_cluster": True,
+    "hdbscan_cluster_selection_method": "eom",
+    # Grade da varredura (min_samples <= indice_n_vizinhos)
+    "hdbscan_varredura_min_samples": (3, 5, 10),
+    "hdbscan_varredura_min_cluster_size": (5, 10, 15, 30, 60, 120),
+    "optics_min_samples": 10,
+    "optics_xi": 0.05,
+    "optics_min_cluster_size": 0.1,
+    "spectral_n_neighbors": 10,
+    # Autossolver do Spectral por n: ARPACK, LOBPCG/AMG ou Nyström (marcos)
+    "spectral_limite_arpack": 10_000,
+    "spectral_limite_nystrom": 100_000,
+    "spectral_n_marcos": 1000,
+    "indice_n_vizinhos": 30,
+    "affinity_n_neighbors": 20,
+    "affinity_limite_denso": 5000,
+    # Floresta de projeções: refina até 'ann_recall_alvo' (ou até parar
+    # de melhorar); o índice avisa se o recall ficar abaixo de 0.8
+    "ann_n_arvores": 16,
+    "ann_refinamentos": 2,
+    "ann_recall_alvo": 0.9,
+    "modelo_n_vizinhos": 15,
+    "consenso_n_vizinhos": 15,
+    "consenso_limiar": 0.5,
+    "consenso_tamanho_minimo": 5,
+}
+
+
+def ler_pontos(file_path, colunas_texto=()):
+    """
+    Lê o CSV com as colunas numéricas já em DTYPE, para que os dados não
+    passem por float64 quando DTYPE é float32. 'colunas_texto' (ex.: o
+    rótulo 'variety' do Iris) são lidas normalmente. Com o cache ativo, o
+    arquivo só é interpretado na primeira vez (ver 'cache_dados.py').
+    """
+    colunas = pd.read_csv(file_path, nrows=0).columns
+    tipos = {coluna: DTYPE for coluna in colunas if coluna not in colunas_texto}
+    if USAR_CACHE:
+        return ler_csv_em_cache(
+            file_path, CACHE_DADOS_DIR, chunksize=TAMANHO_BLOCO, dtype=tipos
+        )
+    return pd.read_csv(file_path, dtype=tipos)
+
 
-def plotar_grafico_cotovelo(X_scaled, title_suffix, output_basename):
+def plotar_grafico_cotovelo(X_scaled, title_suffix, output_basename, k_padrao=None):
     """
     Calcula e salva o gráfico do Método do Cotovelo (WSS).
+
+    A varredura roda em paralelo e para sozinha quando o joelho da curva é
+    confirmado (ver 'cotovelo.py'), então nem sempre chega a k=10.
+    Retorna (k_ideal, modelos): k_ideal é o joelho detectado (ou 'k_padrao'
+    se a curva não tiver joelho) e 'modelos' é o dicionário {k: KMeans já
+    ajustado}, para que o K-Means final reaproveite o modelo em vez de ser
+    ajustado de novo.
     """
     print(f"  Calculando WSS para o Método do Cotovelo ({title_suffix})...")
-    wss = []
-    K_range = range(1, 11)
-
-    for k in K_range:
-        kmeans_elbow = KMeans(n_clusters=k, random_state=42, n_init=10)
-        kmeans_elbow.fit(X_scaled)
-        wss.append(kmeans_elbow.inertia_)
+    K_range, wss, modelos, k_joelho = varrer_cotovelo(
+        X_scaled, k_max=K_MAX_COTOVELO, n_init=10
+    )
+    k_ideal = k_joelho if k_joelho is not None else k_padrao
+    if k_joelho is None:
+        print(f"  AVISO: joelho não detectado, usando k={k_padrao}.")
+    else:
+        print(f"  Joelho detectado em k={k_joelho} (varredura até k={K_range[-1]}).")
 
     plt.figure(figsize=(10, 6))
     plt.plot(K_range, wss, "bo-")
+    if k_joelho is not None:
+        plt.axvline(
+            k_joelho, color="red", linestyle="--", label=f"Joelho (k={k_joelho})"
+        )
+        plt.legend()
     plt.xlabel("Número de Clusters (k)")
     plt.ylabel("WSS (Inertia)")
     plt.title(f"Método do Cotovelo (Elbow Method) - {title_suffix}")
@@ -60,148 +235,74 @@ def plotar_grafico_cotovelo(X_scaled, title_suffix, output_basename):
     plt.savefig(cotovelo_path)
     plt.close()
     print(f"  Gráfico do Cotovelo salvo em: {cotovelo_path}")
+    return k_ideal, modelos
 
 
-def plotar_grafico_2d(X_plot, labels, title, output_path, centers=None):
-    """
-    Função auxiliar para criar e salvar gráficos 2D (PNG) com Matplotlib.
-    """
-    plt.figure(figsize=(12, 8))
-    # 'labels == -1' é para ruído (comum em DBSCAN, OPTICS, HDBSCAN)
-    # Damos a eles uma cor cinza e tamanho menor
-    if -1 in labels:
-        noise_mask = labels == -1
-        plt.scatter(
-            X_plot[noise_mask, 0],
-            X_plot[noise_mask, 1],
-            c="gray",
-            s=10,
-            alpha=0.5,
-            label="Ruído",
-        )
-        # Plota os pontos não-ruído
-        core_mask = ~noise_mask
-        plt.scatter(
-            X_plot[core_mask, 0],
-            X_plot[core_mask, 1],
-            c=labels[core_mask],
-            s=50,
-            cmap="viridis",
-            alpha=0.7,
-        )
-    else:
-        # Plota normalmente se não houver ruído
-        plt.scatter(
-            X_plot[:, 0],
-            X_plot[:, 1],
-            c=labels,
-            s=50,
-            cmap="viridis",
-            alpha=0.7,
-        )
-
-    # Plota centróides, se fornecidos
-    if centers is not None:
-        plt.scatter(
-            centers[:, 0],
-            centers[:, 1],
-            c="red",
-            s=250,
-            marker="X",
-            alpha=0.9,
-            label="Centróides",
-        )
-
-    plt.title(title)
-    plt.xlabel("Componente 1" if X_plot.shape[1] > 1 else X_plot.columns[0])
-    plt.ylabel("Componente 2" if X_plot.shape[1] > 1 else X_plot.columns[1])
-    if -1 in labels or centers is not None:
-        plt.legend()
-    plt.grid(True)
-    plt.savefig(output_path)
-    plt.close()
-
-
-def plotar_grafico_3d(df_plot, labels_col, title, output_basename):
+def selecionar_modelo_gmm(X_scaled, dataset_name, problem_prefix):
     """
-    Função auxiliar para criar e salvar gráficos 3D interativos (HTML)
-    e estáticos (PNG). (Reutilizada do TP1)
+    Seleciona o Gaussian Mixture de menor BIC na grade (k = 1..
+    K_MAX_COTOVELO) × tipos de covariância, em paralelo e com poda (ver
+    'selecao_gmm.py'). Salva a tabela BIC/AIC em TXT e a superfície do
+    BIC em PNG. Retorna (modelo, tempo_em_segundos).
     """
-    print(f"  Gerando gráfico 3D: {title}...")
-
-    # Converte labels para string para Plotly tratar cores discretas
-    df_plot[labels_col] = df_plot[labels_col].astype(str)
-
-    fig = px.scatter_3d(
-        df_plot,
-        x=df_plot.columns[0],
-        y=df_plot.columns[1],
-        z=df_plot.columns[2],
-        color=labels_col,
-        title=title,
-        color_discrete_map={"-1": "grey"},  # Mapeia ruído para cinza
+    print(f"  Selecionando o Gaussian Mixture por BIC ({dataset_name})...")
+    inicio = time.perf_counter()
+    modelo, tabela = selecionar_gmm(X_scaled, k_max=K_MAX_COTOVELO)
+    tempo = time.perf_counter() - inicio
+    print(
+        f"  GMM escolhido: k={modelo.n_components}, "
+        f"covariância '{modelo.covariance_type}' "
+        f"({len(tabela)} ajustes na grade, {tempo:.2f}s)."
     )
 
-    fig.update_layout(
-        margin=dict(l=20, r=20, t=40, b=20), paper_bgcolor="LightSteelBlue"
+    salvar_selecao_gmm(
+        modelo, tabela, dataset_name, OUTPUT_DIR, problem_prefix, K_MAX_COTOVELO
     )
+    return modelo, tempo
 
-    html_file_path = f"{output_basename}.html"
-    fig.write_html(html_file_path)
-
-    png_file_path = f"{output_basename}.png"
-    try:
-        fig.write_image(png_file_path, width=800, height=600)
-    except Exception as e:
-        print(f"  AVISO: Não foi possível salvar a imagem estática {png_file_path}.")
-        print("  Certifique-se que 'kaleido' está instalado: pip install kaleido")
-        print(f"  Erro: {e}")
 
-
-def executar_e_plotar_algoritmos(
-    X_scaled, X_plot, dataset_name, problem_prefix, k_ideal, is_3d=False
-):
+def montar_algoritmos(X_scaled, k_ideal, indice, params=PARAMS, ponderado=False):
     """
-    Executa todos os 12 algoritmos de clusterização e salva seus gráficos.
+    Monta a lista dos 12 algoritmos com os parâmetros do trabalho. Com
+    'ponderado' (coreset), a Affinity Propagation é sempre a esparsa,
+    que aceita 'sample_weight'; com poucos pontos ela vai direto para o
+    nível denso ponderado.
+
+    Retorna (algoritmos, entradas): 'algoritmos' é a lista de
+    (Nome Amigável, nome_arquivo, instância_do_algoritmo) e 'entradas'
+    mapeia nome_arquivo -> insumo pré-calculado (grafo do índice de
+    vizinhança) usado no lugar de X_scaled.
     """
-    print(f"\nIniciando execução dos 12 algoritmos para {dataset_name}...")
-
-    # X_plot pode ser um DataFrame (3D) ou np.array (2D)
-    df_plot = None
-    if is_3d:
-        df_plot = X_plot.copy()
-
-    # Parâmetros (alguns baseados no Colab do professor)
-    params = {
-        "quantile": 0.3,
-        "eps": 0.5,
-        "min_samples": 10,
-        "damping": 0.9,
-        "preference": -200,
-        "n_neighbors": 3,
-        "hdbscan_min_cluster_size": 15,
-        "hdbscan_min_samples": 3,
-        "optics_min_samples": 10,
-        "optics_xi": 0.05,
-        "optics_min_cluster_size": 0.1,
-    }
-
-    # Estrutura dos algoritmos
-    # (Nome Amigável, nome_arquivo, instância_do_algoritmo)
-
     # Conectividade para Ward e Agglomerative
-    connectivity = kneighbors_graph(
-        X_scaled, n_neighbors=params["n_neighbors"], include_self=False
-    )
+    connectivity = grafo_knn(indice, params["n_neighbors"], modo="connectivity")
     connectivity = 0.5 * (connectivity + connectivity.T)
 
-    # Largura de banda para MeanShift
-    bandwidth = 0.3  # Valor padrão, estimate_bandwidth pode ser lento
-    # try:
-    #     bandwidth = cluster.estimate_bandwidth(X_scaled, quantile=params["quantile"])
-    # except Exception:
-    #     print("  Aviso: estimate_bandwidth falhou, usando padrão 0.3.")
-    #     bandwidth = 0.3
+    # Insumos pré-calculados (metric="precomputed") no lugar de X_scaled.
+    # Sem o grafo de raio no índice (ver 'raio_do_indice'), DBSCAN e OPTICS
+    # usam X_scaled; o HDBSCAN continua no grafo kNN, que é conexo.
+    entradas = {"hdbscan": indice["grafo"]}
+    if indice["raio"] >= params["eps"]:
+        entradas["dbscan"] = grafo_raio(indice, params["eps"])
+        entradas["optics"] = indice["grafo"]
+
+    # Largura de banda para MeanShift: versão amostrada de estimate_bandwidth
+    # (o índice só é usado com quantis pequenos, ver 'estimar_bandwidth')
+    # (o original é O(n²)), reaproveitando o índice quando possível
+    bandwidth = estimar_bandwidth(X_scaled, quantile=params["quantile"], indice=indice)
+    if bandwidth <= 0:
+        print("  Aviso: bandwidth estimada é zero, usando padrão 0.3.")
+        bandwidth = 0.3
+
+    # Affinity Propagation densa é O(n²) em memória; acima do limite usa a
+    # versão esparsa, com mensagens só pelas arestas do índice de vizinhança
+    if X_scaled.shape[0] <= params["affinity_limite_denso"] and not ponderado:
+        affinity = AffinityPropagation(damping=params["damping"], random_state=42)
+    else:
+        affinity = AffinityPropagationEsparsa(
+            damping=params["damping"],
+            grafo_knn=grafo_knn(indice, params["affinity_n_neighbors"]),
+            random_state=42,
+        )
 
     algoritmos = [
         ("K-Means", "kmeans", KMeans(n_clusters=k_ideal, random_state=42, n_init=10)),
@@ -213,18 +314,20 @@ def executar_e_plotar_algoritmos(
         (
             "DBSCAN",
             "dbscan",
-            DBSCAN(eps=params["eps"], min_samples=params["min_samples"]),
-        ),
-        (
-            "Affinity Propagation",
-            "affinity",
-            AffinityPropagation(damping=params["damping"], random_state=42),
+            DBSCAN(
+                eps=params["eps"],
+                min_samples=params["min_samples"],
+                metric="precomputed" if "dbscan" in entradas else "euclidean",
+            ),
         ),
+        ("Affinity Propagation", "affinity", affinity),
         ("BIRCH", "birch", Birch(n_clusters=k_ideal)),
         (
             "Agglomerative Clustering",
             "agglomerative",
-            AgglomerativeClustering(n_clusters=k_ideal),
+            AgglomerativeClustering(
+                n_clusters=k_ideal, compute_full_tree=True, compute_distances=True
+            ),
         ),
         (
             "Gaussian Mixture",
@@ -238,6 +341,7 @@ def executar_e_plotar_algoritmos(
                 min_samples=params["optics_min_samples"],
                 xi=params["optics_xi"],
                 min_cluster_size=params["optics_min_cluster_size"],
+                metric="precomputed" if "optics" in entradas else "minkowski",
             ),
         ),
         (
@@ -246,72 +350,606 @@ def executar_e_plotar_algoritmos(
             HDBSCAN(
                 min_cluster_size=params["hdbscan_min_cluster_size"],
                 min_samples=params["hdbscan_min_samples"],
-                allow_single_cluster=True,
+                allow_single_cluster=params["hdbscan_allow_single_cluster"],
+                cluster_selection_method=params["hdbscan_cluster_selection_method"],
+                metric="precomputed",
             ),
         ),
         (
             "Ward",
             "ward",
             AgglomerativeClustering(
-                n_clusters=k_ideal, linkage="ward", connectivity=connectivity
+                n_clusters=k_ideal,
+                linkage="ward",
+                connectivity=connectivity,
+                compute_full_tree=True,
+                compute_distances=True,
             ),
         ),
         (
             "Spectral Clustering",
             "spectral",
-            SpectralClustering(
-                n_clusters=k_ideal, affinity="nearest_neighbors", random_state=42
+            SpectralEscalavel(
+                n_clusters=k_ideal,
+                n_neighbors=params["spectral_n_neighbors"],
+                grafo_knn=grafo_knn(indice, params["spectral_n_neighbors"]),
+                limite_arpack=params["spectral_limite_arpack"],
+                limite_nystrom=params["spectral_limite_nystrom"],
+                n_marcos=params["spectral_n_marcos"],
+                random_state=42,
             ),
         ),
         ("MeanShift", "meanshift", MeanShift(bandwidth=bandwidth, bin_seeding=True)),
     ]
 
-    for nome_amigavel, nome_arquivo, algoritmo in algoritmos:
-        print(f"  Executando ({nome_amigavel})...")
+    return algoritmos, entradas
+
+
+def raio_do_indice(
+    X_scaled, backend="exato", memoria_limite_mb=MEMORIA_LIMITE_ALGORITMO_MB
+):
+    """
+    Raio da busca do índice de vizinhança: PARAMS["eps"] se o grafo de
+    raio estimado cabe na memória (o menor entre 'memoria_limite_mb' e a
+    memória livre), senão 0. Com raio 0, o índice guarda só os k
+    vizinhos e DBSCAN e OPTICS rodam sobre X, dentro do orçamento.
+    """
+    if backend != "exato":
+        return PARAMS["eps"]  # o backend aproximado não busca por raio
+    memorias = [m for m in (memoria_limite_mb, memoria_disponivel_mb()) if m]
+    if not memorias:
+        return PARAMS["eps"]
+    arestas = estimar_arestas_raio(X_scaled, PARAMS["eps"])
+    limite = limite_arestas_raio(min(memorias))
+    if arestas <= limite:
+        return PARAMS["eps"]
+    print(
+        f"  Aviso: grafo de raio estimado em {arestas:.1e} arestas (limite "
+        f"{limite:.1e}); DBSCAN e OPTICS rodarão sobre os dados."
+    )
+    return 0.0
+
+
+def preparar_coreset(X_scaled, k_ideal):
+    """
+    Sorteia o coreset de TAMANHO_CORESET representantes (ver 'coreset.py')
+    e monta sobre ele os algoritmos de ALGORITMOS_CORESET, com índice de
+    vizinhança próprio. Quem aceita 'sample_weight' roda na amostra por
+    sensibilidade, com os pesos; os demais perderiam os pesos e veriam a
+    densidade distorcida, então rodam numa amostra uniforme do mesmo
+    tamanho. O representante mais próximo de cada ponto (na amostra de
+    cada algoritmo) estende os rótulos a todos os pontos.
+    """
+    print(f"  Sorteando coreset de {TAMANHO_CORESET} representantes...")
+    inicio = time.perf_counter()
+
+    def sortear(amostragem):
+        indices, pesos = construir_coreset(
+            X_scaled,
+            TAMANHO_CORESET,
+            k_ideal,
+            random_state=42,
+            uniforme=amostragem == "uniforme",
+        )
+        X_coreset = X_scaled[indices]
+        indice = construir_indice_vizinhanca(
+            X_coreset,
+            n_vizinhos=min(PARAMS["indice_n_vizinhos"], len(indices) - 1),
+            raio=raio_do_indice(X_coreset),
+        )
+        algoritmos, entradas = montar_algoritmos(
+            X_coreset, k_ideal, indice, ponderado=True
+        )
+        return {
+            "indices": indices,
+            "pesos": pesos,
+            "representante": representante_mais_proximo(X_scaled, X_coreset),
+            "algoritmos": {
+                nome_arquivo: (nome_amigavel, algoritmo)
+                for nome_amigavel, nome_arquivo, algoritmo in algoritmos
+                if nome_arquivo in ALGORITMOS_CORESET
+            },
+            "entradas": {
+                nome_arquivo: entradas.get(nome_arquivo, X_coreset)
+                for nome_arquivo in ALGORITMOS_CORESET
+            },
+        }
+
+    amostras = {"sensibilidade": sortear("sensibilidade")}
+    amostragem = {
+        nome_arquivo: (
+            "sensibilidade"
+            if has_fit_parameter(algoritmo, "sample_weight")
+            else "uniforme"
+        )
+        for nome_arquivo, (_, algoritmo) in amostras["sensibilidade"][
+            "algoritmos"
+        ].items()
+    }
+    sem_pesos = [
+        nome_amigavel
+        for nome_arquivo, (nome_amigavel, _) in amostras["sensibilidade"][
+            "algoritmos"
+        ].items()
+        if amostragem[nome_arquivo] == "uniforme"
+    ]
+    if sem_pesos:
+        amostras["uniforme"] = sortear("uniforme")
+        print(
+            "  Sem 'sample_weight' (amostra uniforme, sem pesos): "
+            f"{', '.join(sem_pesos)}."
+        )
+    tempo = time.perf_counter() - inicio
+    print(
+        f"  Coreset: {len(amostras['sensibilidade']['indices'])} de "
+        f"{X_scaled.shape[0]} pontos em {tempo:.2f}s."
+    )
+
+    def por_algoritmo(campo):
+        return {
+            nome_arquivo: amostras[origem][campo][nome_arquivo]
+            for nome_arquivo, origem in amostragem.items()
+        }
+
+    return {
+        "tempo": tempo,
+        "amostras": {
+            origem: {"indices": amostra["indices"], "pesos": amostra["pesos"]}
+            for origem, amostra in amostras.items()
+        },
+        "amostragem": amostragem,
+        "algoritmos": {
+            nome_arquivo: algoritmo
+            for nome_arquivo, (_, algoritmo) in por_algoritmo("algoritmos").items()
+        },
+        "entradas": por_algoritmo("entradas"),
+        "indices": {
+            nome_arquivo: amostras[origem]["indices"]
+            for nome_arquivo, origem in amostragem.items()
+        },
+        # Só a amostra por sensibilidade leva pesos ao algoritmo
+        "pesos": {
+            nome_arquivo: (
+                amostras[origem]["pesos"] if origem == "sensibilidade" else None
+            )
+            for nome_arquivo, origem in amostragem.items()
+        },
+        "representante": {
+            nome_arquivo: amostras[origem]["representante"]
+            for nome_arquivo, origem in amostragem.items()
+        },
+    }
+
+
+def montar_modelo_atribuicao(nome_arquivo, X_scaled, indice, resultado):
+    """
+    Modelo de atribuição (ver 'modelo_atribuicao.py') de um algoritmo a
+    partir do seu resultado. Nos métodos de densidade, o alcance de cada
+    referência vem das distâncias do índice de vizinhança: eps para os
+    pontos centrais do DBSCAN; distância ao min_samples-ésimo vizinho
+    (contando o próprio ponto) no OPTICS e no HDBSCAN.
+    """
+    labels = np.asarray(resultado["labels"])
+    tipo = TIPO_MODELO[nome_arquivo]
+    centros = resultado.get("centers")
+    # Parâmetros ajustados (mistura do GMM, subclusters do BIRCH)
+    parametros = resultado.get("parametros")
+    if tipo == "centroides" and parametros and "centros" in parametros:
+        return modelo_centroides(parametros["centros"], rotulos=parametros["rotulos"])
+    if tipo in ("centroides", "exemplares") and centros is not None:
+        return modelo_centroides(centros, tipo)
+    if tipo == "gaussiano":
+        if parametros and "medias" in parametros:
+            return modelo_mistura(**parametros)
+        return modelo_gaussiano(X_scaled, labels)
+    if tipo == "densidade":
+        min_samples = {
+            "dbscan": PARAMS["min_samples"],
+            "optics": PARAMS["optics_min_samples"],
+            "hdbscan": PARAMS["hdbscan_min_samples"],
+        }[nome_arquivo]
+        coluna = min(max(min_samples - 2, 0), indice["n_vizinhos"] - 1)
+        distancia_nucleo = indice["distancias"][:, coluna]
+        if nome_arquivo == "dbscan":
+            return modelo_densidade(
+                X_scaled, labels, distancia_nucleo <= PARAMS["eps"], PARAMS["eps"]
+            )
+        return modelo_densidade(X_scaled, labels, True, distancia_nucleo)
+    return modelo_votacao(X_scaled, labels, PARAMS["modelo_n_vizinhos"])
+
+
+def executar_e_plotar_algoritmos(
+    X_scaled,
+    X_plot,
+    dataset_name,
+    problem_prefix,
+    k_ideal,
+    is_3d=False,
+    modelo_kmeans=None,
+    y_verdadeiro=None,
+    projecao=None,
+    scaler=None,
+):
+    """
+    Executa todos os 12 algoritmos de clusterização e salva seus gráficos.
+
+    Se 'modelo_kmeans' (já ajustado com k_ideal na varredura do cotovelo)
+    for fornecido, o K-Means não é ajustado de novo. Com 'y_verdadeiro'
+    (rótulos reais), a tabela de métricas inclui ARI e NMI. 'projecao' é o
+    modelo (com 'transform') que levou X_scaled a X_plot, usado para
+    desenhar os centróides no mesmo espaço. O 'scaler' que gerou X_scaled
+    vai junto com os modelos de atribuição salvos, para rotular dados brutos.
+
+    Com TAMANHO_CORESET, os algoritmos de ALGORITMOS_CORESET rodam sobre
+    um coreset (ponderado para quem aceita 'sample_weight', uniforme para
+    os demais) e os rótulos são estendidos a todos os pontos; o
+    relatório '<prefixo>_coreset.txt' compara com os dados completos.
+    """
+    print(f"\nIniciando execução dos 12 algoritmos para {dataset_name}...")
+
+    # X_plot pode ser um DataFrame (3D) ou np.array (2D)
+    # Índice de vizinhança único: kNN (maior k necessário) ∪ raio eps.
+    # Ward, Spectral, DBSCAN, OPTICS e HDBSCAN recebem recortes dele.
+    print(f"  Construindo índice de vizinhança compartilhado ({VIZINHANCA})...")
+    indice = construir_indice_vizinhanca(
+        X_scaled,
+        n_vizinhos=PARAMS["indice_n_vizinhos"],
+        raio=raio_do_indice(X_scaled, VIZINHANCA),
+        backend=VIZINHANCA,
+        opcoes_aproximado={
+            "n_arvores": PARAMS["ann_n_arvores"],
+            "refinamentos": PARAMS["ann_refinamentos"],
+            "recall_alvo": PARAMS["ann_recall_alvo"],
+        },
+    )
+    if indice["recall"] is not None:
+        print(f"  Recall dos vizinhos aproximados (amostra): {indice['recall']:.4f}")
+
+    algoritmos, entradas = montar_algoritmos(X_scaled, k_ideal, indice)
+
+    # (algoritmo, entrada, pesos) de cada execução. Com o coreset, os
+    # algoritmos super-lineares rodam sobre os representantes; as versões
+    # com os dados completos ('<nome>_completo') servem de referência
+    execucoes = {
+        nome_arquivo: (algoritmo, entradas.get(nome_arquivo), None)
+        for _, nome_arquivo, algoritmo in algoritmos
+    }
+    coreset = None
+    referencias = set()
+    if TAMANHO_CORESET is not None and X_scaled.shape[0] > TAMANHO_CORESET:
+        coreset = preparar_coreset(X_scaled, k_ideal)
+        for nome_arquivo, algoritmo in coreset["algoritmos"].items():
+            referencia = f"{nome_arquivo}_completo"
+            execucoes[referencia] = execucoes[nome_arquivo]
+            referencias.add(referencia)
+            execucoes[nome_arquivo] = (
+                algoritmo,
+                coreset["entradas"][nome_arquivo],
+                coreset["pesos"][nome_arquivo],
+            )
+
+    # K-Means reaproveitado da varredura do cotovelo: só atribui os rótulos
+    pre_ajustados = {}
+    if modelo_kmeans is not None:
+        pre_ajustados["kmeans"] = {
+            "status": "ok",
+            "labels": modelo_kmeans.predict(X_scaled),
+            "centers": modelo_kmeans.cluster_centers_,
+            "tempo": 0.0,
+            "pico_mb": 0.0,
+            "dtype": str(modelo_kmeans.cluster_centers_.dtype),
+        }
+
+    # GMM escolhido por BIC: já ajustado, substitui o GMM com k_ideal
+    if SELECIONAR_GMM:
+        modelo_gmm, tempo_gmm = selecionar_modelo_gmm(
+            X_scaled, dataset_name, problem_prefix
+        )
+        algoritmos = [
+            (nome, nome_arquivo, modelo_gmm if nome_arquivo == "gmm" else algoritmo)
+            for nome, nome_arquivo, algoritmo in algoritmos
+        ]
+        execucoes["gmm"] = (modelo_gmm, None, None)
+        pre_ajustados["gmm"] = {
+            "status": "ok",
+            "labels": modelo_gmm.predict(X_scaled),
+            "centers": None,
+            "tempo": tempo_gmm,
+            "pico_mb": None,
+            "dtype": str(modelo_gmm.means_.dtype),
+            "parametros": {
+                "medias": modelo_gmm.means_,
+                "covariancias": modelo_gmm.covariances_,
+                "pesos": modelo_gmm.weights_,
+                "tipo_covariancia": modelo_gmm.covariance_type,
+            },
+        }
+
+    # Pares (dados, algoritmo) que não mudaram desde a última execução
+    chaves_cache = {}
+    if USAR_CACHE:
+        cache = CacheResultados(CACHE_DIR, limite_mb=LIMITE_CACHE_MB)
+        hash_X = hash_dados(X_scaled)
+        for nome_arquivo, (algoritmo, entrada, pesos) in execucoes.items():
+            if nome_arquivo in pre_ajustados:
+                continue
+            if coreset is not None and nome_arquivo in coreset["algoritmos"]:
+                # Execução no coreset: a amostra e os pesos entram na chave
+                entrada = (entrada, coreset["indices"][nome_arquivo], pesos)
+            chave = cache.chave(hash_X, algoritmo, entrada)
+            resultado = cache.obter(chave)
+            if resultado is None:
+                chaves_cache[nome_arquivo] = chave
+            else:
+                resultado["cache"] = True
+                pre_ajustados[nome_arquivo] = resultado
+        n_cache = sum(
+            1
+            for nome_arquivo, r in pre_ajustados.items()
+            if r.get("cache") and nome_arquivo not in referencias
+        )
+        print(f"  {n_cache} resultado(s) reaproveitado(s) do cache.")
+
+    nomes_amigaveis = {nome_arquivo: nome for nome, nome_arquivo, _ in algoritmos}
+    estendidos = {}
+
+    def desenhar(nome_arquivo, resultado):
+        """Envia o gráfico de um algoritmo para a fila assim que ele termina."""
+        if nome_arquivo in referencias:
+            return  # Referência para o relatório do coreset, sem gráfico
+        nome_amigavel = nomes_amigaveis[nome_arquivo]
+        status = resultado["status"]
+        origem = ""
+        if coreset is not None and nome_arquivo in coreset["algoritmos"]:
+            # Rótulos do coreset -> todos os pontos (representante mais próximo)
+            resultado = {**resultado, "coreset": True}
+            if status == "ok":
+                resultado["labels"] = np.asarray(resultado["labels"])[
+                    coreset["representante"][nome_arquivo]
+                ]
+            estendidos[nome_arquivo] = resultado
+            origem = " (coreset)"
+        print(f"  ({nome_amigavel}): {status} em {resultado['tempo']:.2f}s{origem}")
 
         output_basename = os.path.join(OUTPUT_DIR, f"{problem_prefix}_{nome_arquivo}")
 
-        # Ajuste para GMM que não tem 'fit_predict'
-        if hasattr(algoritmo, "fit_predict"):
-            labels = algoritmo.fit_predict(X_scaled)
+        if status == "ok":
+            labels = resultado["labels"]
         else:
-            algoritmo.fit(X_scaled)
-            labels = algoritmo.predict(X_scaled)
-
-        # Ajuste para Affinity Propagation e K-Means que têm centróides
-        centers = None
-        if hasattr(algoritmo, "cluster_centers_"):
-            # Centros estão no espaço normalizado, precisamos "desnormalizar"
-            # Se X_plot é 2D (PCA), precisamos transformar os centros para PCA
-            if not is_3d and X_scaled.shape[1] != X_plot.shape[1]:
-                # Caso especial do PCA (Problema 2)
-                # Encontrar um 'scaler' de PCA para os centros
-                # Isso é complexo, vamos omitir os centros do PCA por simplicidade
-                centers = None
-            elif not is_3d:
-                # Caso 2D (Problemas 1 e 4)
-                # Precisamos de um 'scaler' 2D.
-                # Vamos simplificar: plotar centros no espaço escalado (PCA=False)
-                # O X_plot deve ser o X_scaled para isso funcionar
-                # Vamos re-plotar no espaço escalado para P1 e P4
-                centers = None  # Simplificando para não plotar centros no 2D
-            else:
+            # Sem rótulos: todos os pontos são desenhados como "ruído" (cinza)
+            print(f"  AVISO: {nome_amigavel} ignorado ({resultado['erro']}).")
+            labels = np.full(X_scaled.shape[0], -1)
+
+        # Centróides (K-Means, Affinity Propagation, MeanShift...) estão no
+        # espaço normalizado: no P2 vão para o 2D pela mesma projeção dos
+        # pontos; no P1 e P4 o gráfico já é o espaço normalizado
+        centers = resultado.get("centers")
+        if centers is not None:
+            if is_3d:
                 centers = None  # Não plotamos centros no 3D
+            elif projecao is not None:
+                centers = projecao.transform(centers)
+            elif X_scaled.shape[1] != X_plot.shape[1]:
+                centers = None
 
         n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
-        title = (
-            f"{nome_amigavel} - {dataset_name}\n(k={n_clusters} clusters encontrados)"
-        )
+        if status in ("timeout", "oom"):
+            title = f"{nome_amigavel} - {dataset_name}\n(skipped (timeout/OOM))"
+        elif status != "ok":
+            title = f"{nome_amigavel} - {dataset_name}\n(skipped (erro))"
+        else:
+            title = f"{nome_amigavel} - {dataset_name}\n(k={n_clusters} clusters encontrados)"
 
         if is_3d:
-            labels_col_name = f"{nome_arquivo}_labels"
-            df_plot[labels_col_name] = labels
-            plotar_grafico_3d(df_plot, labels_col_name, title, output_basename)
+            # Os 12 gráficos 3D são gerados juntos, num único HTML
+            graficos_3d[nome_arquivo] = (nome_arquivo, nome_amigavel, labels, title)
         else:
             # Para P1 e P4, X_plot = X_scaled
             # Para P2, X_plot = X_pca
             output_png_path = f"{output_basename}.png"
-            plotar_grafico_2d(X_plot, labels, title, output_png_path, centers=centers)
+            fila.enviar_2d(labels, title, output_png_path, centers=centers)
+
+    graficos_3d = {}
+
+    # Os gráficos são salvos em segundo plano enquanto os algoritmos rodam
+    with FilaRenderizacao(
+        X_plot, limite_pontos=LIMITE_PONTOS_GRAFICO, modo=MODO_GRAFICO
+    ) as fila:
+        for nome_arquivo, resultado in pre_ajustados.items():
+            desenhar(nome_arquivo, resultado)
+
+        # Os demais rodam em paralelo, cada um com seu orçamento de tempo/memória
+        tarefas = [
+            (nome_arquivo, algoritmo)
+            for nome_arquivo, (algoritmo, _, _) in execucoes.items()
+            if nome_arquivo not in pre_ajustados
+            and (nome_arquivo not in referencias or CORESET_REFERENCIA)
+        ]
+        print(f"  Executando {len(tarefas)} algoritmos em paralelo...")
+        resultados = executar_com_orcamento(
+            tarefas,
+            X_scaled,
+            tempo_limite=TEMPO_LIMITE_ALGORITMO,
+            memoria_limite_mb=MEMORIA_LIMITE_ALGORITMO_MB,
+            entradas={
+                nome_arquivo: entrada
+                for nome_arquivo, (_, entrada, _) in execucoes.items()
+                if entrada is not None
+            },
+            ao_concluir=desenhar,
+            pesos={
+                nome_arquivo: pesos
+                for nome_arquivo, (_, _, pesos) in execucoes.items()
+                if pesos is not None
+            },
+        )
+        # O cache guarda os rótulos do coreset; a extensão é refeita ao ler
+        for nome_arquivo, chave in chaves_cache.items():
+            if nome_arquivo in resultados:
+                cache.guardar(chave, resultados[nome_arquivo])
+        resultados.update(pre_ajustados)
+        resultados.update(estendidos)
+
+        # Rótulos dos algoritmos que terminaram, para consenso e métricas
+        rotulos = {
+            nome_amigavel: resultados[nome_arquivo]["labels"]
+            for nome_amigavel, nome_arquivo, _ in algoritmos
+            if resultados[nome_arquivo]["status"] == "ok"
+        }
+        consenso = salvar_consenso(
+            rotulos,
+            indice["indices"],
+            dataset_name,
+            OUTPUT_DIR,
+            problem_prefix,
+            y_verdadeiro,
+            n_vizinhos=PARAMS["consenso_n_vizinhos"],
+            limiar=PARAMS["consenso_limiar"],
+            tamanho_minimo=PARAMS["consenso_tamanho_minimo"],
+        )
+        ordem_3d = [nome_arquivo for _, nome_arquivo, _ in algoritmos]
+        if consenso is not None:
+            labels_consenso, title_consenso = consenso
+            if is_3d:
+                graficos_3d["consenso"] = (
+                    "consenso",
+                    "Consenso",
+                    labels_consenso,
+                    title_consenso,
+                )
+                ordem_3d.append("consenso")
+            else:
+                fila.enviar_2d(
+                    labels_consenso,
+                    title_consenso,
+                    os.path.join(OUTPUT_DIR, f"{problem_prefix}_consenso.png"),
+                )
+        if is_3d:
+            fila.enviar_3d(
+                [graficos_3d[nome_arquivo] for nome_arquivo in ordem_3d],
+                os.path.join(OUTPUT_DIR, problem_prefix),
+            )
+
+        # Métricas calculadas enquanto os gráficos ainda estão sendo salvos
+        salvar_metricas(X_scaled, rotulos, OUTPUT_DIR, problem_prefix, y_verdadeiro)
+        salvar_cortes_hierarquicos(
+            algoritmos,
+            resultados,
+            dataset_name,
+            OUTPUT_DIR,
+            problem_prefix,
+            k_max=K_MAX_COTOVELO,
+            representantes=None if coreset is None else coreset["representante"],
+        )
+        salvar_modelos_atribuicao(
+            X_scaled,
+            algoritmos,
+            resultados,
+            lambda nome_arquivo, resultado: montar_modelo_atribuicao(
+                nome_arquivo, X_scaled, indice, resultado
+            ),
+            MODELOS_DIR,
+            OUTPUT_DIR,
+            problem_prefix,
+            scaler,
+        )
+        if coreset is not None:
+            salvar_relatorio_coreset(
+                X_scaled,
+                coreset,
+                algoritmos,
+                resultados,
+                OUTPUT_DIR,
+                problem_prefix,
+                tempo_limite=TEMPO_LIMITE_ALGORITMO,
+            )
+        if VARRER_EPS:
+            salvar_varredura_eps(
+                X_scaled,
+                X_plot,
+                indice,
+                PARAMS["min_samples"],
+                dataset_name,
+                OUTPUT_DIR,
+                problem_prefix,
+                n_eps=N_EPS_VARREDURA,
+                is_3d=is_3d,
+                limite_pontos=LIMITE_PONTOS_GRAFICO,
+                modo_grafico=MODO_GRAFICO,
+            )
+        if VARRER_HDBSCAN:
+            salvar_varredura_hdbscan(
+                indice["grafo"],
+                PARAMS["hdbscan_varredura_min_samples"],
+                PARAMS["hdbscan_varredura_min_cluster_size"],
+                (PARAMS["hdbscan_min_samples"], PARAMS["hdbscan_min_cluster_size"]),
+                dataset_name,
+                OUTPUT_DIR,
+                problem_prefix,
+                allow_single_cluster=PARAMS["hdbscan_allow_single_cluster"],
+                cluster_selection_method=PARAMS["hdbscan_cluster_selection_method"],
+            )
+        print("  Aguardando a gravação dos gráficos...")
+
+    tabela_tempos = []
+    for nome_amigavel, nome_arquivo, _ in algoritmos:
+        resultado = resultados[nome_arquivo]
+        status = resultado["status"]
+        labels = resultado.get("labels")
+        n_clusters = None
+        if status == "ok":
+            n_clusters = len(set(labels)) - (1 if -1 in labels else 0)
+        tabela_tempos.append(
+            {
+                "Algoritmo": nome_amigavel,
+                "Status": status,
+                "Tempo (s)": round(resultado["tempo"], 3),
+                "Pico RAM (MB)": (
+                    None
+                    if resultado["pico_mb"] is None
+                    else round(resultado["pico_mb"], 1)
+                ),
+                "Clusters": n_clusters,
+                "dtype": resultado.get("dtype") or "",
+                "Cache": "sim" if resultado.get("cache") else "",
+                "Coreset": "sim" if resultado.get("coreset") else "",
+            }
+        )
+
+    # Tabela de tempos por algoritmo (TXT, como os demais resultados)
+    tempos_df = pd.DataFrame(tabela_tempos).set_index("Algoritmo")
+    tempos_df["Clusters"] = tempos_df["Clusters"].astype("Int64")
+    tempos_path = os.path.join(OUTPUT_DIR, f"{problem_prefix}_tempos.txt")
+    # Tempo por etapa dos algoritmos que o registram (ex.: Spectral:
+    # construção da afinidade separada do cálculo dos autovetores)
+    etapas = []
+    for nome_amigavel, nome_arquivo, _ in algoritmos:
+        etapas_algoritmo = resultados[nome_arquivo].get("etapas")
+        if resultados[nome_arquivo]["status"] == "ok" and etapas_algoritmo:
+            modo = etapas_algoritmo.get("modo")
+            descricao = ", ".join(
+                f"{etapa} {tempo:.3f}s"
+                for etapa, tempo in etapas_algoritmo.items()
+                if etapa != "modo"
+            )
+            etapas.append(f"{nome_amigavel}{f' ({modo})' if modo else ''}: {descricao}")
+    with open(tempos_path, "w", encoding="utf-8") as f:
+        f.write(tempos_df.to_string(line_width=110))
+        if etapas:
+            f.write("\n\nTempo por etapa:\n" + "\n".join(etapas))
+    print(f"  Tabela de tempos salva em: {tempos_path}")
+
+    # Algoritmos que converteram os dados para uma precisão maior por dentro
+    convertidos = [
+        nome_amigavel
+        for nome_amigavel, nome_arquivo, _ in algoritmos
+        if resultados[nome_arquivo].get("dtype") not in (None, str(X_scaled.dtype))
+    ]
+    if convertidos:
+        print(
+            f"  Aviso: convertem os dados {X_scaled.dtype} para float64 "
+            f"internamente: {', '.join(convertidos)}."
+        )
 
     print(f"  {dataset_name} concluído.")
 
@@ -323,7 +961,7 @@ def resolver_problema_1(input_dir, output_dir):
     print("\nIniciando Problema 1 (Agrupamento03.txt)...")
     file_path = os.path.join(input_dir, "Agrupamento03.txt")
     try:
-        df = pd.read_csv(file_path)
+        df = ler_pontos(file_path)
     except FileNotFoundError:
         print(f"ERRO: Arquivo não encontrado em {file_path}")
         return
@@ -333,13 +971,21 @@ def resolver_problema_1(input_dir, output_dir):
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
 
-    plotar_grafico_cotovelo(X_scaled, "Agrupamento03", "p1")
-
-    k_ideal_p1 = 5  # Valor chutado após ver o cotovelo P1
+    # k_ideal vem do joelho detectado; o valor antigo fica só como reserva
+    k_ideal_p1, modelos_kmeans = plotar_grafico_cotovelo(
+        X_scaled, "Agrupamento03", "p1", k_padrao=5
+    )
 
     # Para P1, plotamos os dados escalados (X_scaled)
     executar_e_plotar_algoritmos(
-        X_scaled, X_scaled, "Agrupamento03", "p1", k_ideal_p1, is_3d=False
+        X_scaled,
+        X_scaled,
+        "Agrupamento03",
+        "p1",
+        k_ideal_p1,
+        is_3d=False,
+        modelo_kmeans=modelos_kmeans.get(k_ideal_p1),
+        scaler=scaler,
     )
 
 
@@ -350,7 +996,7 @@ def resolver_problema_2(input_dir, output_dir):
     print("\nIniciando Problema 2 (iris_cluster.txt)...")
     file_path = os.path.join(input_dir, "iris_cluster.txt")
     try:
-        df = pd.read_csv(file_path)
+        df = ler_pontos(file_path, colunas_texto=["variety"])
     except FileNotFoundError:
         print(f"ERRO: Arquivo não encontrado em {file_path}")
         return
@@ -361,17 +1007,29 @@ def resolver_problema_2(input_dir, output_dir):
     scaler = StandardScaler()
     X_scaled_4d = scaler.fit_transform(X)
 
-    plotar_grafico_cotovelo(X_scaled_4d, "Iris", "p2")
-
-    k_ideal_p2 = 3  # Dataset Iris classicamente tem 3 clusters
+    # k_ideal vem do joelho detectado; o valor antigo fica só como reserva
+    k_ideal_p2, modelos_kmeans = plotar_grafico_cotovelo(
+        X_scaled_4d, "Iris", "p2", k_padrao=3
+    )
 
-    print("  Aplicando PCA para visualização 2D...")
-    pca = PCA(n_components=2, random_state=42)
-    X_pca_2d = pca.fit_transform(X_scaled_4d)
+    # PCA exato, aleatorizado ou incremental, conforme o formato dos dados
+    metodo = escolher_metodo_pca(*X_scaled_4d.shape, X_scaled_4d.dtype.itemsize)
+    print(f"  Aplicando PCA ({metodo}) para visualização 2D...")
+    pca = ajustar_projecao(X_scaled_4d, metodo=metodo, tamanho_bloco=TAMANHO_BLOCO)
+    X_pca_2d = projetar(pca, X_scaled_4d, tamanho_bloco=TAMANHO_BLOCO)
 
     # Treinamos no 4D (X_scaled_4d), mas plotamos no 2D (X_pca_2d)
     executar_e_plotar_algoritmos(
-        X_scaled_4d, X_pca_2d, "Iris (PCA 2D)", "p2", k_ideal_p2, is_3d=False
+        X_scaled_4d,
+        X_pca_2d,
+        "Iris (PCA 2D)",
+        "p2",
+        k_ideal_p2,
+        is_3d=False,
+        modelo_kmeans=modelos_kmeans.get(k_ideal_p2),
+        scaler=scaler,
+        y_verdadeiro=df["variety"].to_numpy(),
+        projecao=pca,
     )
 
 
@@ -382,7 +1040,7 @@ def resolver_problema_3(input_dir, output_dir):
     print("\nIniciando Problema 3 (Agrupamento04.txt)...")
     file_path = os.path.join(input_dir, "Agrupamento04.txt")
     try:
-        df = pd.read_csv(file_path)
+        df = ler_pontos(file_path)
     except FileNotFoundError:
         print(f"ERRO: Arquivo não encontrado em {file_path}")
         return
@@ -392,13 +1050,21 @@ def resolver_problema_3(input_dir, output_dir):
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
 
-    plotar_grafico_cotovelo(X_scaled, "Agrupamento04", "p3")
-
-    k_ideal_p3 = 5  # Valor chutado após ver o cotovelo P3
+    # k_ideal vem do joelho detectado; o valor antigo fica só como reserva
+    k_ideal_p3, modelos_kmeans = plotar_grafico_cotovelo(
+        X_scaled, "Agrupamento04", "p3", k_padrao=5
+    )
 
     # Para P3, passamos o DataFrame original para plotagem 3D
     executar_e_plotar_algoritmos(
-        X_scaled, X, "Agrupamento04", "p3", k_ideal_p3, is_3d=True
+        X_scaled,
+        X,
+        "Agrupamento04",
+        "p3",
+        k_ideal_p3,
+        is_3d=True,
+        modelo_kmeans=modelos_kmeans.get(k_ideal_p3),
+        scaler=scaler,
     )
 
 
@@ -409,7 +1075,7 @@ def resolver_problema_4(input_dir, output_dir):
     print("\nIniciando Problema 4 (Agrupamento05.txt)...")
     file_path = os.path.join(input_dir, "Agrupamento05.txt")
     try:
-        df = pd.read_csv(file_path)
+        df = ler_pontos(file_path)
     except FileNotFoundError:
         print(f"ERRO: Arquivo não encontrado em {file_path}")
         return
@@ -419,18 +1085,190 @@ def resolver_problema_4(input_dir, output_dir):
     scaler = StandardScaler()
     X_scaled = scaler.fit_transform(X)
 
-    plotar_grafico_cotovelo(X_scaled, "Agrupamento05", "p4")
-
-    k_ideal_p4 = 4  # Valor chutado após ver o cotovelo P4
+    # k_ideal vem do joelho detectado; o valor antigo fica só como reserva
+    k_ideal_p4, modelos_kmeans = plotar_grafico_cotovelo(
+        X_scaled, "Agrupamento05", "p4", k_padrao=4
+    )
 
     # Para P4, plotamos os dados escalados (X_scaled)
     executar_e_plotar_algoritmos(
-        X_scaled, X_scaled, "Agrupamento05", "p4", k_ideal_p4, is_3d=False
+        X_scaled,
+        X_scaled,
+        "Agrupamento05",
+        "p4",
+        k_ideal_p4,
+        is_3d=False,
+        modelo_kmeans=modelos_kmeans.get(k_ideal_p4),
+        scaler=scaler,
     )
 
 
+# ---
+# MODO STREAMING: arquivos maiores que a RAM
+# ---
+# (arquivo, colunas usadas, prefixo, k) de cada problema
+# (arquivo, colunas, prefixo, k de reserva): o k vem do joelho do cotovelo
+# numa amostra uniforme do arquivo; o da tabela só vale se não houver joelho
+PROBLEMAS_STREAMING = [
+    ("Agrupamento03.txt", [0, 1], "p1", 5),
+    ("iris_cluster.txt", lambda coluna: coluna != "variety", "p2", 3),
+    ("Agrupamento04.txt", [0, 1, 2], "p3", 5),
+    ("Agrupamento05.txt", [0, 1], "p4", 4),
+]
+
+
+def resolver_problema_streaming(
+    input_dir, output_dir, nome_arquivo, usecols, prefixo, k_padrao
+):
+    """
+    Versão fora da memória de um problema: lê o arquivo em blocos e roda
+    apenas os algoritmos incrementais (Mini Batch K-Means e BIRCH).
+    O k é o joelho do cotovelo numa amostra uniforme de
+    TAMANHO_AMOSTRA_STREAMING linhas, sorteada na passada de padronização
+    ('k_padrao' se a curva não tiver joelho).
+    Os rótulos são gravados bloco a bloco em '<prefixo>_rotulos_streaming.csv',
+    com as coordenadas 2D do IncrementalPCA quando há mais de duas colunas.
+    """
+    print(f"\nIniciando {prefixo} em modo streaming ({nome_arquivo})...")
+    file_path = os.path.join(input_dir, nome_arquivo)
+    if not os.path.exists(file_path):
+        print(f"ERRO: Arquivo não encontrado em {file_path}")
+        return
+
+    print(f"  Passada 1: padronização em blocos de {TAMANHO_BLOCO} linhas...")
+    cache_dir = CACHE_DADOS_DIR if USAR_CACHE else None
+    scaler, amostra = padronizar_em_blocos(
+        file_path,
+        usecols,
+        TAMANHO_BLOCO,
+        DTYPE,
+        cache_dir,
+        tamanho_amostra=TAMANHO_AMOSTRA_STREAMING,
+    )
+    k, _ = plotar_grafico_cotovelo(
+        scaler.transform(amostra),
+        f"{prefixo}, amostra de {len(amostra)} pontos",
+        f"{prefixo}_streaming",
+        k_padrao=k_padrao,
+    )
+
+    print(f"  Passada 2: treino incremental (k={k})...")
+    modelos = treinar_em_blocos(
+        file_path, scaler, k, usecols, TAMANHO_BLOCO, DTYPE, cache_dir
+    )
+
+    # Modelos de atribuição de uma execução completa anterior (se houver)
+    # rotulam os mesmos blocos, sem reajuste
+    for nome, modelo in carregar_modelos_atribuicao(MODELOS_DIR, prefixo).items():
+        modelos[f"modelo_{nome}"] = modelo
+
+    # Projeção 2D dos dados com mais colunas, ajustada bloco a bloco
+    projecao = None
+    if scaler.n_features_in_ > 2:
+        print("  Passada extra: projeção 2D incremental (IncrementalPCA)...")
+        projecao = projetar_em_blocos(
+            file_path, scaler, 2, usecols, TAMANHO_BLOCO, DTYPE, cache_dir
+        )
+
+    print("  Passada 3: gravando rótulos...")
+    output_path = os.path.join(output_dir, f"{prefixo}_rotulos_streaming.csv")
+    total = rotular_em_blocos(
+        file_path,
+        scaler,
+        modelos,
+        output_path,
+        usecols,
+        TAMANHO_BLOCO,
+        DTYPE,
+        cache_dir,
+        projecao=projecao,
+    )
+    print(f"  {total} pontos rotulados em: {output_path}")
+
+
 # --- Bloco de Execução Principal ---
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Segundo Trabalho Prático")
+    parser.add_argument(
+        "--streaming",
+        action="store_true",
+        help="lê os arquivos em blocos e roda só os algoritmos incrementais",
+    )
+    parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=TAMANHO_BLOCO,
+        help=f"linhas por bloco no modo streaming (padrão: {TAMANHO_BLOCO})",
+    )
+    parser.add_argument(
+        "--limite-pontos-grafico",
+        type=int,
+        default=LIMITE_PONTOS_GRAFICO,
+        help="acima desse número de pontos os gráficos usam amostra/densidade",
+    )
+    parser.add_argument(
+        "--modo-grafico",
+        choices=["amostra", "densidade"],
+        default=MODO_GRAFICO,
+        help="amostra estratificada por rótulo ou grade de densidade (só 2D)",
+    )
+    parser.add_argument(
+        "--sem-cache",
+        action="store_true",
+        help="ignora o cache de resultados e reajusta todos os algoritmos",
+    )
+    parser.add_argument(
+        "--dtype",
+        choices=["float64", "float32"],
+        default=DTYPE,
+        help="precisão dos dados da leitura aos algoritmos (padrão: float64)",
+    )
+    parser.add_argument(
+        "--sem-varredura-eps",
+        action="store_true",
+        help="não faz a varredura do eps do DBSCAN",
+    )
+    parser.add_argument(
+        "--sem-varredura-hdbscan",
+        action="store_true",
+        help="não faz a varredura de min_samples × min_cluster_size do HDBSCAN",
+    )
+    parser.add_argument(
+        "--sem-selecao-gmm",
+        action="store_true",
+        help="não seleciona o GMM por BIC (usa k do cotovelo e covariância full)",
+    )
+    parser.add_argument(
+        "--vizinhanca",
+        choices=["exato", "aproximado"],
+        default=VIZINHANCA,
+        help="busca de vizinhos exata (KD-tree) ou aproximada (dimensão alta)",
+    )
+    parser.add_argument(
+        "--coreset",
+        type=int,
+        default=TAMANHO_CORESET,
+        metavar="N",
+        help="roda os algoritmos super-lineares sobre N representantes ponderados",
+    )
+    parser.add_argument(
+        "--coreset-referencia",
+        action="store_true",
+        help="roda também os dados completos para medir a perda do coreset",
+    )
+    args = parser.parse_args()
+    USAR_CACHE = not args.sem_cache
+    TAMANHO_BLOCO = args.chunksize
+    LIMITE_PONTOS_GRAFICO = args.limite_pontos_grafico
+    MODO_GRAFICO = args.modo_grafico
+    VARRER_EPS = not args.sem_varredura_eps
+    VARRER_HDBSCAN = not args.sem_varredura_hdbscan
+    DTYPE = args.dtype
+    TAMANHO_CORESET = args.coreset
+    VIZINHANCA = args.vizinhanca
+    SELECIONAR_GMM = not args.sem_selecao_gmm
+    CORESET_REFERENCIA = args.coreset_referencia
+
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     os.makedirs(INPUT_DIR, exist_ok=True)
 
@@ -442,10 +1280,16 @@ if __name__ == "__main__":
     )
     print(f"Resultados serão salvos em: {os.path.abspath(OUTPUT_DIR)}\n")
 
-    resolver_problema_1(INPUT_DIR, OUTPUT_DIR)
-    resolver_problema_2(INPUT_DIR, OUTPUT_DIR)
-    resolver_problema_3(INPUT_DIR, OUTPUT_DIR)
-    resolver_problema_4(INPUT_DIR, OUTPUT_DIR)
+    if args.streaming:
+        for nome_arquivo, usecols, prefixo, k in PROBLEMAS_STREAMING:
+            resolver_problema_streaming(
+                INPUT_DIR, OUTPUT_DIR, nome_arquivo, usecols, prefixo, k
+            )
+    else:
+        resolver_problema_1(INPUT_DIR, OUTPUT_DIR)
+        resolver_problema_2(INPUT_DIR, OUTPUT_DIR)
+        resolver_problema_3(INPUT_DIR, OUTPUT_DIR)
+        resolver_problema_4(INPUT_DIR, OUTPUT_DIR)
 
     print("\n--- Processo Concluído ---")
     print(f"Todos os gráficos (PNG e HTML) foram salvos no diretório '{OUTPUT_DIR}'.")
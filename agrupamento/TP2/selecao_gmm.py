@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Seleção do Gaussian Mixture por BIC na grade (n_components, covariance_type).
+
+Cada célula (k, tipo) é ajustada duas vezes, como na varredura do
+cotovelo:
+  - uma inicialização fria (a padrão do scikit-learn, por K-Means);
+  - uma aquecida: as médias do melhor modelo de (k - 1, tipo) mais uma
+    nova média sorteada à moda k-means++ ('means_init').
+Fica o ajuste de menor BIC. Os ajustes rodam num pool de processos que lê
+X de memória compartilhada (ver 'paralelo.py'), na ordem de k, para que a
+poda economize justamente os k maiores.
+
+Poda: um tipo de covariância para de crescer em k quando o BIC subiu em
+'paciencia' valores de k seguidos (com k = 1..j todos concluídos). Mais
+componentes só pioram o BIC a partir daí, a não ser em curvas muito
+irregulares.
+
+O BIC (e o AIC, registrado junto) é calculado sobre os mesmos dados do
+ajuste; menor é melhor. 'salvar_selecao_gmm' grava a tabela da grade e a
+superfície do BIC.
+"""
+
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from sklearn.mixture import GaussianMixture
+from threadpoolctl import threadpool_limits
+
+from cotovelo import _sortear_centro_adicional
+from paralelo import (
+    array_compartilhado,
+    array_do_worker,
+    inicializar_worker,
+    numero_de_workers,
+)
+
+TIPOS_COVARIANCIA = ("full", "tied", "diag", "spherical")
+
+
+def _ajustar_gmm(k, tipo, medias_anteriores, seed, max_iter):
+    """
+    Tarefa executada no worker. Com 'medias_anteriores' faz a inicialização
+    aquecida; sem elas usa a inicialização padrão.
+    """
+    X = array_do_worker()
+    medias = None
+    if medias_anteriores is not None:
+        rng = np.random.default_rng(seed)
+        medias = _sortear_centro_adicional(X, medias_anteriores, rng)
+    modelo = GaussianMixture(
+        n_components=k,
+        covariance_type=tipo,
+        means_init=medias,
+        max_iter=max_iter,
+        random_state=seed,
+    )
+    # Já há um worker por CPU: as threads OpenMP/BLAS de cada ajuste só
+    # disputariam os mesmos núcleos
+    with threadpool_limits(limits=1):
+        modelo.fit(X)
+    # 'means_init' fica como parâmetro do modelo devolvido; com ele, refazer
+    # o ajuste daria o mesmo resultado
+    return k, tipo, medias is not None, modelo, modelo.bic(X), modelo.aic(X)
+
+
+def bic_subindo(bics, paciencia=2):
+    """
+    True se os 'paciencia' últimos valores de 'bics' (k = 1..j, em ordem)
+    subiram seguidos: cada um maior que o anterior.
+    """
+    if len(bics) <= paciencia:
+        return False
+    return bool(np.all(np.diff(bics[-(paciencia + 1) :]) > 0))
+
+
+def selecionar_gmm(
+    X,
+    k_max=10,
+    tipos=TIPOS_COVARIANCIA,
+    random_state=42,
+    max_iter=100,
+    n_jobs=None,
+    paciencia=2,
+):
+    """
+    Ajusta o GMM em toda a grade (k = 1..k_max) × 'tipos', em paralelo,
+    com a poda por BIC crescente.
+
+    Retorna (melhor, tabela): 'melhor' é o modelo de menor BIC, já
+    ajustado; 'tabela' é uma lista de dicionários (k, tipo, bic, aic,
+    aquecido) com uma linha por célula avaliada (as podadas não
+    aparecem). 'aquecido' diz se o melhor ajuste veio da inicialização
+    aquecida.
+    """
+    rng = np.random.default_rng(random_state)
+
+    pendentes_frias = []  # (k, tipo, medias_anteriores, seed), na ordem de k
+    faltando = {}
+    for k in range(1, k_max + 1):
+        for tipo in tipos:
+            pendentes_frias.append((k, tipo, None, int(rng.integers(2**31 - 1))))
+            # k=1 não tem modelo menor para aquecer
+            faltando[k, tipo] = 1 if k == 1 else 2
+
+    melhores = {}  # (k, tipo) -> (bic, aic, aquecido, modelo)
+    aquecidas_prontas = []
+    k_concluido = {tipo: 0 for tipo in tipos}  # k = 1..j concluídos
+    podados = set()
+    n_workers = numero_de_workers(n_jobs)
+
+    with array_compartilhado(X) as descritor:
+        with ProcessPoolExecutor(
+            max_workers=n_workers,
+            initializer=inicializar_worker,
+            initargs=(descritor,),
+        ) as pool:
+            em_execucao = set()
+
+            def preencher():
+                # Prioridade às aquecidas (elas destravam o próximo k)
+                while len(em_execucao) < n_workers and (
+                    aquecidas_prontas or pendentes_frias
+                ):
+                    fila = aquecidas_prontas if aquecidas_prontas else pendentes_frias
+                    k, tipo, medias, seed = fila.pop(0)
+                    if tipo in podados:
+                        continue
+                    em_execucao.add(
+                        pool.submit(_ajustar_gmm, k, tipo, medias, seed, max_iter)
+                    )
+
+            preencher()
+            while em_execucao:
+                concluidas, _ = wait(em_execucao, return_when=FIRST_COMPLETED)
+                for futuro in concluidas:
+                    em_execucao.discard(futuro)
+                    k, tipo, aquecido, modelo, bic, aic = futuro.result()
+                    if (k, tipo) not in melhores or bic < melhores[k, tipo][0]:
+                        melhores[k, tipo] = (bic, aic, aquecido, modelo)
+                    faltando[k, tipo] -= 1
+                    if (
+                        faltando[k, tipo] == 0
+                        and k + 1 <= k_max
+                        and tipo not in podados
+                    ):
+                        aquecidas_prontas.append(
+                            (
+                                k + 1,
+                                tipo,
+                                melhores[k, tipo][3].means_,
+                                int(rng.integers(2**31 - 1)),
+                            )
+                        )
+
+                # Avança o prefixo de k concluídos de cada tipo e testa a poda
+                for tipo in tipos:
+                    while (
+                        tipo not in podados
+                        and k_concluido[tipo] < k_max
+                        and faltando[k_concluido[tipo] + 1, tipo] == 0
+                    ):
+                        k_concluido[tipo] += 1
+                        bics = [
+                            melhores[k, tipo][0]
+                            for k in range(1, k_concluido[tipo] + 1)
+                        ]
+                        if bic_subindo(bics, paciencia):
+                            podados.add(tipo)
+                preencher()
+
+    # Só entram as células de k concluídos em sequência (as que passaram do
+    # ponto de poda, já em execução quando ela ocorreu, ficam de fora)
+    tabela = [
+        {
+            "k": k,
+            "tipo": tipo,
+            "bic": melhores[k, tipo][0],
+            "aic": melhores[k, tipo][1],
+            "aquecido": melhores[k, tipo][2],
+        }
+        for tipo in tipos
+        for k in range(1, k_concluido[tipo] + 1)
+    ]
+    melhor = min(tabela, key=lambda linha: linha["bic"])
+    return melhores[melhor["k"], melhor["tipo"]][3], tabela
+
+
+def salvar_selecao_gmm(modelo, tabela, nome_conjunto, diretorio, prefixo, k_max=10):
+    """
+    Salva em 'diretorio' a tabela BIC/AIC da grade de 'selecionar_gmm' em
+    TXT e a superfície do BIC (tipo de covariância × k, células podadas
+    em branco, o 'modelo' escolhido destacado) em PNG.
+    """
+    tabela_df = pd.DataFrame(tabela)
+    tabela_path = os.path.join(diretorio, f"{prefixo}_gmm_bic.txt")
+    with open(tabela_path, "w", encoding="utf-8") as f:
+        f.write(
+            f"Escolhido (menor BIC): k={modelo.n_components}, "
+            f"covariância '{modelo.covariance_type}'\n\n"
+        )
+        f.write(
+            tabela_df.rename(
+                columns={
+                    "tipo": "Covariância",
+                    "bic": "BIC",
+                    "aic": "AIC",
+                    "aquecido": "Aquecido",
+                }
+            )
+            .round(2)
+            .set_index(["Covariância", "k"])
+            .to_string()
+        )
+
+    superficie = tabela_df.pivot(index="tipo", columns="k", values="bic").reindex(
+        columns=range(1, k_max + 1)
+    )
+    fig, ax = plt.subplots(figsize=(12, 4))
+    imagem = ax.imshow(superficie.to_numpy(), aspect="auto", cmap="viridis_r")
+    fig.colorbar(imagem, ax=ax, label="BIC (menor é melhor)")
+    for (i, j), valor in np.ndenumerate(superficie.to_numpy()):
+        if np.isfinite(valor):
+            ax.text(j, i, f"{valor:.0f}", ha="center", va="center", fontsize=7)
+    linha = list(superficie.index).index(modelo.covariance_type)
+    ax.add_patch(
+        plt.Rectangle(
+            (modelo.n_components - 1.5, linha - 0.5),
+            1,
+            1,
+            fill=False,
+            edgecolor="red",
+            linewidth=2,
+        )
+    )
+    ax.set_xticks(range(k_max))
+    ax.set_xticklabels(superficie.columns)
+    ax.set_yticks(range(len(superficie.index)))
+    ax.set_yticklabels(superficie.index)
+    ax.set_xlabel("Número de componentes (k)")
+    ax.set_ylabel("Covariância")
+    ax.set_title(f"BIC do Gaussian Mixture - {nome_conjunto} (em branco: podado)")
+    fig.tight_layout()
+    superficie_path = os.path.join(diretorio, f"{prefixo}_gmm_bic.png")
+    fig.savefig(superficie_path)
+    plt.close(fig)
+    print(f"  Superfície do BIC salva em: {superficie_path}")
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+Modo "streaming" (fora da memória) para arquivos de pontos muito grandes.
+
+O arquivo é lido em blocos ('chunksize' linhas) três vezes:
+  1. padronização: StandardScaler.partial_fit acumula média e variância
+     bloco a bloco (atualização de Welford/Chan, uma única passada); na
+     mesma leitura sai uma amostra uniforme (reservatório), em que o
+     cotovelo escolhe o k;
+  2. treino: MiniBatchKMeans.partial_fit e Birch.partial_fit recebem
+     cada bloco já padronizado;
+  3. rótulos: cada bloco é rotulado pelos modelos finais e anexado ao
+     CSV de saída, sem manter todos os rótulos em memória.
+
+Com mais de duas colunas, uma passada extra ajusta o IncrementalPCA
+sobre os blocos padronizados ('projetar_em_blocos'), e a passada 3
+grava também as coordenadas 2D de cada ponto.
+
+Só os algoritmos com 'partial_fit' participam; os demais precisam de
+todos os pontos ao mesmo tempo.
+
+Com o cache binário de dados ('cache_dados.py'), só a primeira passada
+interpreta o texto; as outras leem as colunas mapeadas em memória.
+"""
+
+import numpy as np
+import pandas as pd
+from sklearn.cluster import Birch, MiniBatchKMeans
+from sklearn.preprocessing import StandardScaler
+
+from cache_dados import ler_csv_em_cache
+from projecao import ajustar_projecao_em_blocos
+
+
+def ler_em_blocos(
+    file_path, usecols=None, chunksize=100_000, dtype=None, cache_dir=None
+):
+    """
+    Itera sobre o arquivo em DataFrames de até 'chunksize' linhas, com as
+    colunas lidas já em 'dtype' (ex.: "float32"), se fornecido.
+
+    Com 'cache_dir', o arquivo é convertido (também em blocos) para o
+    cache binário na primeira passada, e os blocos passam a ser fatias
+    das colunas mapeadas em memória: as passadas seguintes não
+    interpretam o texto de novo.
+    """
+    if cache_dir is None:
+        yield from pd.read_csv(
+            file_path, usecols=usecols, chunksize=chunksize, dtype=dtype
+        )
+        return
+    df = ler_csv_em_cache(
+        file_path, cache_dir, chunksize=chunksize, usecols=usecols, dtype=dtype
+    )
+    for inicio in range(0, len(df), chunksize):
+        yield df.iloc[inicio : inicio + chunksize]
+
+
+def padronizar_em_blocos(
+    file_path,
+    usecols=None,
+    chunksize=100_000,
+    dtype=None,
+    cache_dir=None,
+    tamanho_amostra=10_000,
+    random_state=0,
+):
+    """
+    Passada 1: ajusta um StandardScaler sem carregar o arquivo inteiro.
+
+    Na mesma leitura, sorteia uma amostra uniforme sem reposição de até
+    'tamanho_amostra' linhas (reservatório com chaves aleatórias: ficam
+    as linhas de menor chave), com memória O(tamanho_amostra + chunksize).
+    Retorna (scaler, amostra), com a amostra ainda sem padronizar.
+    """
+    scaler = StandardScaler()
+    rng = np.random.default_rng(random_state)
+    amostra, chaves = None, np.empty(0)
+    for bloco in ler_em_blocos(file_path, usecols, chunksize, dtype, cache_dir):
+        valores = bloco.to_numpy()
+        scaler.partial_fit(valores)
+        chaves_bloco = rng.random(len(valores))
+        if amostra is None:
+            amostra = valores[:0]
+        amostra = np.concatenate([amostra, valores])
+        chaves = np.concatenate([chaves, chaves_bloco])
+        if len(chaves) > tamanho_amostra:
+            menores = np.argpartition(chaves, tamanho_amostra - 1)[:tamanho_amostra]
+            amostra, chaves = amostra[menores], chaves[menores]
+    return scaler, amostra
+
+
+def treinar_em_blocos(
+    file_path, scaler, k, usecols=None, chunksize=100_000, dtype=None, cache_dir=None
+):
+    """
+    Passada 2: treina MiniBatchKMeans e Birch incrementalmente.
+    O Birch acumula só a árvore CF durante os blocos; o agrupamento
+    global em k clusters é feito uma única vez no final.
+    """
+    mbk = MiniBatchKMeans(n_clusters=k, random_state=42, n_init=10)
+    birch = Birch(n_clusters=None)
+    for bloco in ler_em_blocos(file_path, usecols, chunksize, dtype, cache_dir):
+        X_bloco = scaler.transform(bloco.to_numpy())
+        # O primeiro partial_fit do MiniBatchKMeans precisa de >= k pontos
+        if len(X_bloco) >= k or hasattr(mbk, "cluster_centers_"):
+            mbk.partial_fit(X_bloco)
+        birch.partial_fit(X_bloco)
+
+    birch.set_params(n_clusters=k)
+    birch.partial_fit()  # sem X: apenas o passo de agrupamento global
+    return {"minibatch_kmeans": mbk, "birch": birch}
+
+
+def projetar_em_blocos(
+    file_path,
+    scaler,
+    n_componentes=2,
+    usecols=None,
+    chunksize=100_000,
+    dtype=None,
+    cache_dir=None,
+):
+    """
+    Ajusta o IncrementalPCA sobre os blocos padronizados do arquivo, um
+    bloco por vez (ver 'ajustar_projecao_em_blocos').
+    """
+    blocos = ler_em_blocos(file_path, usecols, chunksize, dtype, cache_dir)
+    return ajustar_projecao_em_blocos(
+        (scaler.transform(bloco.to_numpy()) for bloco in blocos), n_componentes
+    )
+
+
+def rotular_em_blocos(
+    file_path,
+    scaler,
+    modelos,
+    output_path,
+    usecols=None,
+    chunksize=100_000,
+    dtype=None,
+    cache_dir=None,
+    projecao=None,
+):
+    """
+    Passada 3: rotula cada bloco com todos os modelos e anexa ao CSV de saída.
+    Com 'projecao' (ex.: de 'projetar_em_blocos'), grava também as
+    coordenadas projetadas ('componente_1', 'componente_2', ...).
+    Retorna o número de pontos rotulados.
+    """
+    total = 0
+    blocos = ler_em_blocos(file_path, usecols, chunksize, dtype, cache_dir)
+    for i, bloco in enumerate(blocos):
+        X_bloco = scaler.transform(bloco.to_numpy())
+        if projecao is not None:
+            componentes = projecao.transform(X_bloco)
+            for j in range(componentes.shape[1]):
+                bloco[f"componente_{j + 1}"] = componentes[:, j]
+        for nome, modelo in modelos.items():
+            bloco[f"{nome}_labels"] = modelo.predict(X_bloco)
+        bloco.to_csv(
+            output_path, mode="w" if i == 0 else "a", header=i == 0, index=False
+        )
+        total += len(bloco)
+    return total
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""Testes da Affinity Propagation esparsa contra a densa do scikit-learn."""
+
+import numpy as np
+import pytest
+from sklearn.cluster import AffinityPropagation
+from sklearn.datasets import make_blobs
+from sklearn.metrics import adjusted_rand_score
+from sklearn.metrics.pairwise import euclidean_distances
+
+from afinidade_esparsa import AffinityPropagationEsparsa
+
+
+@pytest.fixture(scope="module")
+def blobs():
+    X, y = make_blobs(n_samples=600, centers=4, cluster_std=0.6, random_state=0)
+    similaridades = -euclidean_distances(X, squared=True)
+    return X, y, similaridades
+
+
+def _pureza(y, labels):
+    """Fração dos pontos no rótulo verdadeiro majoritário do seu cluster."""
+    return sum(np.bincount(y[labels == c]).max() for c in np.unique(labels)) / len(y)
+
+
+def test_um_nivel_denso_igual_ao_scikit_learn(blobs):
+    X, _, similaridades = blobs
+    densa = AffinityPropagation(random_state=0).fit(X)
+    # Sem 'preference', o scikit-learn usa a mediana das similaridades
+    esparsa = AffinityPropagationEsparsa(
+        random_state=0, limite_denso=len(X), preference=np.median(similaridades)
+    ).fit(X)
+    assert esparsa.n_niveis_ == 1
+    np.testing.assert_array_equal(esparsa.labels_, densa.labels_)
+
+
+def test_niveis_esparsos_concordam_com_a_densa(blobs):
+    X, y, similaridades = blobs
+    parametros = dict(
+        preference=np.quantile(similaridades, 0.1),
+        damping=0.9,
+        max_iter=1000,
+        random_state=0,
+    )
+    densa = AffinityPropagation(**parametros).fit(X)
+    esparsa = AffinityPropagationEsparsa(limite_denso=100, **parametros).fit(X)
+    assert esparsa.n_niveis_ >= 2
+    assert len(esparsa.cluster_centers_indices_) == len(densa.cluster_centers_indices_)
+    assert adjusted_rand_score(densa.labels_, esparsa.labels_) > 0.99
+    # Os exemplares são pontos de X, e 'predict' os devolve aos seus clusters
+    np.testing.assert_array_equal(
+        esparsa.cluster_centers_, X[esparsa.cluster_centers_indices_]
+    )
+    np.testing.assert_array_equal(
+        esparsa.predict(esparsa.cluster_centers_),
+        np.arange(len(esparsa.cluster_centers_indices_)),
+    )
+    assert _pureza(y, esparsa.labels_) > 0.99
+
+
+def test_preferencia_mediana_subdivide_os_blobs(blobs):
+    # Com a preferência padrão, a AP quebra cada blob em vários clusters;
+    # a versão esparsa também, sem misturar blobs
+    X, y, _ = blobs
+    esparsa = AffinityPropagationEsparsa(limite_denso=100, random_state=0).fit(X)
+    assert len(esparsa.cluster_centers_indices_) > 4
+    assert _pureza(y, esparsa.labels_) > 0.99
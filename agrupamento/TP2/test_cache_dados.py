@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""Testes do cache binário dos arquivos de dados."""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from cache_dados import ler_csv_em_cache
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(
+        {
+            "x": rng.normal(size=1000),
+            "y": rng.integers(0, 100, size=1000),
+            "variety": rng.choice(["Setosa", "Versicolor", "Virginica"], size=1000),
+        }
+    )
+    caminho = tmp_path / "dados.txt"
+    df.to_csv(caminho, index=False)
+    return str(caminho), str(tmp_path / "cache")
+
+
+def test_igual_ao_read_csv_e_mapeado_em_memoria(arquivo):
+    caminho, cache = arquivo
+    primeira = ler_csv_em_cache(caminho, cache, chunksize=300)
+    segunda = ler_csv_em_cache(caminho, cache, chunksize=300)
+    esperado = pd.read_csv(caminho)
+    # 'copy' troca os memmaps por arrays comuns, como os do read_csv
+    pd.testing.assert_frame_equal(primeira.copy(), esperado)
+    pd.testing.assert_frame_equal(segunda.copy(), esperado)
+    # As colunas numéricas vêm do disco, somente leitura
+    assert not segunda["x"].to_numpy().flags.writeable
+
+
+def test_parametros_de_leitura(arquivo):
+    caminho, cache = arquivo
+    df = ler_csv_em_cache(caminho, cache, usecols=["x", "y"], dtype="float32")
+    esperado = pd.read_csv(caminho, usecols=["x", "y"], dtype="float32")
+    pd.testing.assert_frame_equal(df.copy(), esperado)
+    # Parâmetros diferentes, entradas diferentes
+    assert len(os.listdir(cache)) == 1
+    ler_csv_em_cache(caminho, cache)
+    assert len(os.listdir(cache)) == 2
+
+
+def test_invalida_quando_o_arquivo_muda(arquivo):
+    caminho, cache = arquivo
+    ler_csv_em_cache(caminho, cache)
+    with open(caminho, "a", encoding="utf-8") as f:
+        f.write("1.5,7,Setosa\n")
+    df = ler_csv_em_cache(caminho, cache)
+    assert len(df) == 1001
+    assert df["y"].iloc[-1] == 7
+
+
+def test_so_a_data_mudou(arquivo):
+    caminho, cache = arquivo
+    ler_csv_em_cache(caminho, cache)
+    # Mesmo conteúdo, data nova (ex.: 'git checkout'): o hash confirma
+    os.utime(caminho, ns=(0, 10**18))
+    df = ler_csv_em_cache(caminho, cache)
+    pd.testing.assert_frame_equal(df.copy(), pd.read_csv(caminho))
+    (entrada,) = os.listdir(cache)
+    with open(os.path.join(cache, entrada, "meta.json"), encoding="utf-8") as f:
+        assert json.load(f)["origem"]["mtime_ns"] == 10**18
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Testes do cache de resultados em disco."""
+
+import os
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.cluster import DBSCAN, KMeans
+
+from cache_resultados import CacheResultados, hash_dados
+
+
+def _resultado(n, **extras):
+    return {"status": "ok", "labels": np.arange(n) % 3, "tempo": 0.5, **extras}
+
+
+def test_chave_muda_com_dados_parametros_e_entrada(tmp_path):
+    cache = CacheResultados(str(tmp_path))
+    X = np.random.default_rng(0).normal(size=(50, 2))
+    hash_X = hash_dados(X)
+    grafo = sp.random(50, 50, density=0.1, format="csr", random_state=0)
+    base = cache.chave(hash_X, KMeans(3, random_state=0))
+
+    assert base == cache.chave(hash_dados(X.copy()), KMeans(3, random_state=0))
+    assert base != cache.chave(hash_dados(X + 1e-9), KMeans(3, random_state=0))
+    assert base != cache.chave(hash_X, KMeans(4, random_state=0))
+    assert base != cache.chave(hash_X, DBSCAN())
+    com_grafo = cache.chave(hash_X, KMeans(3, random_state=0), grafo)
+    assert com_grafo != base
+    assert com_grafo != cache.chave(hash_X, KMeans(3, random_state=0), grafo * 2)
+
+
+def test_ida_e_volta(tmp_path):
+    cache = CacheResultados(str(tmp_path))
+    resultado = _resultado(
+        10,
+        centers=np.ones((3, 2)),
+        pico_mb=12.0,
+        etapas={"modo": "arpack", "kmeans": 0.25},
+        parametros={"centros": np.zeros((4, 2)), "rotulos": np.arange(4)},
+    )
+    cache.guardar("k", resultado)
+    lido = cache.obter("k")
+    np.testing.assert_array_equal(lido["labels"], resultado["labels"])
+    np.testing.assert_array_equal(lido["centers"], resultado["centers"])
+    assert lido["tempo"] == 0.5 and lido["pico_mb"] == 12.0
+    assert lido["etapas"] == {"modo": "arpack", "kmeans": 0.25}
+    np.testing.assert_array_equal(lido["parametros"]["rotulos"], np.arange(4))
+    assert cache.obter("inexistente") is None
+
+    # Falhas dependem da máquina e não são guardadas
+    cache.guardar("falha", {"status": "timeout"})
+    assert cache.obter("falha") is None
+
+
+def test_lru_apaga_os_usados_ha_mais_tempo(tmp_path):
+    cache = CacheResultados(str(tmp_path), limite_mb=1)
+    rng = np.random.default_rng(0)
+    # ~300 KB cada: cabem três (rótulos aleatórios quase não comprimem)
+    resultados = {
+        nome: {"status": "ok", "labels": rng.integers(0, 2**31, 75_000), "tempo": 1}
+        for nome in ("a", "b", "c")
+    }
+    cache.guardar("a", resultados["a"])
+    cache.guardar("b", resultados["b"])
+    antigo = os.path.getmtime(os.path.join(str(tmp_path), "b.npz")) - 10
+    os.utime(os.path.join(str(tmp_path), "b.npz"), (antigo, antigo))
+    os.utime(os.path.join(str(tmp_path), "a.npz"), (antigo - 10, antigo - 10))
+    # Ler "a" o torna o mais recente: quem sai é "b"
+    assert cache.obter("a") is not None
+    cache.guardar("c", resultados["c"])
+    cache.guardar("d", resultados["c"])
+
+    assert cache.obter("b") is None
+    assert cache.obter("a") is not None
+    assert cache.obter("d") is not None
+    total = sum(os.path.getsize(p) for p in tmp_path.iterdir())
+    assert total <= 2**20
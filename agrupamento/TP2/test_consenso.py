@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""Testes do agrupamento de consenso (acúmulo de evidências)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.datasets import make_blobs
+from sklearn.metrics import adjusted_rand_score
+from sklearn.neighbors import NearestNeighbors
+
+from consenso import agrupamento_consenso, coassociacao_knn, salvar_consenso
+
+
+@pytest.fixture(scope="module")
+def blobs():
+    X, y = make_blobs(
+        1000, centers=[(-6, 0), (0, 6), (6, 0)], cluster_std=1.0, random_state=0
+    )
+    vizinhos = NearestNeighbors(n_neighbors=15).fit(X).kneighbors()[1]
+    return X, y, vizinhos
+
+
+def _discordantes(y, X):
+    """Cinco agrupamentos: dois certos e três com erros diferentes."""
+    rng = np.random.default_rng(0)
+    junta = np.where(y == 1, 0, y)  # junta dois blobs
+    ruidoso = np.where(rng.random(len(y)) < 0.1, -1, y)  # 10% de ruído
+    corte_errado = np.where(X[:, 0] > 0, 7, 8)  # separa no lugar errado
+    return [y, y.copy(), junta, ruidoso, corte_errado]
+
+
+def test_coassociacao(blobs):
+    _, y, vizinhos = blobs
+    assert np.all(coassociacao_knn([y, y], vizinhos) == 1.0)
+    ruido = np.full(len(y), -1)
+    # Ruído nunca conta como mesmo cluster
+    assert np.all(coassociacao_knn([y, ruido], vizinhos) <= 0.5)
+
+
+def test_consenso_recupera_a_maioria(blobs):
+    X, y, vizinhos = blobs
+    rotulos = _discordantes(y, X)
+    labels, estabilidade = agrupamento_consenso(rotulos, vizinhos)
+    assert adjusted_rand_score(y, labels) == 1.0
+    # Numerados do maior para o menor cluster
+    assert np.all(np.diff(np.bincount(labels)) <= 0)
+    assert np.all((0 <= estabilidade) & (estabilidade <= 1))
+    assert estabilidade.mean() > 0.9
+
+
+def test_clusters_pequenos_viram_ruido(blobs):
+    X, y, vizinhos = blobs
+    isolado = np.where(np.arange(len(y)) < 3, 99, y)
+    labels, _ = agrupamento_consenso([isolado] * 3, vizinhos, tamanho_minimo=5)
+    # Os 3 pontos com rótulo próprio formam um cluster pequeno demais
+    assert labels.max() == 2
+    np.testing.assert_array_equal(np.flatnonzero(labels == -1), [0, 1, 2])
+
+
+def test_salvar_consenso(blobs, tmp_path):
+    X, y, vizinhos = blobs
+    rotulos = dict(zip("abcde", _discordantes(y, X)))
+    labels, titulo = salvar_consenso(rotulos, vizinhos, "Blobs", str(tmp_path), "t")
+    assert "Consenso" in titulo
+    assert (tmp_path / "t_consenso.txt").exists()
+    pontos = pd.read_csv(tmp_path / "t_consenso.csv")
+    np.testing.assert_array_equal(pontos["rotulo"], labels)
+    assert salvar_consenso({}, vizinhos, "Blobs", str(tmp_path), "t") is None
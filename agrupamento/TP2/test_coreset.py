@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+"""Testes do coreset e dos pesos que ele leva aos algoritmos."""
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+
+from afinidade_esparsa import AffinityPropagationEsparsa
+from coreset import construir_coreset, representante_mais_proximo
+from escalonador import executar_com_orcamento
+
+
+@pytest.fixture
+def blobs():
+    return make_blobs(n_samples=300, centers=3, random_state=0)
+
+
+def test_pesos_mudam_o_ajuste_da_ap(blobs):
+    X, y = blobs
+    pesos = np.ones(len(X))
+    pesos[y == 0] = 50.0
+
+    sem_pesos = AffinityPropagationEsparsa(random_state=0).fit(X)
+    unitarios = AffinityPropagationEsparsa(random_state=0).fit(
+        X, sample_weight=np.ones(len(X))
+    )
+    ponderado = AffinityPropagationEsparsa(random_state=0).fit(X, sample_weight=pesos)
+
+    np.testing.assert_array_equal(sem_pesos.labels_, unitarios.labels_)
+    # Pontos pesados ficam mais longe de exemplares distantes: o cluster
+    # pesado ganha mais exemplares
+    exemplares_sem = np.bincount(y[sem_pesos.cluster_centers_indices_], minlength=3)
+    exemplares_com = np.bincount(y[ponderado.cluster_centers_indices_], minlength=3)
+    assert exemplares_com[0] > exemplares_sem[0]
+
+
+def test_escalonador_repassa_os_pesos(blobs):
+    X, y = blobs
+    pesos = np.ones(len(X))
+    pesos[y == 0] = 50.0
+    tarefas = [("ap", AffinityPropagationEsparsa(random_state=0))]
+    sem_pesos = executar_com_orcamento(tarefas, X, tempo_limite=60.0)
+    com_pesos = executar_com_orcamento(
+        tarefas, X, tempo_limite=60.0, pesos={"ap": pesos}
+    )
+    assert sem_pesos["ap"]["status"] == com_pesos["ap"]["status"] == "ok"
+    assert len(np.unique(com_pesos["ap"]["labels"])) != len(
+        np.unique(sem_pesos["ap"]["labels"])
+    )
+
+
+def test_coreset_por_sensibilidade_estima_n(blobs):
+    X, _ = blobs
+    indices, pesos = construir_coreset(X, 100, 3, random_state=0)
+    assert np.all(np.diff(indices) > 0)
+    assert len(indices) == len(pesos) <= 100
+    assert pesos.sum() == pytest.approx(len(X), rel=0.3)
+
+
+def test_coreset_uniforme(blobs):
+    X, _ = blobs
+    indices, pesos = construir_coreset(X, 100, 3, random_state=0, uniforme=True)
+    assert len(np.unique(indices)) == len(indices) == 100
+    np.testing.assert_allclose(pesos, len(X) / 100)
+
+
+def test_representante_mais_proximo(blobs):
+    X, _ = blobs
+    indices, _ = construir_coreset(X, 50, 3, random_state=0, uniforme=True)
+    representante = representante_mais_proximo(X, X[indices], n_jobs=1)
+    # Cada ponto do coreset é o seu próprio representante
+    np.testing.assert_array_equal(representante[indices], np.arange(len(indices)))
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""Testes da varredura do cotovelo e da detecção do joelho."""
+
+import numpy as np
+import pytest
+from sklearn.cluster import KMeans
+from sklearn.datasets import make_blobs
+
+from cotovelo import confirmar_joelho, detectar_joelho, varrer_cotovelo
+
+
+@pytest.fixture(scope="module")
+def blobs():
+    X, _ = make_blobs(n_samples=1500, centers=4, cluster_std=0.6, random_state=0)
+    return X
+
+
+def test_varredura_completa(blobs):
+    K_range, wss, modelos, _ = varrer_cotovelo(
+        blobs, k_max=6, n_init=3, n_jobs=2, parar_no_joelho=False
+    )
+    assert K_range == [1, 2, 3, 4, 5, 6]
+    assert sorted(modelos) == K_range
+    assert np.all(np.diff(wss) < 0)
+    # O melhor modelo de cada k é tão bom quanto o KMeans com várias
+    # inicializações, e volta sem 'labels_' (só 'predict')
+    for k in K_range:
+        referencia = KMeans(k, n_init=10, random_state=0).fit(blobs).inertia_
+        assert modelos[k].inertia_ <= referencia * 1.01
+        assert not hasattr(modelos[k], "labels_")
+    assert len(np.unique(modelos[4].predict(blobs))) == 4
+
+
+def test_joelho_nos_blobs_com_parada_antecipada(blobs):
+    K_range, wss, modelos, k_joelho = varrer_cotovelo(
+        blobs, k_max=10, n_init=3, n_jobs=2
+    )
+    assert k_joelho == 4
+    # Parou logo depois de confirmar o joelho ('paciencia' = 2)
+    assert K_range == [1, 2, 3, 4, 5, 6]
+    assert sorted(modelos) == K_range
+    assert detectar_joelho(K_range, wss) == (4, True)
+
+
+def test_curva_sem_joelho():
+    # Redução relativa constante: nenhum k se destaca
+    wss = 2.0 ** -np.arange(10)
+    assert confirmar_joelho(wss) is None
+    assert detectar_joelho([1, 2], [10.0, 5.0]) == (None, False)
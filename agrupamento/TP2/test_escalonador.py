@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""Testes do escalonador com orçamento de tempo e memória."""
+
+import os
+import time
+
+import numpy as np
+import pytest
+from sklearn.base import BaseEstimator, ClusterMixin
+from sklearn.cluster import KMeans, SpectralClustering
+
+from escalonador import executar_com_orcamento
+
+
+class Dorminhoco(ClusterMixin, BaseEstimator):
+    """Demora 'segundos' para ajustar."""
+
+    def __init__(self, segundos=30.0):
+        self.segundos = segundos
+
+    def fit(self, X, y=None):
+        time.sleep(self.segundos)
+        self.labels_ = np.zeros(len(X), dtype=int)
+        return self
+
+
+class Guloso(ClusterMixin, BaseEstimator):
+    """Aloca (e toca) 'mb' megabytes e espera, sem terminar a tempo."""
+
+    def __init__(self, mb=400):
+        self.mb = mb
+
+    def fit(self, X, y=None):
+        self.bloco_ = np.ones(self.mb * 2**20, dtype=np.uint8)
+        time.sleep(30.0)
+        self.labels_ = np.zeros(len(X), dtype=int)
+        return self
+
+
+@pytest.fixture
+def X():
+    return np.random.default_rng(0).normal(size=(200, 2))
+
+
+def test_timeout(X):
+    inicio = time.perf_counter()
+    resultados = executar_com_orcamento(
+        [("lento", Dorminhoco()), ("kmeans", KMeans(3, n_init=1, random_state=0))],
+        X,
+        tempo_limite=1.0,
+        n_jobs=2,
+    )
+    assert time.perf_counter() - inicio < 10
+    assert resultados["lento"]["status"] == "timeout"
+    assert resultados["kmeans"]["status"] == "ok"
+    assert len(resultados["kmeans"]["labels"]) == len(X)
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/self/status"), reason="precisa de /proc")
+def test_oom(X):
+    resultados = executar_com_orcamento(
+        [("guloso", Guloso())], X, tempo_limite=20.0, memoria_limite_mb=100
+    )
+    assert resultados["guloso"]["status"] == "oom"
+    assert resultados["guloso"]["pico_mb"] > 100
+    assert resultados["guloso"]["tempo"] < 20.0
+
+
+def test_dtype_interno_do_algoritmo(X):
+    X32 = X.astype(np.float32)
+    resultados = executar_com_orcamento(
+        [
+            ("kmeans", KMeans(3, n_init=1, random_state=0)),
+            ("espectral", SpectralClustering(3, random_state=0)),
+        ],
+        X32,
+        n_jobs=2,
+    )
+    # O K-Means trabalha em float32; a afinidade do Spectral sai em float64
+    assert resultados["kmeans"]["dtype"] == "float32"
+    assert resultados["espectral"]["dtype"] == "float64"
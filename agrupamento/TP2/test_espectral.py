@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""Testes do Spectral Clustering com autossolver escalável."""
+
+import numpy as np
+import pytest
+from sklearn.cluster import SpectralClustering
+from sklearn.datasets import make_blobs, make_moons
+from sklearn.metrics import adjusted_rand_score
+from sklearn.neighbors import NearestNeighbors
+
+import espectral
+from espectral import SpectralEscalavel
+
+
+@pytest.fixture(scope="module")
+def blobs():
+    X, y = make_blobs(
+        n_samples=1500,
+        centers=[(-6, 0), (6, 0), (0, 6), (0, -6)],
+        cluster_std=0.6,
+        random_state=1,
+    )
+    return X, y
+
+
+def test_arpack_igual_ao_scikit_learn(blobs):
+    X, _ = blobs
+    referencia = SpectralClustering(
+        4, affinity="nearest_neighbors", n_neighbors=10, random_state=0
+    ).fit(X)
+    modelo = SpectralEscalavel(4, modo="arpack", random_state=0).fit(X)
+    assert modelo.modo_ == "arpack"
+    assert adjusted_rand_score(referencia.labels_, modelo.labels_) == 1.0
+    assert set(modelo.etapas_) == {"modo", "afinidade", "autovetores", "kmeans"}
+
+
+def test_grafo_knn_compartilhado(blobs):
+    X, _ = blobs
+    grafo = NearestNeighbors(n_neighbors=10).fit(X).kneighbors_graph(mode="distance")
+    proprio = SpectralEscalavel(4, modo="arpack", random_state=0).fit(X)
+    compartilhado = SpectralEscalavel(
+        4, modo="arpack", grafo_knn=grafo, random_state=0
+    ).fit(X)
+    np.testing.assert_array_equal(compartilhado.labels_, proprio.labels_)
+
+
+def test_lobpcg_concorda_com_arpack(blobs):
+    X, y = blobs
+    modelo = SpectralEscalavel(4, modo="lobpcg", random_state=0).fit(X)
+    assert modelo.modo_ == "lobpcg"
+    assert adjusted_rand_score(y, modelo.labels_) > 0.99
+
+
+def test_nystrom_em_blocos_recupera_os_blobs(blobs, monkeypatch):
+    X, y = blobs
+    # Blocos pequenos para exercitar as três passadas em vários blocos
+    monkeypatch.setattr(espectral, "_LINHAS_POR_BLOCO", 256)
+    modelo = SpectralEscalavel(4, modo="nystrom", n_marcos=200, random_state=0)
+    modelo.fit(X)
+    assert modelo.modo_ == "nystrom"
+    assert adjusted_rand_score(y, modelo.labels_) > 0.99
+
+
+def test_nystrom_separa_formas_nao_convexas():
+    X, y = make_moons(n_samples=2000, noise=0.05, random_state=0)
+    modelo = SpectralEscalavel(
+        2, modo="nystrom", n_marcos=300, gamma=30.0, random_state=0
+    ).fit(X)
+    assert adjusted_rand_score(y, modelo.labels_) > 0.95
+
+
+def test_escolha_do_modo():
+    modelo = SpectralEscalavel(limite_arpack=100, limite_nystrom=1000)
+    assert modelo._escolher_modo(100) == "arpack"
+    assert modelo._escolher_modo(500) == (
+        "amg" if espectral.AMG_DISPONIVEL else "lobpcg"
+    )
+    assert modelo._escolher_modo(1001) == "nystrom"
+    with pytest.raises(ValueError):
+        SpectralEscalavel(modo="denso")._escolher_modo(10)
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Testes dos cortes da árvore hierárquica calculada uma única vez."""
+
+import numpy as np
+import pytest
+from scipy.cluster.hierarchy import cut_tree, linkage
+from sklearn.cluster import AgglomerativeClustering
+from sklearn.datasets import make_blobs
+from sklearn.metrics import adjusted_rand_score
+
+from hierarquico import (
+    cortar_arvore,
+    custo_por_k,
+    joelho_dendrograma,
+    matriz_ligacao,
+    salvar_cortes_hierarquicos,
+)
+
+
+@pytest.fixture(scope="module")
+def blobs():
+    X, y = make_blobs(n_samples=400, centers=4, cluster_std=0.7, random_state=0)
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def arvore_ward(blobs):
+    X, _ = blobs
+    modelo = AgglomerativeClustering(
+        linkage="ward", compute_full_tree=True, compute_distances=True
+    ).fit(X)
+    return matriz_ligacao(modelo.children_, modelo.distances_)
+
+
+def test_cortes_iguais_a_reajustar_em_cada_k(blobs, arvore_ward):
+    X, _ = blobs
+    cortes = cortar_arvore(arvore_ward, range(1, 9))
+    for k, rotulos in cortes.items():
+        refeito = AgglomerativeClustering(n_clusters=k, linkage="ward").fit(X)
+        assert adjusted_rand_score(rotulos, refeito.labels_) == 1.0
+
+
+def test_cortes_iguais_ao_cut_tree_do_scipy(blobs):
+    X, _ = blobs
+    Z = linkage(X, method="average")
+    cortes = cortar_arvore(Z, [2, 5, 17])
+    for k, rotulos in cortes.items():
+        assert adjusted_rand_score(rotulos, cut_tree(Z, k).ravel()) == 1.0
+
+
+def test_custo_do_ward_e_o_dobro_do_wss(blobs, arvore_ward):
+    X, _ = blobs
+    cortes = cortar_arvore(arvore_ward, [1, 3, 4])
+    custos = custo_por_k(arvore_ward, [1, 3, 4])
+    for k, custo in zip([1, 3, 4], custos):
+        wss = sum(
+            ((X[cortes[k] == c] - X[cortes[k] == c].mean(axis=0)) ** 2).sum()
+            for c in range(k)
+        )
+        assert custo == pytest.approx(2 * wss)
+
+
+def test_joelho_do_dendrograma_nos_blobs(blobs, arvore_ward):
+    _, y = blobs
+    k_joelho, ks, custos = joelho_dendrograma(arvore_ward, k_max=10)
+    assert k_joelho == 4
+    assert ks == list(range(1, 11))
+    assert np.all(np.diff(custos) < 0)
+    cortes = cortar_arvore(arvore_ward, [k_joelho])
+    assert adjusted_rand_score(y, cortes[k_joelho]) > 0.95
+
+
+def test_cortes_do_coreset_estendidos(blobs, arvore_ward, tmp_path):
+    # Árvore de um "coreset" (os 400 pontos) estendida a 800 pontos
+    representante = np.tile(np.arange(400), 2)
+    algoritmos = [("Ward", "ward", None)]
+    resultados = {
+        "ward": {
+            "status": "ok",
+            "linkage": arvore_ward,
+            "labels": np.zeros(800, dtype=int),
+            "coreset": True,
+        }
+    }
+    salvar_cortes_hierarquicos(
+        algoritmos,
+        resultados,
+        "Blobs",
+        str(tmp_path),
+        "t",
+        k_max=5,
+        representantes={"ward": representante},
+    )
+    cortes = np.loadtxt(tmp_path / "t_ward_cortes.csv", delimiter=",", skiprows=1)
+    assert cortes.shape == (800, 5)
+    np.testing.assert_array_equal(cortes[:400], cortes[400:])
+    assert (tmp_path / "t_ward_dendrograma.png").exists()
+    assert "Ward" in (tmp_path / "t_hierarquico.txt").read_text(encoding="utf-8")
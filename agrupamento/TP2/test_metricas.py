@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""Testes das métricas de qualidade dos agrupamentos."""
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+from sklearn.metrics import adjusted_rand_score, silhouette_score
+
+from metricas import (
+    ari_entre_pares,
+    avaliar_agrupamento,
+    avaliar_em_paralelo,
+    silhueta_amostrada,
+)
+
+
+@pytest.fixture(scope="module")
+def blobs():
+    return make_blobs(n_samples=3000, centers=3, random_state=0)
+
+
+def test_silhueta_amostrada_cerca_a_exata(blobs):
+    X, y = blobs
+    media, inferior, superior = silhueta_amostrada(X, y, tamanho_amostra=500)
+    assert inferior < media < superior
+    assert media == pytest.approx(silhouette_score(X, y), abs=0.02)
+
+
+def test_silhueta_com_uma_repeticao_da_ic_degenerado(blobs):
+    X, y = blobs
+    with pytest.warns(RuntimeWarning, match="degenerado"):
+        media, inferior, superior = silhueta_amostrada(
+            X, y, tamanho_amostra=500, repeticoes=1
+        )
+    assert np.isfinite(media)
+    assert inferior == media == superior
+
+
+def test_ari_entre_pares_igual_ao_do_scikit_learn(blobs):
+    _, y = blobs
+    rng = np.random.default_rng(0)
+    rotulos = [y, (y + 1) % 3, rng.integers(0, 4, len(y)), np.where(y == 0, -1, y)]
+    matriz = ari_entre_pares(rotulos)
+    for i in range(len(rotulos)):
+        for j in range(len(rotulos)):
+            assert matriz[i, j] == pytest.approx(
+                adjusted_rand_score(rotulos[i], rotulos[j])
+            )
+
+
+def test_ruido_fora_das_metricas_internas(blobs):
+    X, y = blobs
+    labels = y.copy()
+    labels[:300] = -1
+    metricas = avaliar_agrupamento(X, labels, y_verdadeiro=y)
+    assert metricas["Clusters"] == 3
+    assert metricas["Ruído (%)"] == pytest.approx(10.0)
+    assert metricas["ARI"] < 1.0
+
+    em_paralelo = avaliar_em_paralelo(X, {"certo": y, "um_cluster": np.zeros(len(y))})
+    assert em_paralelo["certo"]["Silhueta"] == pytest.approx(
+        silhouette_score(X, y), abs=0.02
+    )
+    assert np.isnan(em_paralelo["um_cluster"]["Silhueta"])
@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""Testes dos modelos de atribuição (rotular pontos novos sem reajuste)."""
+
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN, KMeans
+from sklearn.datasets import make_blobs
+from sklearn.mixture import GaussianMixture
+from sklearn.preprocessing import StandardScaler
+
+from modelo_atribuicao import (
+    ModeloAtribuicao,
+    carregar_modelos_atribuicao,
+    modelo_centroides,
+    modelo_densidade,
+    modelo_mistura,
+    modelo_votacao,
+    salvar_modelos_atribuicao,
+)
+
+
+@pytest.fixture(scope="module")
+def blobs():
+    X, y = make_blobs(n_samples=1200, centers=[(-5, 0), (5, 0), (0, 8)], random_state=0)
+    return StandardScaler().fit_transform(X), y
+
+
+@pytest.mark.parametrize("tipo_covariancia", ["full", "tied", "diag", "spherical"])
+def test_mistura_igual_ao_predict_do_gmm(blobs, tipo_covariancia):
+    X, _ = blobs
+    gmm = GaussianMixture(3, covariance_type=tipo_covariancia, random_state=0).fit(X)
+    modelo = modelo_mistura(
+        gmm.means_, gmm.covariances_, gmm.weights_, gmm.covariance_type
+    )
+    np.testing.assert_array_equal(modelo.predict(X), gmm.predict(X))
+
+
+def test_centroides_igual_ao_predict_do_kmeans(blobs):
+    X, _ = blobs
+    kmeans = KMeans(3, n_init=3, random_state=0).fit(X)
+    modelo = modelo_centroides(kmeans.cluster_centers_)
+    np.testing.assert_array_equal(modelo.predict(X), kmeans.predict(X))
+
+
+def test_densidade_marca_pontos_distantes_como_ruido(blobs):
+    X, _ = blobs
+    dbscan = DBSCAN(eps=0.3, min_samples=5).fit(X)
+    nucleo = np.zeros(len(X), dtype=bool)
+    nucleo[dbscan.core_sample_indices_] = True
+    modelo = modelo_densidade(X, dbscan.labels_, nucleo, 0.3)
+    np.testing.assert_array_equal(modelo.predict(X[nucleo]), dbscan.labels_[nucleo])
+    assert modelo.predict([[50.0, 50.0]])[0] == -1
+
+
+def test_votacao_knn(blobs):
+    X, y = blobs
+    modelo = modelo_votacao(X, y, n_vizinhos=5)
+    assert np.mean(modelo.predict(X) == y) > 0.98
+
+
+def test_npz_ida_e_volta(blobs, tmp_path):
+    X, y = blobs
+    gmm = GaussianMixture(3, random_state=0).fit(X)
+    scaler = StandardScaler().fit(X * 10 + 3)
+    modelo = modelo_mistura(gmm.means_, gmm.covariances_, gmm.weights_)
+    modelo.media, modelo.escala = scaler.mean_, scaler.scale_
+    caminho = tmp_path / "modelo.npz"
+    modelo.salvar(caminho)
+
+    # Só arrays: carrega sem pickle
+    with np.load(caminho, allow_pickle=False) as arquivo:
+        assert str(arquivo["tipo"]) == "gaussiano"
+    carregado = ModeloAtribuicao.carregar(caminho)
+    assert carregado.tipo == "gaussiano"
+    np.testing.assert_array_equal(carregado.predict(X), modelo.predict(X))
+    # 'rotular' padroniza dados brutos com a média/escala guardadas
+    np.testing.assert_array_equal(
+        carregado.rotular(X * scaler.scale_ + scaler.mean_), gmm.predict(X)
+    )
+
+
+def test_salvar_e_carregar_os_modelos_de_um_problema(blobs, tmp_path):
+    X, y = blobs
+    algoritmos = [("K-Means", "kmeans", None), ("Falhou", "falhou", None)]
+    resultados = {
+        "kmeans": {"status": "ok", "labels": y},
+        "falhou": {"status": "timeout"},
+    }
+
+    def montar_modelo(nome_arquivo, resultado):
+        return modelo_votacao(X, resultado["labels"])
+
+    diretorio_modelos = tmp_path / "modelos"
+    salvar_modelos_atribuicao(
+        X,
+        algoritmos,
+        resultados,
+        montar_modelo,
+        str(diretorio_modelos),
+        str(tmp_path),
+        "p",
+    )
+    assert "K-Means" in (tmp_path / "p_modelos.txt").read_text(encoding="utf-8")
+    modelos = carregar_modelos_atribuicao(str(diretorio_modelos), "p")
+    assert list(modelos) == ["kmeans"]
+    assert np.mean(modelos["kmeans"].predict(X) == y) > 0.98
+    assert carregar_modelos_atribuicao(str(diretorio_modelos), "outro") == {}
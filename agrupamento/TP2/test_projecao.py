@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""Testes da projeção 2D (PCA exato, aleatorizado e incremental)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.decomposition import PCA
+from sklearn.preprocessing import StandardScaler
+
+from projecao import (
+    ajustar_projecao,
+    ajustar_projecao_em_blocos,
+    escolher_metodo_pca,
+    projetar,
+)
+from streaming import projetar_em_blocos
+
+
+@pytest.fixture(scope="module")
+def X():
+    rng = np.random.default_rng(0)
+    # Variância concentrada em duas direções bem definidas
+    base = rng.normal(size=(3000, 2)) * [5.0, 2.0]
+    return base @ rng.normal(size=(2, 6)) + 0.1 * rng.normal(size=(3000, 6))
+
+
+def _mesmo_subespaco(a, b):
+    """Componentes iguais a menos do sinal."""
+    np.testing.assert_allclose(np.abs(np.sum(a * b, axis=1)), 1.0, atol=1e-3)
+
+
+def test_escolha_do_metodo():
+    assert escolher_metodo_pca(1000, 4) == "exato"
+    assert escolher_metodo_pca(1000, 200) == "aleatorio"
+    assert escolher_metodo_pca(10**8, 4) == "incremental"
+
+
+@pytest.mark.parametrize("metodo", ["aleatorio", "incremental"])
+def test_metodos_concordam_com_o_exato(X, metodo):
+    exato = ajustar_projecao(X, metodo="exato")
+    modelo = ajustar_projecao(X, metodo=metodo, tamanho_bloco=500)
+    _mesmo_subespaco(modelo.components_, exato.components_)
+    np.testing.assert_allclose(projetar(modelo, X, 700), modelo.transform(X))
+
+
+def test_blocos_pequenos_sao_juntados(X):
+    # Blocos de 1 linha não cabem num partial_fit com 2 componentes
+    tamanhos = [1, 1, 998, 1000, 999, 1]
+    blocos = np.split(X, np.cumsum(tamanhos)[:-1])
+    modelo = ajustar_projecao_em_blocos(iter(blocos))
+    assert modelo.n_samples_seen_ == len(X)
+    _mesmo_subespaco(modelo.components_, PCA(2).fit(X).components_)
+
+
+def test_projecao_do_modo_streaming(X, tmp_path):
+    caminho = tmp_path / "pontos.txt"
+    pd.DataFrame(X).to_csv(caminho, index=False)
+    scaler = StandardScaler().fit(X)
+    modelo = projetar_em_blocos(str(caminho), scaler, chunksize=400)
+    assert modelo.n_samples_seen_ == len(X)
+    _mesmo_subespaco(modelo.components_, PCA(2).fit(scaler.transform(X)).components_)
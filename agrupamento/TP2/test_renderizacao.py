@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Testes da renderização dos gráficos."""
+
+import re
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+from matplotlib.colors import to_rgba
+
+from renderizacao import (
+    FilaRenderizacao,
+    _array_tipado,
+    imagem_densidade,
+    indices_estratificados,
+    salvar_graficos_3d,
+)
+
+
+def test_fila_salva_os_graficos_em_paralelo(tmp_path):
+    X = np.random.default_rng(0).normal(size=(500, 2))
+    caminhos = [tmp_path / f"grafico_{i}.png" for i in range(3)]
+    with FilaRenderizacao(pd.DataFrame(X, columns=["x", "y"]), n_workers=2) as fila:
+        for i, caminho in enumerate(caminhos):
+            fila.enviar_2d(np.arange(500) % (i + 2), f"Teste {i}", str(caminho))
+    for caminho in caminhos:
+        assert caminho.read_bytes()[:8] == b"\x89PNG\r\n\x1a\n"
+
+
+def test_html_3d_unico_com_um_menu_por_algoritmo(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(3000, 3)), columns=["a", "b", "c"])
+    graficos = [
+        (f"alg{i}", f"Algoritmo {i}", np.arange(3000) % (i + 2) - (i == 2), f"T{i}")
+        for i in range(3)
+    ]
+    html = salvar_graficos_3d(df, graficos, str(tmp_path / "p"))
+    # O Plotly escapa '/' como '\u002f' no JSON embutido no HTML
+    texto = open(html, encoding="utf-8").read().replace("\\u002f", "/")
+    # Um único HTML, com os rótulos de cada algoritmo em binário compacto
+    for nome_arquivo, _, labels, _ in graficos:
+        assert f'"name":"{nome_arquivo}"' in texto
+        assert _array_tipado(labels.astype(np.int8))["bdata"] in texto
+    # As coordenadas aparecem uma vez só (float32)
+    coordenadas = _array_tipado(df["a"].to_numpy(dtype=np.float32))["bdata"]
+    assert texto.count(coordenadas) == 1
+    assert "Ruído" in texto
+
+
+def test_html_3d_amostrado(tmp_path):
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(5000, 3)), columns=["a", "b", "c"])
+    labels = np.arange(5000) % 3
+    html = salvar_graficos_3d(
+        df, [("alg", "Alg", labels, "T")], str(tmp_path / "p"), limite_pontos=500
+    )
+    texto = open(html, encoding="utf-8").read()
+    amostra = re.search(r"\[amostra: (\d+) de 5000 pontos\]", texto)
+    assert amostra and int(amostra.group(1)) <= 500
+
+
+def test_amostra_estratificada_mantem_os_clusters_pequenos():
+    labels = np.zeros(100_000, dtype=int)
+    labels[:30] = 1  # menor que o mínimo: entra inteiro
+    labels[30:1030] = 2
+    labels[-5:] = -1
+    indices = indices_estratificados(labels, 10_000, minimo_por_rotulo=50)
+    assert len(indices) <= 10_000
+    assert np.all(np.diff(indices) > 0)
+    contagens = dict(zip(*np.unique(labels[indices], return_counts=True)))
+    assert contagens[1] == 30 and contagens[-1] == 5
+    # Cota proporcional (1000 · 10_000 / 100_000), aparada pelo estouro
+    assert 50 <= contagens[2] <= 100
+    # Nem os pisos cabem: tudo encolhe junto, sem zerar nenhum rótulo
+    muitos = np.repeat(np.arange(300), 100)
+    indices = indices_estratificados(muitos, 1000, minimo_por_rotulo=50)
+    assert len(indices) <= 1000
+    assert len(np.unique(muitos[indices])) == 300
+    # Conjuntos pequenos não são amostrados
+    np.testing.assert_array_equal(
+        indices_estratificados(labels[:500], 1000), np.arange(500)
+    )
+
+
+def test_imagem_densidade():
+    X = np.array([[0.0, 0.0], [0.0, 0.0], [0.1, 0.0], [1.0, 1.0]])
+    labels = np.array([0, 0, 1, -1])
+    imagem, extent = imagem_densidade(X, labels, resolucao=4)
+    assert imagem.shape == (4, 4, 4)
+    assert extent == [0.0, 1.0, 0.0, 1.0]
+    # Célula (0, 0): 3 pontos, rótulo dominante 0, opacidade máxima
+    assert imagem[0, 0, 3] == 1.0
+    np.testing.assert_array_equal(imagem[0, 0, :3], plt.get_cmap("viridis")(0.0)[:3])
+    # Célula (3, 3): só ruído, em cinza e menos opaca
+    np.testing.assert_allclose(imagem[3, 3, :3], to_rgba("gray")[:3])
+    assert 0.3 < imagem[3, 3, 3] < 1.0
+    # Células vazias são transparentes
+    assert np.count_nonzero(imagem[..., 3]) == 2
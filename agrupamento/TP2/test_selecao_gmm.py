@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""Testes da seleção do Gaussian Mixture por BIC."""
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+from sklearn.metrics import adjusted_rand_score
+from sklearn.mixture import GaussianMixture
+
+from selecao_gmm import bic_subindo, salvar_selecao_gmm, selecionar_gmm
+
+
+@pytest.fixture(scope="module")
+def blobs():
+    X, y = make_blobs(n_samples=900, centers=4, cluster_std=0.6, random_state=0)
+    return X, y
+
+
+@pytest.fixture(scope="module")
+def selecao(blobs):
+    X, _ = blobs
+    return selecionar_gmm(X, k_max=8, n_jobs=2)
+
+
+def test_bic_subindo():
+    assert not bic_subindo([5.0, 4.0, 3.0])
+    assert not bic_subindo([5.0, 4.0])
+    assert not bic_subindo([5.0, 4.0, 6.0, 5.5])
+    assert bic_subindo([5.0, 4.0, 6.0, 7.0])
+    assert bic_subindo([5.0, 4.0, 6.0], paciencia=1)
+
+
+def test_escolhe_o_numero_de_blobs(blobs, selecao):
+    X, y = blobs
+    modelo, tabela = selecao
+    assert modelo.n_components == 4
+    assert adjusted_rand_score(y, modelo.predict(X)) > 0.99
+    melhor = min(tabela, key=lambda linha: linha["bic"])
+    assert (melhor["k"], melhor["tipo"]) == (4, modelo.covariance_type)
+    assert melhor["bic"] == pytest.approx(modelo.bic(X))
+
+
+def test_tabela_e_poda(blobs, selecao):
+    X, _ = blobs
+    _, tabela = selecao
+    for tipo in {linha["tipo"] for linha in tabela}:
+        ks = [linha["k"] for linha in tabela if linha["tipo"] == tipo]
+        # Prefixo contínuo de k = 1..j, podado antes de k_max
+        assert ks == list(range(1, len(ks) + 1))
+        assert len(ks) < 8
+    # Cada célula é no máximo tão ruim quanto o ajuste frio do scikit-learn
+    linha = next(l for l in tabela if (l["k"], l["tipo"]) == (2, "full"))
+    frio = GaussianMixture(2, random_state=0).fit(X)
+    assert linha["bic"] <= frio.bic(X) + 1e-6 * abs(frio.bic(X))
+
+
+def test_salvar_selecao_gmm(selecao, tmp_path):
+    modelo, tabela = selecao
+    salvar_selecao_gmm(modelo, tabela, "Blobs", str(tmp_path), "t", k_max=8)
+    texto = (tmp_path / "t_gmm_bic.txt").read_text(encoding="utf-8")
+    assert texto.startswith("Escolhido (menor BIC): k=4")
+    assert (tmp_path / "t_gmm_bic.png").exists()
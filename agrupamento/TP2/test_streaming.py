@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Testes do modo streaming (leitura em blocos)."""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from streaming import padronizar_em_blocos
+
+
+@pytest.fixture
+def arquivo(tmp_path):
+    X = np.random.default_rng(0).normal(loc=3.0, scale=2.0, size=(5000, 2))
+    caminho = tmp_path / "pontos.txt"
+    pd.DataFrame(X, columns=["a", "b"]).to_csv(caminho, index=False)
+    return str(caminho), X
+
+
+def test_padronizacao_e_amostra_em_uma_passada(arquivo):
+    caminho, X = arquivo
+    scaler, amostra = padronizar_em_blocos(caminho, chunksize=700, tamanho_amostra=800)
+    np.testing.assert_allclose(scaler.mean_, X.mean(axis=0))
+    np.testing.assert_allclose(scaler.scale_, X.std(axis=0))
+
+    # Linhas distintas do arquivo, sorteadas de todos os blocos
+    assert amostra.shape == (800, 2)
+    posicoes = [
+        np.flatnonzero(np.all(np.isclose(X, linha), axis=1)) for linha in amostra
+    ]
+    assert all(len(p) == 1 for p in posicoes)
+    posicoes = np.concatenate(posicoes)
+    assert len(np.unique(posicoes)) == 800
+    assert len(np.unique(posicoes // 700)) == 8
+
+
+def test_amostra_maior_que_o_arquivo(arquivo):
+    caminho, X = arquivo
+    _, amostra = padronizar_em_blocos(caminho, chunksize=700, tamanho_amostra=10_000)
+    assert len(amostra) == len(X)
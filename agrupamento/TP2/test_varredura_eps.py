@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+"""Testes da varredura de eps do DBSCAN contra o DBSCAN do scikit-learn."""
+
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN
+from sklearn.datasets import make_blobs
+from sklearn.metrics import adjusted_rand_score
+from sklearn.preprocessing import StandardScaler
+
+import varredura_eps
+from varredura_eps import varrer_eps_dbscan
+from vizinhanca import construir_indice_vizinhanca
+
+
+@pytest.fixture(scope="module")
+def X():
+    X, _ = make_blobs(
+        1500, centers=5, cluster_std=[0.3, 0.6, 1.0, 0.5, 0.8], random_state=1
+    )
+    return StandardScaler().fit_transform(X)
+
+
+@pytest.mark.parametrize("usar_indice", [False, True])
+@pytest.mark.parametrize("min_samples", [1, 5, 12])
+def test_mesmos_rotulos_do_dbscan(X, usar_indice, min_samples):
+    indice = construir_indice_vizinhanca(X, 15, 0.4) if usar_indice else None
+    _, tabela, rotulos = varrer_eps_dbscan(
+        X, min_samples, eps_valores=[0.05, 0.1, 0.2, 0.3], indice=indice
+    )
+    assert [linha["eps"] for linha in tabela] == [0.05, 0.1, 0.2, 0.3]
+    for eps, labels in rotulos.items():
+        modelo = DBSCAN(eps=eps, min_samples=min_samples).fit(X)
+        core = np.zeros(len(X), dtype=bool)
+        core[modelo.core_sample_indices_] = True
+        # Mesmo ruído e mesma partição dos pontos core; um ponto de borda
+        # alcançado por dois clusters pode ir para qualquer um deles
+        np.testing.assert_array_equal(labels == -1, modelo.labels_ == -1)
+        assert labels.max() == modelo.labels_.max()
+        if core.any():
+            assert adjusted_rand_score(labels[core], modelo.labels_[core]) == 1.0
+
+
+def test_grade_limitada_ao_raio_do_indice(X, monkeypatch):
+    # Raio entre o eps sugerido (~0.08) e o seu dobro: a grade para no
+    # raio e o grafo sai do índice, sem nova busca por raio
+    indice = construir_indice_vizinhanca(X, 15, 0.12)
+
+    def sem_busca(*args, **kwargs):
+        raise AssertionError("busca por raio fora do índice")
+
+    monkeypatch.setattr(varredura_eps, "NearestNeighbors", sem_busca)
+    eps_sugerido, tabela, _ = varrer_eps_dbscan(X, 5, indice=indice)
+    assert eps_sugerido <= 0.12 < 2 * eps_sugerido
+    assert max(linha["eps"] for linha in tabela) == 0.12
+    assert any(linha["sugerido"] for linha in tabela)
+
+
+def test_aviso_quando_o_raio_nao_cobre_o_eps(X, capsys):
+    indice = construir_indice_vizinhanca(X, 15, 0.02)
+    _, tabela, _ = varrer_eps_dbscan(X, 5, indice=indice)
+    assert "nova busca por raio" in capsys.readouterr().out
+    assert max(linha["eps"] for linha in tabela) > 0.02
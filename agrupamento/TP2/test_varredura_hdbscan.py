@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""Testes da varredura do HDBSCAN contra ajustes completos do HDBSCAN."""
+
+import numpy as np
+import pytest
+from sklearn.cluster import HDBSCAN
+from sklearn.datasets import make_blobs
+from sklearn.preprocessing import StandardScaler
+
+import varredura_hdbscan
+from varredura_hdbscan import arvore_ligacao, extrair, varrer_hdbscan
+from vizinhanca import construir_indice_vizinhanca
+
+
+@pytest.fixture(scope="module")
+def grafo():
+    X, _ = make_blobs(
+        1500, centers=5, cluster_std=[0.3, 0.6, 1.0, 0.5, 0.8], random_state=1
+    )
+    X = StandardScaler().fit_transform(X)
+    return construir_indice_vizinhanca(X, 30, 0.5)["grafo"]
+
+
+def _hdbscan(grafo, min_samples, min_cluster_size, **opcoes):
+    return HDBSCAN(
+        min_samples=min_samples,
+        min_cluster_size=min_cluster_size,
+        metric="precomputed",
+        copy=True,
+        **opcoes,
+    ).fit(grafo)
+
+
+@pytest.mark.parametrize("rotinas_internas", [True, False])
+@pytest.mark.parametrize("metodo", ["eom", "leaf"])
+@pytest.mark.parametrize("allow_single_cluster", [False, True])
+def test_mesmos_rotulos_do_hdbscan(
+    grafo, monkeypatch, rotinas_internas, metodo, allow_single_cluster
+):
+    if rotinas_internas and not varredura_hdbscan.ROTINAS_INTERNAS:
+        pytest.skip("rotinas internas do scikit-learn indisponíveis")
+    monkeypatch.setattr(varredura_hdbscan, "ROTINAS_INTERNAS", rotinas_internas)
+    tabela, rotulos = varrer_hdbscan(
+        grafo, (3, 10), (5, 15, 60, 400), allow_single_cluster, metodo
+    )
+    assert len(tabela) == len(rotulos) == 8
+    for (min_samples, min_cluster_size), labels in rotulos.items():
+        modelo = _hdbscan(
+            grafo,
+            min_samples,
+            min_cluster_size,
+            allow_single_cluster=allow_single_cluster,
+            cluster_selection_method=metodo,
+        )
+        np.testing.assert_array_equal(labels, modelo.labels_)
+    for linha in tabela:
+        assert np.isnan(linha["tempo_arvore"]) != rotinas_internas
+
+
+@pytest.mark.skipif(
+    not varredura_hdbscan.ROTINAS_INTERNAS,
+    reason="rotinas internas do scikit-learn indisponíveis",
+)
+def test_probabilidades_e_persistencia(grafo):
+    labels, probabilidades, estabilidade, persistencia = extrair(
+        arvore_ligacao(grafo, 3), 15, allow_single_cluster=True
+    )
+    modelo = _hdbscan(grafo, 3, 15, allow_single_cluster=True)
+    np.testing.assert_array_equal(labels, modelo.labels_)
+    np.testing.assert_allclose(probabilidades, modelo.probabilities_)
+    assert len(estabilidade) == len(persistencia) == labels.max() + 1
+    assert np.all(estabilidade > 0)
+    assert np.all((persistencia > 0) & (persistencia <= 1))
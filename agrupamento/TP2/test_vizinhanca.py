@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""Testes do índice de vizinhança ('vizinhanca.py')."""
+
+import numpy as np
+import pytest
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import HDBSCAN, estimate_bandwidth
+from sklearn.datasets import make_blobs
+from sklearn.neighbors import NearestNeighbors
+
+from vizinhanca import construir_indice_vizinhanca, estimar_bandwidth
+
+
+@pytest.fixture(scope="module")
+def blobs_separados():
+    # Grupos bem separados: o kNN sozinho deixa o grafo desconexo
+    X, _ = make_blobs(
+        600, centers=[(-20, 0), (0, 20), (20, 0)], cluster_std=0.5, random_state=0
+    )
+    return X
+
+
+@pytest.mark.parametrize("backend", ["exato", "aproximado"])
+def test_grafo_conexo_e_hdbscan_sobre_ele(blobs_separados, backend):
+    indice = construir_indice_vizinhanca(
+        blobs_separados, 5, 0.3, n_jobs=1, backend=backend
+    )
+    n_componentes, _ = connected_components(indice["grafo"], directed=False)
+    assert n_componentes == 1
+    # Num grafo desconexo o HDBSCAN pré-calculado lança ValueError
+    modelo = HDBSCAN(
+        min_cluster_size=20, min_samples=3, metric="precomputed", copy=True
+    ).fit(indice["grafo"])
+    assert modelo.labels_.max() == 2
+
+
+def test_grafo_simetrico_com_diagonal_zero(blobs_separados):
+    X = blobs_separados
+    indice = construir_indice_vizinhanca(X, 8, 0.5, n_jobs=1)
+    grafo = indice["grafo"].tocsr()
+    densa = grafo.toarray()
+    np.testing.assert_array_equal(densa, densa.T)
+    # Diagonal com zeros explícitos (o ponto conta como vizinho de si mesmo)
+    linhas, colunas = grafo.nonzero()
+    assert not np.any(linhas == colunas)
+    assert grafo.nnz == len(linhas) + len(X)
+    assert np.all(np.diag(densa) == 0)
+
+    # Cada ponto tem no grafo seus k vizinhos e todos a até o raio, com
+    # as distâncias exatas
+    esperado = (
+        NearestNeighbors(radius=0.5)
+        .fit(X)
+        .radius_neighbors_graph(mode="distance")
+        .toarray()
+    )
+    np.testing.assert_allclose(densa[esperado > 0], esperado[esperado > 0])
+    distancias, indices = indice["distancias"], indice["indices"]
+    assert not np.any(indices == np.arange(len(X))[:, None])
+    np.testing.assert_allclose(np.take_along_axis(densa, indices, axis=1), distancias)
+
+
+def test_bandwidth_reaproveita_o_indice_com_quantil_pequeno():
+    # n realista e quantil pequeno: k = 20 cabe nos 30 vizinhos do índice
+    X, _ = make_blobs(20_000, centers=4, random_state=0)
+    indice = construir_indice_vizinhanca(X, n_vizinhos=30, raio=0)
+    estimada = estimar_bandwidth(X, quantile=0.001, indice=indice)
+    assert estimada == pytest.approx(estimate_bandwidth(X, quantile=0.001), rel=0.05)
+
+    # A resposta vem das distâncias do índice, sem nova busca
+    falso = {"n_vizinhos": 30, "distancias": np.full((len(X), 30), 7.0)}
+    assert estimar_bandwidth(X, quantile=0.001, indice=falso) == 7.0
+    # Com o quantil padrão, k não cabe no índice e a estimativa é amostrada
+    assert estimar_bandwidth(X, quantile=0.3, indice=falso) != 7.0
+
+
+def test_bandwidth_amostrada_aproxima_a_do_scikit_learn():
+    X, _ = make_blobs(3000, centers=4, random_state=0)
+    estimada = estimar_bandwidth(X, quantile=0.3)
+    assert estimada == pytest.approx(estimate_bandwidth(X, quantile=0.3), rel=0.1)
+
+
+def test_indice_float32_guarda_na_precisao_dos_dados(blobs_separados):
+    X = blobs_separados
+    X32 = X.astype(np.float32)
+    indice = construir_indice_vizinhanca(X32, 8, 0.5, n_jobs=1)
+    assert indice["distancias"].dtype == np.float32
+    assert indice["grafo"].dtype == np.float32
+    # Mesmas distâncias do índice em float64, a menos do arredondamento
+    referencia = construir_indice_vizinhanca(X, 8, 0.5, n_jobs=1)
+    np.testing.assert_allclose(
+        indice["distancias"], referencia["distancias"], atol=1e-5
+    )
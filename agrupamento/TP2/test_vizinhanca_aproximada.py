@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+"""Testes da busca aproximada de vizinhos (floresta de projeções)."""
+
+import numpy as np
+import pytest
+from sklearn.datasets import make_blobs
+from sklearn.neighbors import NearestNeighbors
+
+from vizinhanca import construir_indice_vizinhanca
+from vizinhanca_aproximada import knn_aproximado, medir_recall
+
+
+def test_recall_contra_busca_exata():
+    X, _ = make_blobs(n_samples=3000, n_features=8, centers=5, random_state=0)
+    distancias, indices = knn_aproximado(X, 10)
+    assert distancias.shape == indices.shape == (3000, 10)
+    assert np.all(np.diff(distancias, axis=1) >= 0)
+    assert not np.any(indices == np.arange(3000)[:, None])
+
+    exatas, _ = NearestNeighbors(n_neighbors=10).fit(X).kneighbors()
+    recall = medir_recall(X, distancias)
+    assert recall >= 0.95
+    # A busca aproximada nunca acha vizinhos mais perto que os exatos
+    assert np.all(distancias[:, 0] >= exatas[:, 0] - 1e-9)
+
+
+def test_refina_ate_o_recall_alvo():
+    X = np.random.default_rng(0).normal(size=(3000, 16))
+    opcoes = dict(n_arvores=2, tamanho_folha=32, refinamentos=0)
+    sem_alvo, _ = knn_aproximado(X, 10, recall_alvo=None, **opcoes)
+    com_alvo, _ = knn_aproximado(X, 10, recall_alvo=0.9, **opcoes)
+    assert medir_recall(X, com_alvo) > medir_recall(X, sem_alvo) + 0.1
+
+
+def test_aviso_de_recall_baixo():
+    X = np.random.default_rng(0).normal(size=(2000, 32))
+    with pytest.warns(RuntimeWarning, match="Recall"):
+        indice = construir_indice_vizinhanca(
+            X,
+            n_vizinhos=10,
+            raio=0,
+            backend="aproximado",
+            opcoes_aproximado=dict(
+                n_arvores=1, tamanho_folha=32, refinamentos=0, recall_alvo=None
+            ),
+        )
+    assert indice["recall"] < 0.8
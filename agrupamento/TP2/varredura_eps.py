@@ -0,0 +1,268 @@
+# -*- coding: utf-8 -*-
+"""
+Varredura do 'eps' do DBSCAN sem reajustar o DBSCAN a cada valor.
+
+As buscas de vizinhos são feitas uma única vez, no maior eps da grade:
+  - k-distância de cada ponto (distância ao seu (min_samples - 1)-ésimo
+    vizinho), que diz a partir de qual eps o ponto é "core";
+  - grafo esparso com todos os pares a até max_eps.
+
+Com esses dois insumos, cada aresta recebe o peso de alcançabilidade
+mútua max(d(i, j), kdist_i, kdist_j), e a floresta geradora mínima desse
+grafo é calculada uma única vez. Para cada eps, os clusters do DBSCAN são
+as componentes da floresta restrita a arestas de peso <= eps (só n - 1
+arestas), e cada ponto de borda vai para o cluster do core mais próximo a
+até eps (o DBSCAN usa o primeiro core que o alcança; é a única diferença
+possível).
+
+É a mesma ideia do 'cluster_optics_dbscan' (extrair o DBSCAN da
+alcançabilidade do OPTICS) e da hierarquia do HDBSCAN, mas sem o laço em
+Python do OPTICS do scikit-learn, que sozinho leva mais tempo que vários
+DBSCANs.
+
+O eps sugerido é o joelho da curva de k-distância ordenada, como
+recomendado no artigo original do DBSCAN (Ester et al., 1996).
+'salvar_varredura_eps' grava a tabela por eps e a grade de agrupamentos.
+"""
+
+import os
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components, minimum_spanning_tree
+from sklearn.neighbors import NearestNeighbors
+
+from renderizacao import desenhar_grafico_2d
+from vizinhanca import (
+    _linhas_csr,
+    construir_indice_vizinhanca,
+    estimar_arestas_raio,
+    grafo_raio,
+)
+
+# Acima disso (estimativa) o grafo de raio de um eps não é construído
+LIMITE_ARESTAS = 2e7
+
+
+def k_distancias(X, min_samples, indice=None):
+    """
+    Distância de cada ponto ao vizinho que o torna "core" no DBSCAN
+    (o próprio ponto conta como um dos 'min_samples'). Usa o índice de
+    vizinhança quando ele tem vizinhos suficientes.
+    """
+    if min_samples <= 1:
+        return np.zeros(X.shape[0])
+    if indice is None or indice["n_vizinhos"] < min_samples - 1:
+        indice = construir_indice_vizinhanca(X, n_vizinhos=min_samples - 1, raio=0.0)
+    return indice["distancias"][:, min_samples - 2]
+
+
+def sugerir_eps(k_dist):
+    """
+    Joelho da curva de k-distância ordenada (crescente e convexa): o ponto
+    mais distante, abaixo, da reta que liga o primeiro ao último ponto,
+    com as duas coordenadas normalizadas para [0, 1] (Kneedle).
+    """
+    y = np.sort(k_dist)
+    if y[-1] == y[0]:
+        return float(y[0])
+    x = np.linspace(0.0, 1.0, len(y))
+    diferenca = x - (y - y[0]) / (y[-1] - y[0])
+    return float(y[np.argmax(diferenca)])
+
+
+def arvore_alcancabilidade(grafo, k_dist, max_eps):
+    """
+    Floresta geradora mínima do grafo com pesos de alcançabilidade mútua
+    max(d(i, j), kdist_i, kdist_j). Uma aresta com peso <= eps liga dois
+    pontos core a até eps um do outro, então as componentes da floresta
+    restrita a pesos <= eps são exatamente os clusters (só core) do DBSCAN.
+    Retorna (origem, destino, peso) das n - 1 (ou menos) arestas.
+    """
+    linhas = _linhas_csr(grafo.indptr)
+    peso = np.maximum(grafo.data, np.maximum(k_dist[linhas], k_dist[grafo.indices]))
+    # Uma direção de cada aresta basta, e pesos > max_eps nunca são usados
+    manter = (linhas < grafo.indices) & (peso <= max_eps)
+    # O csgraph ignora pesos zero (pontos duplicados): desloca todos um pouco
+    mutua = sp.csr_matrix(
+        (
+            peso[manter] + np.finfo(float).tiny,
+            (linhas[manter], grafo.indices[manter]),
+        ),
+        shape=grafo.shape,
+    )
+    arvore = minimum_spanning_tree(mutua).tocoo()
+    return arvore.row, arvore.col, arvore.data
+
+
+def rotulos_dbscan(grafo, k_dist, arvore, eps):
+    """
+    Rótulos do DBSCAN(eps) a partir do grafo de pares a até >= eps (CSR
+    simétrica de distâncias), das k-distâncias e da floresta de
+    'arvore_alcancabilidade'. Ruído = -1.
+    """
+    n = grafo.shape[0]
+    core = k_dist <= eps
+
+    # Clusters: componentes da floresta com arestas <= eps, entre pontos core
+    origem, destino, peso = arvore
+    ativas = peso <= eps
+    ligacoes = sp.csr_matrix(
+        (np.ones(ativas.sum()), (origem[ativas], destino[ativas])), shape=(n, n)
+    )
+    _, componente = connected_components(ligacoes, directed=False)
+    labels = np.full(n, -1)
+    _, labels[core] = np.unique(componente[core], return_inverse=True)
+
+    # Borda: ponto não core com um core a até eps vai para o core mais próximo
+    linhas = _linhas_csr(grafo.indptr)
+    borda = (grafo.data <= eps) & ~core[linhas] & core[grafo.indices]
+    if borda.any():
+        linhas, colunas = linhas[borda], grafo.indices[borda]
+        ordem = np.lexsort((grafo.data[borda], linhas))
+        primeiro = np.r_[True, linhas[ordem][1:] != linhas[ordem][:-1]]
+        labels[linhas[ordem][primeiro]] = labels[colunas[ordem][primeiro]]
+    return labels
+
+
+def varrer_eps_dbscan(
+    X,
+    min_samples,
+    eps_valores=None,
+    n_eps=8,
+    indice=None,
+    limite_arestas=LIMITE_ARESTAS,
+):
+    """
+    Rótulos do DBSCAN para vários valores de eps com uma única busca de
+    vizinhos.
+
+    Se 'eps_valores' for None, usa 'n_eps' valores em escala geométrica
+    entre metade e o dobro do eps sugerido pelo joelho da k-distância
+    (que também é incluído). Retorna (eps_sugerido, tabela, rotulos):
+    'tabela' é uma lista de dicionários (eps, clusters, fração de ruído,
+    sugerido) e 'rotulos' é {eps: labels}.
+
+    Valores de eps cujo grafo passaria de ~'limite_arestas' arestas
+    (estimativa por amostragem) são descartados: em clusters muito densos
+    o grafo de raio cresce como n², tanto aqui quanto no próprio DBSCAN.
+
+    Com 'indice', a grade é limitada ao raio dele (os valores acima viram
+    o próprio raio), desde que o raio cubra o eps sugerido; o grafo é
+    então um recorte do índice. Só se o raio for menor que o eps sugerido
+    (ou zero) é feita uma busca por raio completa, com um aviso.
+    """
+    k_dist = k_distancias(X, min_samples, indice)
+    eps_sugerido = sugerir_eps(k_dist)
+    if eps_valores is None:
+        eps_valores = np.geomspace(eps_sugerido / 2, eps_sugerido * 2, n_eps)
+        eps_valores = np.append(eps_valores, eps_sugerido)
+    eps_valores = np.unique(np.asarray(eps_valores, dtype=float))
+    while len(eps_valores) > 1 and (
+        estimar_arestas_raio(X, eps_valores[-1]) > limite_arestas
+    ):
+        print(f"  Aviso: eps={eps_valores[-1]:.3g} descartado (grafo grande demais).")
+        eps_valores = eps_valores[:-1]
+    if indice is not None and eps_sugerido <= indice["raio"] < eps_valores.max():
+        print(
+            f"  Aviso: eps acima do raio do índice ({indice['raio']:.3g}) "
+            "limitados a ele."
+        )
+        eps_valores = np.unique(np.minimum(eps_valores, indice["raio"]))
+    max_eps = float(eps_valores.max())
+
+    # Todos os pares a até max_eps: recorte do índice ou uma busca nova
+    # (o grafo de raio já é simétrico; não precisa da união com o kNN)
+    if indice is not None and indice["raio"] >= max_eps:
+        grafo = grafo_raio(indice, max_eps)
+    else:
+        if indice is not None:
+            print(
+                f"  Aviso: eps sugerido ({eps_sugerido:.3g}) acima do raio do "
+                f"índice ({indice['raio']:.3g}); nova busca por raio até "
+                f"{max_eps:.3g}."
+            )
+        grafo = NearestNeighbors(radius=max_eps, n_jobs=-1).fit(X)
+        grafo = grafo.radius_neighbors_graph(mode="distance")
+
+    arvore = arvore_alcancabilidade(grafo, k_dist, max_eps)
+
+    tabela, rotulos = [], {}
+    for eps in eps_valores:
+        labels = rotulos_dbscan(grafo, k_dist, arvore, eps)
+        rotulos[float(eps)] = labels
+        tabela.append(
+            {
+                "eps": float(eps),
+                "clusters": int(labels.max()) + 1,
+                "ruido": float(np.mean(labels == -1)),
+                "sugerido": bool(eps == eps_sugerido),
+            }
+        )
+    return eps_sugerido, tabela, rotulos
+
+
+def salvar_varredura_eps(
+    X,
+    X_plot,
+    indice,
+    min_samples,
+    nome_conjunto,
+    diretorio,
+    prefixo,
+    n_eps=8,
+    is_3d=False,
+    limite_pontos=50_000,
+    modo_grafico="amostra",
+):
+    """
+    Varre o eps do DBSCAN reaproveitando o índice de vizinhança e salva em
+    'diretorio' a tabela de clusters/ruído por eps em TXT e, nos problemas
+    2D, uma grade com os agrupamentos ('limite_pontos' e 'modo_grafico'
+    como em 'desenhar_grafico_2d').
+    """
+    print("  Varrendo o eps do DBSCAN...")
+    eps_sugerido, tabela, rotulos = varrer_eps_dbscan(
+        X, min_samples, n_eps=n_eps, indice=indice
+    )
+    print(f"  eps sugerido pela k-distância: {eps_sugerido:.4f}")
+
+    tabela_df = pd.DataFrame(tabela).rename(
+        columns={"clusters": "Clusters", "sugerido": "Sugerido"}
+    )
+    tabela_df["Ruído (%)"] = (100 * tabela_df.pop("ruido")).round(2)
+    tabela_df["eps"] = tabela_df["eps"].round(4)
+    tabela_df["Sugerido"] = tabela_df["Sugerido"].map({True: "sim", False: ""})
+    tabela_path = os.path.join(diretorio, f"{prefixo}_dbscan_eps.txt")
+    with open(tabela_path, "w", encoding="utf-8") as f:
+        f.write(f"min_samples = {min_samples}\n")
+        f.write(tabela_df.set_index("eps").to_string(line_width=80))
+    print(f"  Varredura do eps salva em: {tabela_path}")
+
+    if is_3d:
+        return
+    n_colunas = 3
+    n_linhas = -(-len(tabela) // n_colunas)
+    fig, eixos = plt.subplots(
+        n_linhas, n_colunas, figsize=(5 * n_colunas, 4.5 * n_linhas), squeeze=False
+    )
+    for ax, linha in zip(eixos.flat, tabela):
+        labels = rotulos[linha["eps"]]
+        marca = " (sugerido)" if linha["sugerido"] else ""
+        title = (
+            f"eps={linha['eps']:.3g}{marca}\n"
+            f"{linha['clusters']} clusters, {100 * linha['ruido']:.1f}% ruído"
+        )
+        desenhar_grafico_2d(
+            ax, X_plot, labels, title, limite_pontos=limite_pontos, modo=modo_grafico
+        )
+    for ax in eixos.flat[len(tabela) :]:
+        ax.axis("off")
+    fig.suptitle(f"DBSCAN por eps - {nome_conjunto}")
+    fig.tight_layout()
+    grade_path = os.path.join(diretorio, f"{prefixo}_dbscan_eps.png")
+    fig.savefig(grade_path)
+    plt.close(fig)
+    print(f"  Grade da varredura salva em: {grade_path}")
@@ -0,0 +1,398 @@
+# -*- coding: utf-8 -*-
+"""
+Varredura do HDBSCAN em (min_samples, min_cluster_size) sem reconstruir a
+árvore a cada combinação.
+
+No HDBSCAN, 'min_samples' define as distâncias core e, com elas, a
+árvore geradora mínima da alcançabilidade mútua e a árvore de ligação
+simples (a parte cara, O(arestas·log n)). 'min_cluster_size' só entra
+depois, na condensação da árvore e na escolha dos clusters por excesso
+de massa (EOM), que são O(n). Então a árvore é construída uma vez por
+min_samples e reextraída para cada min_cluster_size.
+
+A construção e a condensação usam as rotinas internas do scikit-learn
+('sklearn.cluster._hdbscan'), as mesmas do 'HDBSCAN(metric="precomputed")'
+sobre o grafo esparso de distâncias; a escolha dos clusters (EOM ou
+folhas, com ou sem 'allow_single_cluster') repete a do scikit-learn. Os
+rótulos saem idênticos aos de um ajuste completo. Se as rotinas
+internas mudarem de lugar numa versão futura, a varredura cai para um
+ajuste completo do HDBSCAN por combinação (mais lento e sem
+estabilidade/persistência).
+
+Cada cluster escolhido é reportado com:
+  - estabilidade: soma, sobre os pontos, de (λ de saída - λ de
+    nascimento do cluster), com λ = 1/distância (Campello et al., 2013).
+    É o valor que o EOM maximiza;
+  - persistência: estabilidade / (tamanho · λ máximo do cluster), em
+    [0, 1]. Perto de 1, o cluster existe em quase toda a faixa de
+    densidades em que tem pontos (como o 'cluster_persistence_' do
+    pacote 'hdbscan').
+
+'salvar_varredura_hdbscan' grava a tabela e as curvas da varredura.
+"""
+
+import os
+import time
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+from matplotlib.ticker import MaxNLocator
+from scipy.sparse.csgraph import connected_components
+from sklearn.cluster import HDBSCAN
+
+try:
+    # API privada do scikit-learn: pode mudar entre versões
+    from sklearn.cluster._hdbscan._tree import _condense_tree, _do_labelling
+    from sklearn.cluster._hdbscan.hdbscan import _hdbscan_brute
+
+    ROTINAS_INTERNAS = True
+except ImportError:
+    ROTINAS_INTERNAS = False
+
+
+def arvore_ligacao(grafo, min_samples):
+    """
+    Árvore de ligação simples da alcançabilidade mútua (a mesma do
+    HDBSCAN) a partir do grafo esparso simétrico de distâncias.
+    """
+    distancias = sp.csr_matrix(grafo, dtype=np.float64, copy=True)
+    return _hdbscan_brute(
+        distancias, min_samples=min_samples, alpha=1.0, metric="precomputed"
+    )
+
+
+def estabilidades(condensada):
+    """
+    Estabilidade de cada cluster da árvore condensada: {id: estabilidade}.
+    Mesma conta do '_compute_stability' do scikit-learn, vetorizada.
+    """
+    pais, filhos = condensada["parent"], condensada["child"]
+    raiz = pais.min()
+    nascimento = np.full(max(filhos.max(), raiz) + 1, np.nan)
+    nascimento[filhos] = condensada["value"]
+    nascimento[raiz] = 0.0
+    soma = np.bincount(
+        pais - raiz,
+        weights=(condensada["value"] - nascimento[pais]) * condensada["cluster_size"],
+        minlength=pais.max() - raiz + 1,
+    )
+    return {raiz + i: valor for i, valor in enumerate(soma)}
+
+
+def clusters_escolhidos(
+    condensada, estabilidade, metodo="eom", allow_single_cluster=False
+):
+    """
+    Clusters escolhidos na árvore condensada, como no '_get_clusters' do
+    scikit-learn: por excesso de massa (metodo="eom") ou as folhas da
+    árvore de clusters (metodo="leaf"). A raiz só é candidata com
+    allow_single_cluster. Em ordem crescente de id: o i-ésimo é o
+    cluster do rótulo i.
+    """
+    arvore = condensada[condensada["cluster_size"] > 1]
+    if metodo == "leaf":
+        return sorted(set(arvore["child"]) - set(arvore["parent"]))
+    if metodo != "eom":
+        raise ValueError(f"Método de seleção desconhecido: {metodo!r}")
+    estabilidade = dict(estabilidade)
+    # Ids em ordem decrescente: filhos antes dos pais
+    nos = sorted(estabilidade, reverse=True)
+    if not allow_single_cluster:
+        nos = nos[:-1]
+    escolhido = dict.fromkeys(nos, True)
+    for no in nos:
+        filhos = arvore["child"][arvore["parent"] == no]
+        soma_filhos = sum(estabilidade[filho] for filho in filhos)
+        if soma_filhos > estabilidade[no]:
+            escolhido[no] = False
+            estabilidade[no] = soma_filhos
+        else:
+            fila = filhos
+            while len(fila):
+                for descendente in fila:
+                    escolhido[descendente] = False
+                fila = arvore["child"][np.isin(arvore["parent"], fila)]
+    return sorted(no for no in nos if escolhido[no])
+
+
+def _probabilidades(condensada, labels, escolhidos):
+    """
+    Força de pertinência de cada ponto ao seu cluster (λ de saída / λ
+    máximo do cluster), como o 'probabilities_' do HDBSCAN.
+    """
+    pais = condensada["parent"]
+    morte = np.zeros(pais.max() + 1)
+    np.maximum.at(morte, pais, condensada["value"])
+    pontos = condensada[condensada["child"] < pais.min()]
+    rotulo = labels[pontos["child"]]
+    probabilidades = np.zeros(len(labels))
+    no_cluster = rotulo >= 0
+    maximo = morte[np.asarray(escolhidos, dtype=np.intp)[rotulo[no_cluster]]]
+    valor = pontos["value"][no_cluster]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        razao = np.minimum(valor, maximo) / maximo
+    probabilidades[pontos["child"][no_cluster]] = np.where(
+        (maximo == 0) | np.isinf(valor), 1.0, razao
+    )
+    return probabilidades
+
+
+def extrair(ligacao, min_cluster_size, allow_single_cluster=False, metodo="eom"):
+    """
+    Agrupamento do HDBSCAN com 'min_cluster_size' a partir da árvore de
+    ligação (condensada uma só vez). Retorna (labels, probabilidades,
+    estabilidade, persistencia), as duas últimas com um valor por cluster
+    (na ordem dos rótulos).
+    """
+    condensada = _condense_tree(ligacao, min_cluster_size)
+    estabilidade = estabilidades(condensada)
+    escolhidos = clusters_escolhidos(
+        condensada, estabilidade, metodo, allow_single_cluster
+    )
+    labels = _do_labelling(
+        condensada,
+        set(escolhidos),
+        {cluster: rotulo for rotulo, cluster in enumerate(escolhidos)},
+        allow_single_cluster,
+        0.0,
+    )
+    probabilidades = _probabilidades(condensada, labels, escolhidos)
+
+    # λ máximo de cada cluster: o maior λ em que algum ponto ainda está nele
+    pontos = condensada[condensada["cluster_size"] == 1]
+    rotulo_ponto = labels[pontos["child"]]
+    persistencia = []
+    for rotulo, cluster in enumerate(escolhidos):
+        lambdas = pontos["value"][rotulo_ponto == rotulo]
+        maior = lambdas.max(initial=0.0)
+        if np.isfinite(maior) and maior > 0:
+            persistencia.append(
+                min(1.0, estabilidade[cluster] / (len(lambdas) * maior))
+            )
+        else:
+            # Pontos repetidos (distância 0, λ infinito)
+            persistencia.append(1.0)
+    return (
+        labels,
+        probabilidades,
+        np.array([estabilidade[cluster] for cluster in escolhidos]),
+        np.array(persistencia),
+    )
+
+
+def _linha(
+    min_samples,
+    min_cluster_size,
+    labels,
+    probabilidades,
+    estabilidade,
+    persistencia,
+    tempo_arvore,
+    tempo_extracao,
+):
+    """Linha da tabela da varredura ('estabilidade' None: indisponível)."""
+    n_clusters = len(np.unique(labels[labels >= 0]))
+    sem_estabilidade = estabilidade is None or n_clusters == 0
+    return {
+        "min_samples": min_samples,
+        "min_cluster_size": min_cluster_size,
+        "clusters": n_clusters,
+        "ruido": float(np.mean(labels == -1)),
+        "estabilidade": np.nan if estabilidade is None else float(estabilidade.sum()),
+        "persistencia_min": np.nan if sem_estabilidade else persistencia.min(),
+        "persistencia_media": np.nan if sem_estabilidade else persistencia.mean(),
+        "probabilidade_media": (
+            np.nan if n_clusters == 0 else probabilidades[labels >= 0].mean()
+        ),
+        "tempo_arvore": tempo_arvore,
+        "tempo_extracao": tempo_extracao,
+    }
+
+
+def varrer_hdbscan(
+    grafo,
+    min_samples_valores,
+    min_cluster_size_valores,
+    allow_single_cluster=False,
+    cluster_selection_method="eom",
+):
+    """
+    Rótulos do HDBSCAN para todas as combinações de 'min_samples_valores'
+    × 'min_cluster_size_valores', com uma árvore por min_samples.
+    'allow_single_cluster' e 'cluster_selection_method' são os do HDBSCAN.
+
+    'grafo' é o grafo esparso simétrico de distâncias (ex.: o do índice de
+    vizinhança), com pelo menos min_samples vizinhos por ponto e conexo.
+    Retorna (tabela, rotulos): 'tabela' é uma lista de dicionários
+    (min_samples, min_cluster_size, clusters, ruído, estabilidade total,
+    persistência mínima e média, probabilidade média, tempo da árvore e
+    da extração) e 'rotulos' é {(min_samples, min_cluster_size): labels}.
+    Sem as rotinas internas do scikit-learn, cada combinação é um ajuste
+    completo (tempo_arvore e estabilidade NaN).
+    """
+    tabela, rotulos = [], {}
+    for min_samples in sorted(set(min_samples_valores)):
+        ligacao, tempo_arvore = None, np.nan
+        if ROTINAS_INTERNAS:
+            inicio = time.perf_counter()
+            ligacao = arvore_ligacao(grafo, min_samples)
+            tempo_arvore = time.perf_counter() - inicio
+        for min_cluster_size in sorted(set(min_cluster_size_valores)):
+            inicio = time.perf_counter()
+            if ligacao is not None:
+                labels, probabilidades, estabilidade, persistencia = extrair(
+                    ligacao,
+                    min_cluster_size,
+                    allow_single_cluster,
+                    cluster_selection_method,
+                )
+            else:
+                modelo = HDBSCAN(
+                    min_cluster_size=min_cluster_size,
+                    min_samples=min_samples,
+                    allow_single_cluster=allow_single_cluster,
+                    cluster_selection_method=cluster_selection_method,
+                    metric="precomputed",
+                    copy=True,
+                ).fit(grafo)
+                labels, probabilidades = modelo.labels_, modelo.probabilities_
+                estabilidade = persistencia = None
+            tempo_extracao = time.perf_counter() - inicio
+            rotulos[min_samples, min_cluster_size] = labels
+            tabela.append(
+                _linha(
+                    min_samples,
+                    min_cluster_size,
+                    labels,
+                    probabilidades,
+                    estabilidade,
+                    persistencia,
+                    tempo_arvore,
+                    tempo_extracao,
+                )
+            )
+    return tabela, rotulos
+
+
+def salvar_varredura_hdbscan(
+    grafo,
+    min_samples_valores,
+    min_cluster_size_valores,
+    atuais,
+    nome_conjunto,
+    diretorio,
+    prefixo,
+    allow_single_cluster=False,
+    cluster_selection_method="eom",
+):
+    """
+    Varre 'min_samples_valores' × 'min_cluster_size_valores' do HDBSCAN
+    sobre o grafo do índice de vizinhança e salva em 'diretorio' a tabela
+    com estabilidade e persistência dos clusters em TXT e as curvas de
+    clusters e persistência por min_cluster_size em PNG. 'atuais' é o par
+    (min_samples, min_cluster_size) em uso, destacado na tabela e nas
+    curvas. Num grafo desconexo, a varredura é pulada com um aviso.
+    """
+    print("  Varrendo min_samples × min_cluster_size do HDBSCAN...")
+    # O HDBSCAN sobre o grafo exige um grafo conexo; sem isso, a varredura
+    # é pulada em vez de interromper o problema inteiro
+    n_componentes, _ = connected_components(grafo, directed=False)
+    if n_componentes > 1:
+        print(
+            f"  Aviso: grafo de vizinhança com {n_componentes} componentes; "
+            "varredura do HDBSCAN pulada."
+        )
+        return
+    try:
+        tabela, _ = varrer_hdbscan(
+            grafo,
+            min_samples_valores,
+            min_cluster_size_valores,
+            allow_single_cluster=allow_single_cluster,
+            cluster_selection_method=cluster_selection_method,
+        )
+    except ValueError as erro:
+        print(f"  Aviso: varredura do HDBSCAN pulada ({erro}).")
+        return
+    tabela_df = pd.DataFrame(tabela)
+    tempo_arvores = tabela_df.groupby("min_samples")["tempo_arvore"].first().sum()
+    tempo_extracoes = tabela_df["tempo_extracao"].sum()
+    print(
+        f"  {len(tabela)} agrupamentos: árvores {tempo_arvores:.2f}s, "
+        f"extrações {tempo_extracoes:.2f}s."
+    )
+
+    atual = (tabela_df["min_samples"] == atuais[0]) & (
+        tabela_df["min_cluster_size"] == atuais[1]
+    )
+    saida_df = tabela_df.drop(columns=["tempo_arvore"]).rename(
+        columns={
+            "clusters": "Clusters",
+            "estabilidade": "Estabilidade",
+            "persistencia_min": "Persist. mín.",
+            "persistencia_media": "Persist. média",
+            "probabilidade_media": "Prob. média",
+            "tempo_extracao": "Extração (s)",
+        }
+    )
+    saida_df.insert(3, "Ruído (%)", (100 * saida_df.pop("ruido")).round(2))
+    saida_df["Atual"] = np.where(atual, "sim", "")
+    tabela_path = os.path.join(diretorio, f"{prefixo}_hdbscan_varredura.txt")
+    with open(tabela_path, "w", encoding="utf-8") as f:
+        f.write(
+            "Estabilidade: soma das estabilidades dos clusters escolhidos; "
+            "persistência em [0, 1]\n"
+        )
+        f.write(
+            f"Árvores (uma por min_samples): {tempo_arvores:.3f}s; "
+            f"extrações: {tempo_extracoes:.3f}s\n\n"
+        )
+        f.write(
+            saida_df.round(4)
+            .set_index(["min_samples", "min_cluster_size"])
+            .to_string(line_width=150)
+        )
+    print(f"  Varredura do HDBSCAN salva em: {tabela_path}")
+
+    fig, (ax_clusters, ax_persistencia) = plt.subplots(1, 2, figsize=(14, 5))
+    for min_samples, grupo in tabela_df.groupby("min_samples"):
+        ax_clusters.plot(
+            grupo["min_cluster_size"],
+            grupo["clusters"],
+            marker="o",
+            label=f"min_samples={min_samples}",
+        )
+        ax_persistencia.plot(
+            grupo["min_cluster_size"],
+            grupo["persistencia_media"],
+            marker="o",
+            label=f"min_samples={min_samples}",
+        )
+    for ax, coluna in (
+        (ax_clusters, "clusters"),
+        (ax_persistencia, "persistencia_media"),
+    ):
+        ax.scatter(
+            tabela_df.loc[atual, "min_cluster_size"],
+            tabela_df.loc[atual, coluna],
+            s=200,
+            marker="*",
+            color="red",
+            zorder=3,
+            label="parâmetros atuais",
+        )
+        ax.set_xscale("log")
+        ax.set_xlabel("min_cluster_size")
+        ax.grid(True, alpha=0.3)
+        ax.legend()
+    ax_clusters.set_ylabel("Clusters")
+    ax_clusters.yaxis.set_major_locator(MaxNLocator(integer=True))
+    ax_persistencia.set_ylabel("Persistência média dos clusters")
+    fig.suptitle(f"Varredura do HDBSCAN - {nome_conjunto}")
+    fig.tight_layout()
+    grafico_path = os.path.join(diretorio, f"{prefixo}_hdbscan_varredura.png")
+    fig.savefig(grafico_path)
+    plt.close(fig)
+    print(f"  Curvas da varredura salvas em: {grafico_path}")
@@ -0,0 +1,331 @@
+# -*- coding: utf-8 -*-
+"""
+Índice de vizinhança compartilhado por todos os algoritmos baseados em
+grafo ou densidade (Ward, Spectral, DBSCAN, OPTICS e HDBSCAN).
+
+A busca de vizinhos é feita uma única vez por conjunto de dados, no maior
+k e no maior raio necessários. O resultado é um grafo esparso de
+distâncias (CSR) em que cada linha contém a união dos k vizinhos mais
+próximos com todos os vizinhos dentro do raio. Os grafos menores usados
+por cada algoritmo são apenas recortes desse grafo, sem nova busca.
+
+Com o backend "aproximado", os k vizinhos vêm da floresta de projeções
+aleatórias de 'vizinhanca_aproximada.py' (para dimensão alta, em que as
+árvores exatas degradam) e o recall medido contra a busca exata numa
+amostra fica registrado no índice; abaixo de RECALL_MINIMO, um aviso
+sugere o backend exato.
+
+O grafo pode sair desconexo (grupos bem separados, a mais que o raio e
+fora dos k vizinhos uns dos outros), o que o HDBSCAN sobre o grafo não
+aceita; 'arestas_de_ligacao' acrescenta a aresta mais curta de cada
+componente até o resto, como no Borůvka.
+"""
+
+import warnings
+
+import numpy as np
+import scipy.sparse as sp
+from scipy.sparse.csgraph import connected_components
+from sklearn.metrics.pairwise import euclidean_distances
+from sklearn.neighbors import NearestNeighbors
+
+from vizinhanca_aproximada import knn_aproximado, medir_recall
+
+# Elementos (consultas × pontos) por bloco na busca das arestas de ligação
+_ELEMENTOS_POR_BLOCO = 1 << 22
+
+# Pontos consultados por vez na busca por raio
+_LINHAS_POR_BLOCO = 2048
+
+# Recall dos vizinhos aproximados abaixo do qual o índice emite um aviso
+RECALL_MINIMO = 0.8
+
+# Pico de memória da construção do índice por aresta do grafo (medido:
+# ~43 bytes em float64, com os blocos da busca e a união com o kNN)
+BYTES_POR_ARESTA = 48
+
+
+def _linhas_csr(indptr):
+    """Índice da linha de cada elemento de uma matriz CSR."""
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def _grafo_raio_em_blocos(nn, X, raio, dtype):
+    """
+    Grafo de raio (CSR, índices int32) com o próprio ponto na diagonal,
+    consultado em blocos de pontos: as listas de arrays do scikit-learn
+    existem um bloco por vez, não para todos os pontos (o
+    'radius_neighbors_graph' ocupa quase o dobro no pico).
+    """
+    n = X.shape[0]
+    dados, colunas = [], []
+    indptr = np.zeros(n + 1, dtype=np.int64)
+    for inicio in range(0, n, _LINHAS_POR_BLOCO):
+        fim = min(n, inicio + _LINHAS_POR_BLOCO)
+        # Consultando os próprios pontos, cada um é vizinho de si (distância 0)
+        dist, ind = nn.radius_neighbors(X[inicio:fim], radius=raio)
+        indptr[inicio + 1 : fim + 1] = [len(v) for v in ind]
+        dados.append(np.concatenate(dist).astype(dtype))
+        colunas.append(np.concatenate(ind).astype(np.int32))
+        del dist, ind
+    np.cumsum(indptr, out=indptr)
+    return sp.csr_matrix(
+        (np.concatenate(dados), np.concatenate(colunas), indptr), shape=(n, n)
+    )
+
+
+def arestas_de_ligacao(X, grafo, n_amostras=1000, random_state=0):
+    """
+    Arestas que tornam conexo o grafo esparso 'grafo' (só a estrutura
+    importa): a cada rodada, cada componente menos a maior ganha a aresta
+    mais curta até outra componente (buscada a partir de até 'n_amostras'
+    pontos da componente), até restar uma só. Retorna (origem, destino,
+    distancia), vazios se o grafo já é conexo.
+    """
+    n = X.shape[0]
+    rng = np.random.default_rng(random_state)
+    origem, destino, distancia = [], [], []
+    # Uns na estrutura: distâncias zero (pontos repetidos) também são arestas
+    grafo = sp.csr_matrix(
+        (np.ones(grafo.nnz, dtype=np.int8), grafo.indices, grafo.indptr),
+        shape=(n, n),
+    )
+    while True:
+        n_componentes, componente = connected_components(grafo, directed=False)
+        if n_componentes == 1:
+            break
+        maior = np.argmax(np.bincount(componente))
+        ordem = np.argsort(componente, kind="stable")
+        fronteiras = np.cumsum(np.bincount(componente))[:-1]
+        consultas = []
+        for c, membros in enumerate(np.split(ordem, fronteiras)):
+            if c == maior:
+                continue
+            if len(membros) > n_amostras:
+                membros = rng.choice(membros, size=n_amostras, replace=False)
+            consultas.append(membros)
+        consultas = np.concatenate(consultas)
+
+        # Vizinho mais próximo de cada consulta fora da sua componente
+        mais_proximo = np.empty(len(consultas), dtype=np.int64)
+        menor = np.empty(len(consultas))
+        passo = max(1, _ELEMENTOS_POR_BLOCO // n)
+        for inicio in range(0, len(consultas), passo):
+            bloco = consultas[inicio : inicio + passo]
+            D = euclidean_distances(X[bloco], X)
+            D[componente[bloco][:, None] == componente[None, :]] = np.inf
+            mais_proximo[inicio : inicio + passo] = D.argmin(axis=1)
+            menor[inicio : inicio + passo] = D.min(axis=1)
+
+        # A aresta mais curta de cada componente
+        ordem = np.lexsort((menor, componente[consultas]))
+        primeira = np.ones(len(ordem), dtype=bool)
+        primeira[1:] = np.diff(componente[consultas][ordem]) != 0
+        escolhidas = ordem[primeira]
+        origem.append(consultas[escolhidas])
+        destino.append(mais_proximo[escolhidas])
+        distancia.append(menor[escolhidas])
+        grafo = grafo + sp.csr_matrix(
+            (
+                np.ones(len(escolhidas), dtype=np.int8),
+                (origem[-1], destino[-1]),
+            ),
+            shape=(n, n),
+        )
+    if not origem:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0)
+    return np.concatenate(origem), np.concatenate(destino), np.concatenate(distancia)
+
+
+def construir_indice_vizinhanca(
+    X, n_vizinhos, raio, n_jobs=-1, backend="exato", opcoes_aproximado=None
+):
+    """
+    Constrói o índice (KD-tree/Ball-tree escolhida pelo scikit-learn) e
+    consulta, para cada ponto, os 'n_vizinhos' mais próximos e todos os
+    vizinhos a até 'raio' (raio=0: só os k vizinhos).
+
+    Com backend="aproximado", os vizinhos vêm de 'knn_aproximado' (com
+    os parâmetros de 'opcoes_aproximado') e o grafo contém só os k
+    vizinhos: o grafo de raio fica restrito aos vizinhos a até 'raio'
+    entre eles. Para o DBSCAN, a decisão de ponto central continua exata
+    enquanto min_samples <= n_vizinhos.
+
+    Retorna um dicionário com:
+      - 'distancias', 'indices': matrizes (n, n_vizinhos) ordenadas, sem
+        o próprio ponto;
+      - 'grafo': CSR (n, n) simétrica e conexa com a união kNN ∪ raio
+        (distâncias), mais as arestas de ligação entre componentes. A
+        diagonal guarda zeros explícitos: como no cálculo sobre X, o
+        próprio ponto conta como vizinho nas distâncias core do HDBSCAN
+        e do OPTICS sobre o grafo;
+      - 'n_vizinhos', 'raio', 'backend': parâmetros usados na construção;
+      - 'recall': recall medido numa amostra (None no backend exato).
+    """
+    n = X.shape[0]
+    n_vizinhos = min(n_vizinhos, n - 1)
+    recall = None
+    grafo_r = None
+    if backend == "aproximado":
+        distancias, indices = knn_aproximado(X, n_vizinhos, **(opcoes_aproximado or {}))
+        recall = medir_recall(X, distancias)
+        if recall < RECALL_MINIMO:
+            warnings.warn(
+                f"Recall dos vizinhos aproximados {recall:.2f} abaixo de "
+                f"{RECALL_MINIMO}: aumente 'n_arvores'/'tamanho_folha' ou use "
+                "o backend exato",
+                RuntimeWarning,
+            )
+    elif backend == "exato":
+        nn = NearestNeighbors(n_jobs=n_jobs).fit(X)
+        distancias, indices = nn.kneighbors(n_neighbors=n_vizinhos)
+        # O scikit-learn devolve distâncias em float64 mesmo para X float32;
+        # o índice guarda na precisão dos dados (metade da memória em float32)
+        if X.dtype == np.float32:
+            distancias = distancias.astype(np.float32)
+        if raio > 0:
+            grafo_r = _grafo_raio_em_blocos(nn, X, raio, distancias.dtype)
+    else:
+        raise ValueError(f"Backend de vizinhança desconhecido: {backend!r}")
+
+    # As operações esparsas descartam zeros explícitos: as distâncias zero
+    # (o próprio ponto, pontos repetidos) viram 'minimo' até o fim
+    minimo = np.finfo(distancias.dtype).tiny
+    knn = sp.csr_matrix(
+        (
+            np.maximum(distancias.ravel(), minimo),
+            indices.ravel(),
+            np.arange(0, n * n_vizinhos + 1, n_vizinhos),
+        ),
+        shape=(n, n),
+    )
+    # HDBSCAN e OPTICS exigem matriz simétrica. O grafo de raio já é; só
+    # as arestas kNN ganham as reversas.
+    grafo = knn.maximum(knn.T)
+    del knn
+    if grafo_r is None:
+        # Diagonal (o próprio ponto), que a busca por raio já traz
+        grafo = grafo.maximum(sp.diags(np.full(n, minimo, dtype=distancias.dtype)))
+    else:
+        np.maximum(grafo_r.data, minimo, out=grafo_r.data)
+        grafo = grafo_r.maximum(grafo)
+        del grafo_r
+
+    # Grupos isolados deixariam o grafo desconexo (HDBSCAN sobre o grafo falha)
+    origem, destino, distancia = arestas_de_ligacao(X, grafo)
+    if len(origem):
+        ligacao = sp.csr_matrix(
+            (
+                np.maximum(distancia, minimo).astype(distancias.dtype),
+                (origem, destino),
+            ),
+            shape=(n, n),
+        )
+        grafo = grafo.maximum(ligacao.maximum(ligacao.T))
+    grafo.data[grafo.data == minimo] = 0
+
+    return {
+        "distancias": distancias,
+        "indices": indices,
+        "grafo": grafo,
+        "n_vizinhos": n_vizinhos,
+        "raio": raio,
+        "backend": backend,
+        "recall": recall,
+    }
+
+
+def grafo_knn(indice, n_vizinhos, modo="distance"):
+    """
+    Grafo kNN (como 'kneighbors_graph', sem incluir o próprio ponto)
+    recortado do índice. 'modo' é "distance" ou "connectivity".
+    """
+    if n_vizinhos > indice["n_vizinhos"]:
+        raise ValueError(
+            f"Índice construído com {indice['n_vizinhos']} vizinhos; "
+            f"foram pedidos {n_vizinhos}."
+        )
+    n = indice["indices"].shape[0]
+    colunas = indice["indices"][:, :n_vizinhos].ravel()
+    if modo == "connectivity":
+        dados = np.ones(colunas.size, dtype=indice["distancias"].dtype)
+    else:
+        dados = indice["distancias"][:, :n_vizinhos].ravel()
+    indptr = np.arange(0, n * n_vizinhos + 1, n_vizinhos)
+    return sp.csr_matrix((dados, colunas, indptr), shape=(n, n))
+
+
+def grafo_raio(indice, raio):
+    """
+    Grafo de vizinhos a até 'raio' (como 'radius_neighbors_graph'),
+    recortado do índice. Exige raio <= raio usado na construção.
+    """
+    if raio > indice["raio"]:
+        raise ValueError(
+            f"Índice construído com raio {indice['raio']}; foi pedido {raio}."
+        )
+    grafo = indice["grafo"]
+    manter = grafo.data <= raio
+    linhas = _linhas_csr(grafo.indptr)[manter]
+    indptr = np.zeros(grafo.shape[0] + 1, dtype=np.int64)
+    np.cumsum(np.bincount(linhas, minlength=grafo.shape[0]), out=indptr[1:])
+    return sp.csr_matrix(
+        (grafo.data[manter], grafo.indices[manter], indptr), shape=grafo.shape
+    )
+
+
+def estimar_arestas_raio(X, raio, n_amostras=1000, random_state=0):
+    """
+    Estima o número de arestas do grafo de raio sem construí-lo: conta os
+    vizinhos a até 'raio' de uma amostra de pontos contra outra amostra e
+    extrapola para n². Útil para evitar grafos que não caberiam na memória.
+    """
+    rng = np.random.default_rng(random_state)
+    n = X.shape[0]
+    m = min(n, n_amostras)
+    consultas = X[rng.choice(n, size=m, replace=False)]
+    referencia = X[rng.choice(n, size=m, replace=False)]
+    nn = NearestNeighbors(radius=raio).fit(referencia)
+    contagens = np.array([len(v) for v in nn.radius_neighbors(consultas)[1]])
+    return float(contagens.mean() * n / m * n)
+
+
+def limite_arestas_raio(memoria_mb):
+    """
+    Maior número de arestas do grafo cuja construção cabe em 'memoria_mb'
+    (pelos BYTES_POR_ARESTA medidos). Compare com 'estimar_arestas_raio'.
+    """
+    return memoria_mb * 2**20 / BYTES_POR_ARESTA
+
+
+def estimar_bandwidth(
+    X, quantile=0.3, indice=None, n_consultas=1000, n_referencias=5000, random_state=0
+):
+    """
+    Aproxima 'sklearn.cluster.estimate_bandwidth': média, sobre os pontos,
+    da distância ao vizinho de ordem k = quantile·n (contando o próprio
+    ponto), calculada só para 'n_consultas' pontos sorteados.
+
+    A distância ao k-ésimo vizinho é estimada pelo quantil 'quantile'
+    das distâncias a 'n_referencias' pontos sorteados. O custo é
+    O(n_consultas · n_referencias · d), independente de n, em vez do O(n²)
+    do original.
+
+    O 'indice' de vizinhança só ajuda quando k cabe nele (k <= n_vizinhos
+    + 1), isto é, para quantis pequenos (quantile <= (n_vizinhos + 1) / n,
+    ex.: 0.001 com 30 vizinhos e n = 31 000); aí as distâncias já
+    calculadas dão a resposta exata para a amostra. Com o quantil padrão
+    do MeanShift (0.3), k passa de n_vizinhos assim que n > 100.
+    """
+    n = X.shape[0]
+    k = max(1, int(n * quantile))
+    rng = np.random.default_rng(random_state)
+    consultas = rng.choice(n, size=min(n, n_consultas), replace=False)
+    if k == 1:
+        return 0.0  # o único "vizinho" é o próprio ponto
+    if indice is not None and k - 1 <= indice["n_vizinhos"]:
+        # O índice não inclui o próprio ponto: o k-ésimo é a coluna k - 2
+        return float(indice["distancias"][consultas, k - 2].mean())
+    referencias = X[rng.choice(n, size=min(n, n_referencias), replace=False)]
+    distancias = euclidean_distances(X[consultas], referencias)
+    return float(np.quantile(distancias, quantile, axis=1).mean())